@@ -0,0 +1,61 @@
+"""User listing and email search indexes
+
+Revision ID: 7c2f5e91a4d3
+Revises: 46bdb2fd31bd
+Create Date: 2026-10-18 17:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2f5e91a4d3'
+down_revision: Union[str, None] = '46bdb2fd31bd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _drop_invalid_index(name: str) -> None:
+    # A failed CREATE INDEX CONCURRENTLY leaves an INVALID index under its name,
+    # which IF NOT EXISTS would then keep; drop it so it is built again
+    if context.is_offline_mode():
+        return
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+    invalid = bind.execute(
+        sa.text('SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)'),
+        {'name': name},
+    ).scalar()
+    if invalid:
+        op.drop_index(name, table_name='users', postgresql_concurrently=True)
+
+
+def upgrade() -> None:
+    # Built concurrently so a large users table stays writable meanwhile
+    with op.get_context().autocommit_block():
+        _drop_invalid_index('ix_users_created_at_id')
+        op.create_index(
+            'ix_users_created_at_id', 'users', ['created_at', 'id'],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        _drop_invalid_index('ix_users_timezone_created_at_id')
+        op.create_index(
+            'ix_users_timezone_created_at_id', 'users', ['timezone', 'created_at', 'id'],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        _drop_invalid_index('ix_users_email_lower_pattern')
+        op.create_index(
+            'ix_users_email_lower_pattern', 'users', [sa.text('lower(email) varchar_pattern_ops')],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_email_lower_pattern', table_name='users', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_users_timezone_created_at_id', table_name='users', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_users_created_at_id', table_name='users', postgresql_concurrently=True, if_exists=True)
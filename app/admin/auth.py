@@ -1,12 +1,15 @@
+import time
 from typing import Optional
 from sqlalchemy import select
-from fastapi_users.password import PasswordHelper
+from sqlalchemy.exc import SQLAlchemyError
 from sqladmin.authentication import AuthenticationBackend
 from starlette.requests import Request
 from starlette.responses import RedirectResponse
-from app.models.users import User
-from app.database import async_session
+from app.auth.passwords import password_service
+from app.models.users import User, CachedSQLAlchemyUserDatabase, user_cache
+from app.database import async_session, async_read_session
 from app.logging import logger
+from app.config import ADMIN_AUTH_REVALIDATE_SECONDS, ADMIN_AUTH_STALE_GRACE_SECONDS
 
 
 class AdminAuth(AuthenticationBackend):
@@ -28,13 +31,12 @@ class AdminAuth(AuthenticationBackend):
             if not user:
                 return False
 
-            if not user.is_superuser:
+            if not user.is_superuser or not user.is_active:
                 return False
 
-            pwd_helper = PasswordHelper()
-            verified = pwd_helper.verify_and_update(
+            verified = (await password_service.verify_and_update(
                 password, user.hashed_password
-            )[0]
+            ))[0]
 
             if not verified:
                 return False
@@ -42,7 +44,8 @@ class AdminAuth(AuthenticationBackend):
             # Set session data using SQLAdmin's expected format
             request.session.update({
                 "admin_user_id": user.id,  # Changed key name
-                "admin_authenticated": True  # Added explicit authentication flag
+                "admin_authenticated": True,  # Added explicit authentication flag
+                "admin_checked_at": time.time(),
             })
 
             return True
@@ -58,20 +61,37 @@ class AdminAuth(AuthenticationBackend):
                 status_code=302
             )
 
-        # Verify user still exists and is superuser
-        async with async_session() as session:
-            result = await session.execute(
-                select(User).where(User.id == user_id)
-            )
-            user = result.scalar_one_or_none()
+        # Skip the lookup while the last check is fresh and nobody changed the user
+        checked_at = request.session.get("admin_checked_at", 0)
+        now = time.time()
+        if (
+            now - checked_at < ADMIN_AUTH_REVALIDATE_SECONDS
+            and not user_cache.changed_since(user_id, checked_at)
+        ):
+            return True
 
-            if not user or not user.is_superuser:
-                request.session.clear()
-                return RedirectResponse(
-                    request.url_for("admin:login"),
-                    status_code=302
-                )
+        # Verify user still exists and is an active superuser
+        try:
+            async with async_read_session() as session:
+                user = await CachedSQLAlchemyUserDatabase(session, User).get(user_id)
+        except (SQLAlchemyError, OSError) as exc:
+            # Keep the panel usable through short DB incidents
+            if (
+                now - checked_at < ADMIN_AUTH_STALE_GRACE_SECONDS
+                and not user_cache.changed_since(user_id, checked_at)
+            ):
+                logger.warning("Admin revalidation failed, using last check: %s", exc)
+                return True
+            raise
+
+        if not user or not user.is_superuser or not user.is_active:
+            request.session.clear()
+            return RedirectResponse(
+                request.url_for("admin:login"),
+                status_code=302
+            )
 
+        request.session["admin_checked_at"] = now
         return True
 
     async def logout(self, request: Request) -> bool:
@@ -0,0 +1,351 @@
+"""
+Bulk user import and export, shared by the admin panel and the CLI.
+
+Imports read NDJSON (one JSON object per line) or CSV (with a header row)
+as a stream, so uploads of any size are handled a batch at a time:
+
+- rows are validated one by one, and invalid rows are reported by line
+  number instead of failing the whole import;
+- passwords of a batch are hashed in parallel on a pool shared by all
+  imports in the process and sized to half the CPUs by default. Logins
+  never wait behind imports for a thread, though both still share the CPUs;
+- each batch is written in one statement: COPY on asyncpg, a multi-row
+  INSERT otherwise.
+
+Rows may carry a `hashed_password` instead of a `password`, e.g. when
+re-importing an export made with password hashes.
+
+Exports stream the users table through a server-side cursor, a chunk of
+rows at a time.
+"""
+import asyncio
+import codecs
+import csv
+import io
+import json
+from datetime import datetime, UTC
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from fastapi_users import InvalidPasswordException
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.passwords import PasswordService, import_password_service
+from app.config import USER_EXPORT_CHUNK_SIZE, USER_IMPORT_BATCH_SIZE
+from app.database import async_read_session, async_session
+from app.logging import logger
+from app.models.users import TimezoneEnum, User, UserManager
+from app.schemas.users import UserImport
+
+FORMATS = ("ndjson", "csv")
+EXPORT_COLUMNS = ("id", "email", "timezone", "is_active", "is_superuser", "is_verified", "created_at")
+# Written by COPY / INSERT, in this order
+IMPORT_COLUMNS = ("email", "hashed_password", "timezone", "is_active", "is_superuser", "is_verified", "created_at")
+
+# (line number, parsed row or None, error or None)
+ParsedRow = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Split a stream of bytes into decoded lines, without their line endings.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def parse_ndjson(lines: AsyncIterator[str]) -> AsyncIterator[ParsedRow]:
+    number = 0
+    async for line in lines:
+        number += 1
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield number, None, f"Invalid JSON: {exc}"
+            continue
+        if not isinstance(row, dict):
+            yield number, None, "Expected a JSON object"
+            continue
+        yield number, row, None
+
+
+async def parse_csv(lines: AsyncIterator[str]) -> AsyncIterator[ParsedRow]:
+    """
+    Parse CSV rows keyed by the header row; empty cells are left out.
+    """
+    header: Optional[List[str]] = None
+    number = start = 0
+    record = ""
+    async for line in lines:
+        number += 1
+        record = f"{record}\n{line}" if record else line
+        if not start:
+            start = number
+        # An odd number of quotes means a quoted field continues on the next line
+        if record.count('"') % 2:
+            continue
+        values, first, record, start = next(csv.reader([record]), []), start, "", 0
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if not any(values):
+            continue
+        if len(values) != len(header):
+            yield first, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield first, {name: value for name, value in zip(header, values) if value != ""}, None
+    if record:
+        yield start, None, "Unterminated quoted field"
+
+
+def parse_rows(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[ParsedRow]:
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")
+    parser = parse_ndjson if fmt == "ndjson" else parse_csv
+    return parser(iter_lines(chunks))
+
+
+async def _validate(row: Dict[str, Any], validator: UserManager) -> Dict[str, Any]:
+    """
+    Check a row against the registration rules.
+
+    Raises:
+        ValueError: With a message for the report.
+    """
+    try:
+        user = UserImport.model_validate(row)
+    except ValidationError as exc:
+        raise ValueError("; ".join(
+            f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}" for error in exc.errors()
+        ))
+    try:
+        timezone = TimezoneEnum(user.timezone)
+    except ValueError:
+        raise ValueError(f"timezone: unknown timezone {user.timezone!r}")
+    if user.password is not None:
+        try:
+            await validator.validate_password(user.password, user)
+        except InvalidPasswordException as exc:
+            raise ValueError(f"password: {exc.reason}")
+    return {
+        "email": user.email,
+        "password": user.password,
+        "hashed_password": user.hashed_password,
+        "timezone": timezone,
+        "is_active": user.is_active,
+        "is_superuser": user.is_superuser,
+        "is_verified": user.is_verified,
+        "created_at": user.created_at or datetime.now(UTC),
+    }
+
+
+async def _existing_emails(session: AsyncSession, emails: List[str]) -> Set[str]:
+    # lower(email) is indexed (ix_users_email_lower_pattern) and is what logins look up
+    result = await session.execute(
+        select(func.lower(User.email)).where(func.lower(User.email).in_([email.lower() for email in emails]))
+    )
+    return set(result.scalars())
+
+
+async def _copy(session: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+    connection = await (await session.connection()).get_raw_connection()
+    records = [
+        # COPY bypasses SQLAlchemy's Enum type, which stores member names
+        tuple(row[column].name if column == "timezone" else row[column] for column in IMPORT_COLUMNS)
+        for row in rows
+    ]
+    await connection.driver_connection.copy_records_to_table(
+        User.__tablename__, records=records, columns=list(IMPORT_COLUMNS)
+    )
+
+
+async def _write(session: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+    if session.bind.dialect.driver == "asyncpg":
+        import asyncpg
+
+        try:
+            await _copy(session, rows)
+        except asyncpg.UniqueViolationError as exc:
+            raise IntegrityError("COPY users", None, exc) from exc
+        except (asyncpg.PostgresError, asyncpg.InterfaceError) as exc:
+            # Raised by the driver itself, so SQLAlchemy hasn't wrapped it
+            raise DBAPIError("COPY users", None, exc) from exc
+    else:
+        # Sent as multi-row INSERTs by SQLAlchemy's insertmanyvalues
+        await session.execute(insert(User), [{column: row[column] for column in IMPORT_COLUMNS} for row in rows])
+
+
+class UserImporter:
+    """
+    Imports users a batch at a time, reporting progress and per-row errors.
+
+    Args:
+        batch_size (int): Rows hashed and written together.
+        hash_workers (Optional[int]): Threads for a pool of this import's own (e.g. the CLI);
+            by default passwords are hashed on the shared `import_password_service`.
+    """
+
+    def __init__(self, batch_size: int = USER_IMPORT_BATCH_SIZE, hash_workers: Optional[int] = None):
+        self.batch_size = batch_size
+        self._owns_hasher = hash_workers is not None
+        self.hasher = import_password_service
+        if self._owns_hasher:
+            self.hasher = PasswordService(max_workers=hash_workers, max_queue=batch_size)
+        # validate_password only needs the rules, not a database
+        self.validator = UserManager(None)
+        self.processed = 0
+        self.imported = 0
+        self.failed = 0
+
+    def progress(self) -> Dict[str, int]:
+        return {"processed": self.processed, "imported": self.imported, "failed": self.failed}
+
+    def _error(self, line: int, email: Optional[str], error: str) -> Dict[str, Any]:
+        self.failed += 1
+        return {"line": line, "email": email, "error": error}
+
+    async def _store(self, batch: List[Tuple[int, Dict[str, Any]]]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Write a batch of valid rows, skipping emails that are already taken.
+
+        If the database rejects the batch, all of its rows are reported as failed.
+        """
+        for attempt in range(2):
+            async with async_session() as session:
+                taken = await _existing_emails(session, [row["email"] for _, row in batch])
+                for line, row in batch:
+                    if row["email"].lower() in taken:
+                        yield self._error(line, row["email"], "email: already registered")
+                batch = [(line, row) for line, row in batch if row["email"].lower() not in taken]
+                rows = [row for _, row in batch]
+                if not rows:
+                    return
+                try:
+                    await _write(session, rows)
+                    await session.commit()
+                except IntegrityError as exc:
+                    # Someone registered one of these emails since the check; check again
+                    await session.rollback()
+                    if attempt:
+                        for line, row in batch:
+                            yield self._error(line, row["email"], f"not imported: {exc.orig}")
+                        return
+                    continue
+                except DBAPIError as exc:
+                    # A value the database rejects despite validation; the other batches still go in
+                    await session.rollback()
+                    logger.warning("User import: batch of %d rows failed: %s", len(batch), exc.orig)
+                    for line, row in batch:
+                        yield self._error(line, row["email"], f"not imported: {exc.orig}")
+                    return
+                self.imported += len(rows)
+                return
+
+    async def _flush(self, batch: List[Tuple[int, Dict[str, Any]]]) -> AsyncIterator[Dict[str, Any]]:
+        plain = [row for _, row in batch if row["password"] is not None]
+        hashes = await asyncio.gather(*(self.hasher.hash(row["password"]) for row in plain))
+        for row, hashed in zip(plain, hashes):
+            row["hashed_password"] = hashed
+        async for error in self._store(batch):
+            yield error
+
+    async def run(self, rows: AsyncIterator[ParsedRow]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Import parsed rows.
+
+        Yields:
+            Dict[str, Any]: `{"line", "email", "error"}` for each rejected row,
+            `{"progress": {...}}` after each batch and `{"done": {...}}` at the end.
+        """
+        batch: List[Tuple[int, Dict[str, Any]]] = []
+        # Lower-cased emails of the batch, to reject duplicates within it
+        emails: Set[str] = set()
+        try:
+            async for line, row, error in rows:
+                self.processed += 1
+                if error is None:
+                    try:
+                        row = await _validate(row, self.validator)
+                    except ValueError as exc:
+                        error = str(exc)
+                if error is None and row["email"].lower() in emails:
+                    error = "email: duplicated in this import"
+                if error is not None:
+                    yield self._error(line, row.get("email") if row else None, error)
+                    continue
+                batch.append((line, row))
+                emails.add(row["email"].lower())
+                if len(batch) >= self.batch_size:
+                    async for event in self._flush(batch):
+                        yield event
+                    batch, emails = [], set()
+                    yield {"progress": self.progress()}
+            if batch:
+                async for event in self._flush(batch):
+                    yield event
+            logger.info("User import: %s", self.progress())
+            yield {"done": self.progress()}
+        finally:
+            if self._owns_hasher:
+                self.hasher.shutdown()
+
+
+def _export_row(user: Any) -> Dict[str, Any]:
+    row = dict(user._mapping)
+    row["timezone"] = row["timezone"].value
+    row["created_at"] = row["created_at"].isoformat()
+    return row
+
+
+async def export_users(
+    fmt: str,
+    include_password_hashes: bool = False,
+    chunk_size: int = USER_EXPORT_CHUNK_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    Stream every user, oldest first, as NDJSON or CSV.
+
+    Rows are fetched through a server-side cursor `chunk_size` at a time, from
+    a read replica when configured, and each chunk is yielded as one block.
+
+    Args:
+        fmt (str): "ndjson" or "csv".
+        include_password_hashes (bool): Add `hashed_password`, so the export can be re-imported as is.
+        chunk_size (int): Rows fetched and encoded at a time.
+
+    Yields:
+        bytes: Encoded rows.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")
+    columns = [*EXPORT_COLUMNS, *(["hashed_password"] if include_password_hashes else [])]
+    stmt = (
+        select(*(getattr(User, column) for column in columns))
+        .order_by(User.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    if fmt == "csv":
+        yield (",".join(columns) + "\r\n").encode()
+
+    async with async_read_session() as session:
+        result = await session.stream(stmt)
+        async for partition in result.partitions():
+            rows = [_export_row(user) for user in partition]
+            if fmt == "ndjson":
+                yield "".join(json.dumps(row) + "\n" for row in rows).encode()
+            else:
+                buffer = io.StringIO()
+                writer = csv.DictWriter(buffer, fieldnames=columns)
+                writer.writerows(rows)
+                yield buffer.getvalue().encode()
@@ -0,0 +1,79 @@
+import json
+from tempfile import SpooledTemporaryFile
+from typing import AsyncIterator
+
+from sqladmin import BaseView, expose
+from starlette.datastructures import UploadFile
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+from app.admin.bulk import FORMATS, UserImporter, export_users, parse_rows
+from app.config import USER_IMPORT_BATCH_SIZE
+
+# Request bodies read as a stream instead of a form upload
+CONTENT_TYPES = {"application/x-ndjson": "ndjson", "application/json": "ndjson", "text/csv": "csv"}
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Raw bodies larger than this go to a temporary file
+UPLOAD_SPOOL_SIZE = 1024 * 1024
+
+
+class UserBulkAdmin(BaseView):
+    """
+    Streaming user import and export; like every admin page it requires a
+    superuser session through AdminAuth.
+
+    Imports respond with NDJSON progress and per-row errors as they happen.
+    """
+    name = "Import / export users"
+    icon = "fa-solid fa-file-import"
+
+    # Sorts before the other exposed methods, so the menu entry opens this page
+    @expose("/users-bulk", methods=["GET"])
+    async def users_bulk(self, request: Request) -> Response:
+        return await self.templates.TemplateResponse(
+            request, "users_bulk.html", {"formats": FORMATS, "batch_size": USER_IMPORT_BATCH_SIZE},
+        )
+
+    @expose("/users-bulk/import", methods=["POST"])
+    async def users_bulk_import(self, request: Request) -> Response:
+        content_type = request.headers.get("content-type", "").split(";")[0].strip()
+        if content_type in CONTENT_TYPES:
+            # Spooled like form uploads: the response below starts before the
+            # import has read everything, and then owns the ASGI receive channel
+            fmt, upload = CONTENT_TYPES[content_type], UploadFile(SpooledTemporaryFile(max_size=UPLOAD_SPOOL_SIZE))
+            async for chunk in request.stream():
+                await upload.write(chunk)
+            await upload.seek(0)
+        else:
+            # Browser uploads; Starlette spools the file to disk, not memory
+            form = await request.form()
+            upload, fmt = form.get("file"), str(form.get("format") or "")
+            if upload is None or isinstance(upload, str):
+                return PlainTextResponse("No file uploaded", status_code=400)
+
+        async def chunks() -> AsyncIterator[bytes]:
+            while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                yield chunk
+
+        if fmt not in FORMATS:
+            return PlainTextResponse(f"Format must be one of {', '.join(FORMATS)}", status_code=400)
+
+        async def report() -> AsyncIterator[bytes]:
+            try:
+                async for event in UserImporter().run(parse_rows(chunks(), fmt)):
+                    yield (json.dumps(event) + "\n").encode()
+            finally:
+                await upload.close()
+
+        return StreamingResponse(report(), media_type="application/x-ndjson")
+
+    @expose("/users-bulk/export.{fmt}", methods=["GET"])
+    async def users_bulk_export(self, request: Request) -> Response:
+        fmt = request.path_params["fmt"]
+        if fmt not in FORMATS:
+            return PlainTextResponse(f"Format must be one of {', '.join(FORMATS)}", status_code=404)
+        include_password_hashes = request.query_params.get("password_hashes") == "1"
+        return StreamingResponse(
+            export_users(fmt, include_password_hashes),
+            media_type="application/x-ndjson" if fmt == "ndjson" else "text/csv",
+            headers={"Content-Disposition": f'attachment; filename="users.{fmt}"'},
+        )
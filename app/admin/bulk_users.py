@@ -0,0 +1,84 @@
+"""
+Import or export users from the command line.
+
+    python -m app.admin.bulk_users import users.ndjson
+    python -m app.admin.bulk_users import users.csv --format csv
+    python -m app.admin.bulk_users export users.ndjson [--password-hashes]
+
+Rejected rows are printed as JSON lines on stdout and progress on stderr.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from typing import AsyncIterator, BinaryIO
+
+from app.admin.bulk import FORMATS, UserImporter, export_users, parse_rows
+from app.config import USER_IMPORT_BATCH_SIZE, USER_IMPORT_HASH_WORKERS
+from app.database import engine
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+async def _read(file: BinaryIO) -> AsyncIterator[bytes]:
+    loop = asyncio.get_running_loop()
+    while chunk := await loop.run_in_executor(None, file.read, READ_CHUNK_SIZE):
+        yield chunk
+
+
+async def import_file(path: str, fmt: str, batch_size: int, hash_workers: int) -> int:
+    """
+    Import users from `path`.
+
+    Returns:
+        int: 0 if every row was imported, otherwise 1.
+    """
+    importer = UserImporter(batch_size=batch_size, hash_workers=hash_workers)
+    with (sys.stdin.buffer if path == "-" else open(path, "rb")) as file:
+        async for event in importer.run(parse_rows(_read(file), fmt)):
+            if "progress" in event or "done" in event:
+                print(json.dumps(event), file=sys.stderr, flush=True)
+            else:
+                print(json.dumps(event), flush=True)
+    return 1 if importer.failed else 0
+
+
+async def export_file(path: str, fmt: str, include_password_hashes: bool) -> int:
+    exported = 0
+    with (sys.stdout.buffer if path == "-" else open(path, "wb")) as file:
+        async for chunk in export_users(fmt, include_password_hashes):
+            file.write(chunk)
+            exported += chunk.count(b"\n")
+            print(json.dumps({"progress": {"lines": exported}}), file=sys.stderr, flush=True)
+    return 0
+
+
+def _format(path: str, fmt: str) -> str:
+    return fmt or ("csv" if os.path.splitext(path)[1].lower() == ".csv" else "ndjson")
+
+
+async def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.admin.bulk_users", description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+    importing = commands.add_parser("import", help="Import users from a file, or - for stdin")
+    importing.add_argument("path")
+    importing.add_argument("--format", choices=FORMATS, default="", help="Defaults to the file extension")
+    importing.add_argument("--batch-size", type=int, default=USER_IMPORT_BATCH_SIZE)
+    importing.add_argument("--hash-workers", type=int, default=USER_IMPORT_HASH_WORKERS)
+    exporting = commands.add_parser("export", help="Export users to a file, or - for stdout")
+    exporting.add_argument("path")
+    exporting.add_argument("--format", choices=FORMATS, default="", help="Defaults to the file extension")
+    exporting.add_argument("--password-hashes", action="store_true", help="Include hashed_password for re-import")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "import":
+            return await import_file(args.path, _format(args.path, args.format), args.batch_size, args.hash_workers)
+        return await export_file(args.path, _format(args.path, args.format), args.password_hashes)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(sys.argv[1:])))
@@ -0,0 +1,99 @@
+"""
+Row counts for admin list pagination without scanning large tables.
+
+Unfiltered lists use the planner's row estimate from pg_class, which is kept
+current by autovacuum/ANALYZE. Filtered lists (e.g. a search) use an exact
+COUNT(*) cached in Redis for ADMIN_COUNT_CACHE_SECONDS, so paging through
+results or reloading doesn't recount. Exact unfiltered counts are only run
+when an admin asks for them.
+"""
+import hashlib
+from typing import Dict, Optional
+
+from redis.exceptions import RedisError
+from sqlalchemy import Select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import ADMIN_COUNT_CACHE_SECONDS
+from app.logging import logger
+from app.redis import get_redis
+
+ADMIN_COUNT_KEY_PREFIX: str = "admin_count:v1:"
+
+
+class CountProvider:
+    """
+    Estimated and cached exact row counts.
+
+    Args:
+        ttl (int): Seconds an exact count is reused.
+    """
+
+    def __init__(self, ttl: int = ADMIN_COUNT_CACHE_SECONDS):
+        self.ttl = ttl
+        self.estimates = 0
+        self.exact_hits = 0
+        self.exact_misses = 0
+
+    async def estimate(self, session: AsyncSession, table: str) -> Optional[int]:
+        """
+        The planner's row estimate for `table`.
+
+        Returns:
+            Optional[int]: None off PostgreSQL or before the table was first analyzed.
+        """
+        if session.bind.dialect.name != "postgresql":
+            return None
+        result = await session.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+            {"table": table},
+        )
+        estimate = result.scalar()
+        # -1 until the first VACUUM or ANALYZE
+        if estimate is None or estimate < 0:
+            return None
+        self.estimates += 1
+        return int(estimate)
+
+    def _key(self, stmt: Select) -> str:
+        compiled = stmt.compile()
+        params = sorted((name, repr(value)) for name, value in compiled.params.items())
+        digest = hashlib.sha1(f"{compiled}|{params}".encode()).hexdigest()
+        return f"{ADMIN_COUNT_KEY_PREFIX}{digest}"
+
+    async def exact(self, session: AsyncSession, stmt: Select) -> int:
+        """
+        Run a count statement, reusing its result for `ttl` seconds.
+
+        Args:
+            session (AsyncSession): Session to count with on a cache miss.
+            stmt (Select): A statement selecting a single count.
+
+        Returns:
+            int: The count.
+        """
+        key = self._key(stmt)
+        try:
+            redis = await get_redis()
+            cached = await redis.get(key)
+        except (RedisError, OSError) as exc:
+            logger.warning("Admin count cache unavailable: %s", exc)
+            redis = cached = None
+        if cached is not None:
+            self.exact_hits += 1
+            return int(cached)
+
+        self.exact_misses += 1
+        count = (await session.execute(stmt)).scalar_one()
+        if redis is not None:
+            try:
+                await redis.set(key, count, ex=self.ttl)
+            except (RedisError, OSError) as exc:
+                logger.warning("Admin count cache unavailable: %s", exc)
+        return count
+
+    def stats(self) -> Dict[str, int]:
+        return {"estimates": self.estimates, "exact_hits": self.exact_hits, "exact_misses": self.exact_misses}
+
+
+admin_counts = CountProvider()
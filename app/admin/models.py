@@ -1,7 +1,10 @@
 from fastapi import Request
 from sqladmin import ModelView
-from app.models.users import User
-from typing import Any
+from app.admin.counts import admin_counts
+from app.auth.passwords import password_service
+from app.models.users import User, email_prefix_filter, user_cache
+from sqlalchemy import Select, func, select
+from typing import Any, Optional
 from datetime import datetime
 from datetime import UTC
 
@@ -26,8 +29,9 @@ class UserAdmin(ModelView, model=User):
         User.created_at,
     ]
     column_searchable_list = [User.email]
-    column_sortable_list = [User.id, User.email]
-    column_default_sort = [(User.email, True)]
+    column_sortable_list = [User.id, User.email, User.created_at]
+    # Newest first, read from ix_users_created_at_id instead of sorting the table
+    column_default_sort = [(User.created_at, True), (User.id, True)]
     can_create = True
     can_edit = True
     can_delete = True
@@ -35,6 +39,8 @@ class UserAdmin(ModelView, model=User):
     name = "User"
     name_plural = "Users"
     icon = "fa-solid fa-users"
+    # Says when the total is estimated and links to an exact count
+    list_template = "user_list.html"
     form_columns = [
         "email",
         "hashed_password",
@@ -44,16 +50,47 @@ class UserAdmin(ModelView, model=User):
         "is_verified",
     ]
 
+    def search_placeholder(self) -> str:
+        return "Email starts with"
+
+    def search_query(self, stmt: Select, term: str) -> Select:
+        """Prefix search on ix_users_email_lower_pattern rather than a substring scan"""
+        return stmt.filter(email_prefix_filter(term))
+
+    async def count(self, request: Request, stmt: Optional[Select] = None) -> int:
+        """
+        Estimated total for the unfiltered list, cached exact counts otherwise.
+
+        `?exact_count=1` counts the unfiltered list exactly (cached as well).
+        """
+        search = request.query_params.get("search")
+        async with self.session_maker(expire_on_commit=False) as session:
+            if search:
+                # Counted on the email index, without the list's sorting
+                return await admin_counts.exact(
+                    session, select(func.count(User.id)).where(email_prefix_filter(search))
+                )
+            if request.query_params.get("exact_count") != "1":
+                estimate = await admin_counts.estimate(session, User.__tablename__)
+                if estimate is not None:
+                    return estimate
+            return await admin_counts.exact(session, self.count_query(request))
+
     async def on_model_change(self, data: dict, model: Any, is_created: bool, request: Request) -> None:
-        """Hash password using bcrypt directly"""
+        """Hash password on the password service pool"""
         if 'hashed_password' in data and data['hashed_password']:
-            import bcrypt
-            password = data['hashed_password'].encode('utf-8')
-            salt = bcrypt.gensalt()
-            hashed = bcrypt.hashpw(password, salt)
-            data['hashed_password'] = hashed.decode('utf-8')
+            data['hashed_password'] = await password_service.hash(data['hashed_password'])
 
             # Set is_verified and is_active for new users
             if is_created:
                 data['is_active'] = True
                 data['created_at'] = datetime.now(UTC)
+
+    async def after_model_change(self, data: dict, model: Any, is_created: bool, request: Request) -> None:
+        """Drop the committed user from the user cache on every worker"""
+        if not is_created:
+            await user_cache.invalidate(model.id)
+
+    async def after_model_delete(self, model: Any, request: Request) -> None:
+        """Drop the deleted user from the user cache on every worker"""
+        await user_cache.invalidate(model.id)
@@ -0,0 +1,79 @@
+"""
+Admin panel mounted on the API, built on its first request.
+
+sqladmin pulls in Jinja, WTForms and its templates, which costs a few hundred
+milliseconds at import and is only needed by whoever opens /admin.
+"""
+import os
+import threading
+from typing import Any, List, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+def build_admin() -> ASGIApp:
+    """
+    Build the sqladmin application with its views and authentication.
+
+    Returns:
+        ASGIApp: The admin Starlette app, to be mounted at /admin.
+    """
+    from sqladmin import Admin
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    from starlette.applications import Starlette
+
+    from app.admin.auth import AdminAuth
+    from app.admin.bulk_admin import UserBulkAdmin
+    from app.admin.models import UserAdmin
+    from app.admin.profiler import ProfilerAdmin
+    from app.config import SECRET_KEY
+    from app.database import engine, RoutingSession
+
+    admin = Admin(
+        # Admin mounts itself on the app it's given; we mount admin.admin ourselves
+        Starlette(),
+        # List and detail views read from replicas when configured
+        session_maker=async_sessionmaker(bind=engine, sync_session_class=RoutingSession),
+        authentication_backend=AdminAuth(secret_key=SECRET_KEY),
+        base_url="/admin/",
+        title="Admin Panel",
+        templates_dir=os.path.join(os.path.dirname(__file__), "templates"),
+    )
+    admin.add_view(UserAdmin)
+    admin.add_view(UserBulkAdmin)
+    admin.add_view(ProfilerAdmin)
+    return admin.admin
+
+
+class LazyAdmin:
+    """
+    ASGI app that builds the admin panel the first time it is needed.
+
+    Exposes `routes` so `url_for("admin:...")` and route matching keep working
+    through the mount.
+    """
+
+    def __init__(self):
+        self._app: Optional[ASGIApp] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._app is not None
+
+    def load(self) -> ASGIApp:
+        if self._app is None:
+            with self._lock:
+                if self._app is None:
+                    self._app = build_admin()
+        return self._app
+
+    @property
+    def routes(self) -> List[Any]:
+        return self.load().routes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.load()(scope, receive, send)
+
+
+admin_panel = LazyAdmin()
@@ -1,6 +1,6 @@
 from app.models.users import User
 from app.database import async_session
-from fastapi_users.password import PasswordHelper
+from app.auth.passwords import password_service
 
 
 async def create_superuser():
@@ -15,8 +15,7 @@ async def create_superuser():
             return
 
         password = input("Enter the password: ")
-        pwd_helper = PasswordHelper()
-        hashed_password = pwd_helper.hash(password)
+        hashed_password = await password_service.hash(password)
 
         user = User(
             email=email,
@@ -1,14 +1,79 @@
+import time
+import uuid
+from typing import Any, Optional
+
+import jwt
+from fastapi_users import exceptions
 from fastapi_users.authentication import (
     AuthenticationBackend,
     BearerTransport,
     JWTStrategy
 )
+from fastapi_users.authentication.strategy.jwt import JWTStrategyDestroyNotSupportedError
+from fastapi_users.jwt import decode_jwt, generate_jwt
+from app.auth.revocation import TokenRevocations, token_revocations
 from app.config import AUTH_SECRET_KEY, API_V1_PREFIX
 
 bearer_transport = BearerTransport(tokenUrl=f"{API_V1_PREFIX}/auth/login")
 
+
+class RevocableJWTStrategy(JWTStrategy):
+    """
+    JWTStrategy whose tokens carry a `jti` claim so they can be revoked,
+    which makes logout effective.
+
+    Tokens issued without a `jti` stay valid until they expire.
+
+    Args:
+        revocations (TokenRevocations): Where revoked token ids are kept.
+    """
+
+    def __init__(self, *args: Any, revocations: TokenRevocations = token_revocations, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.revocations = revocations
+
+    def _decode(self, token: str) -> dict:
+        return decode_jwt(token, self.decode_key, self.token_audience, algorithms=[self.algorithm])
+
+    async def read_token(self, token: Optional[str], user_manager: Any) -> Optional[Any]:
+        if token is None:
+            return None
+
+        try:
+            data = self._decode(token)
+            user_id = data.get("sub")
+            if user_id is None:
+                return None
+        except jwt.PyJWTError:
+            return None
+
+        jti = data.get("jti")
+        if jti is not None and await self.revocations.is_revoked(jti):
+            return None
+
+        try:
+            parsed_id = user_manager.parse_id(user_id)
+            return await user_manager.get(parsed_id)
+        except (exceptions.UserNotExists, exceptions.InvalidID):
+            return None
+
+    async def write_token(self, user: Any) -> str:
+        data = {"sub": str(user.id), "aud": self.token_audience, "jti": uuid.uuid4().hex}
+        return generate_jwt(data, self.encode_key, self.lifetime_seconds, algorithm=self.algorithm)
+
+    async def destroy_token(self, token: str, user: Any) -> None:
+        try:
+            data = self._decode(token)
+        except jwt.PyJWTError:
+            # Already unusable
+            return
+        if "jti" not in data:
+            raise JWTStrategyDestroyNotSupportedError()
+        await self.revocations.revoke(data["jti"], data.get("exp", time.time() + (self.lifetime_seconds or 0)))
+
+
 def get_jwt_strategy() -> JWTStrategy:
-    return JWTStrategy(secret=AUTH_SECRET_KEY, lifetime_seconds=86400)
+    return RevocableJWTStrategy(secret=AUTH_SECRET_KEY, lifetime_seconds=86400)
 
 auth_backend = AuthenticationBackend(
     name="jwt",
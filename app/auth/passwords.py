@@ -0,0 +1,128 @@
+"""
+Password hashing off the event loop.
+
+Hashing and verifying are CPU-bound (argon2/bcrypt) and would otherwise
+block every other request in the worker. The hashers release the GIL, so a
+small thread pool gives real parallelism.
+"""
+
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+from fastapi_users.password import PasswordHelper
+
+from app.config import PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE, USER_IMPORT_HASH_WORKERS
+from app.utils.stats import Histogram
+
+
+class PasswordServiceOverloaded(HTTPException):
+    """
+    Raised when too many password operations are already queued.
+    """
+
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent password operations, retry shortly",
+            headers={"Retry-After": "1"},
+        )
+
+
+class PasswordService:
+    """
+    Runs PasswordHelper work on a dedicated, bounded thread pool.
+
+    Args:
+        max_workers (int): Number of hashing threads (the concurrency cap).
+        max_queue (int): Operations allowed to wait for a thread before rejecting.
+        password_helper (Optional[PasswordHelper]): Helper doing the actual work.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = PASSWORD_HASH_WORKERS,
+        max_queue: int = PASSWORD_HASH_MAX_QUEUE,
+        password_helper: Optional[PasswordHelper] = None,
+    ):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.password_helper = password_helper or PasswordHelper()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.in_flight = 0
+        self.rejected = 0
+        self.wait_time = Histogram()
+        self.hash_time = Histogram()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="password-hash",
+            )
+        return self._executor
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self.in_flight >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise PasswordServiceOverloaded()
+
+        def timed() -> Tuple[Any, float, float]:
+            started = time.perf_counter()
+            result = func(*args)
+            return result, started, time.perf_counter()
+
+        self.in_flight += 1
+        submitted = time.perf_counter()
+        try:
+            result, started, finished = await asyncio.get_running_loop().run_in_executor(
+                self.executor, timed
+            )
+        finally:
+            self.in_flight -= 1
+
+        self.wait_time.observe(started - submitted)
+        self.hash_time.observe(finished - started)
+        return result
+
+    async def hash(self, password: str) -> str:
+        """
+        Hashes a password with the default PasswordHelper hasher.
+        """
+        return await self._run(self.password_helper.hash, password)
+
+    async def verify_and_update(
+        self, plain_password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Verifies a password, returning an upgraded hash if the hasher is outdated.
+        """
+        return await self._run(
+            self.password_helper.verify_and_update, plain_password, hashed_password
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+            "wait_time_seconds": self.wait_time.snapshot(),
+            "hash_time_seconds": self.hash_time.snapshot(),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+password_service = PasswordService()
+# Shared by every bulk user import in this process, so imports never use the
+# login threads; they wait for a thread rather than fail, each with at most
+# one batch queued
+import_password_service = PasswordService(max_workers=USER_IMPORT_HASH_WORKERS, max_queue=sys.maxsize)
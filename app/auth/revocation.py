@@ -0,0 +1,184 @@
+"""
+Revocation of JWTs before they expire.
+
+Revoked token ids (`jti`) are stored in Redis until the token would have
+expired anyway. Each worker mirrors them in a Bloom filter, filled from Redis
+on start and kept current over pub/sub, so checking a token that was never
+revoked (nearly all of them) costs no network round trip. Only filter hits,
+which are revoked tokens or rare false positives, are confirmed in Redis.
+"""
+
+import asyncio
+import time
+from typing import Dict, Optional
+
+from redis.exceptions import RedisError
+
+from app.config import (
+    JWT_REVOCATION_CAPACITY,
+    JWT_REVOCATION_ERROR_RATE,
+    JWT_REVOCATION_REBUILD_SECONDS,
+)
+from app.logging import logger
+from app.redis import get_redis, redis_pipeline
+from app.utils.bloom import BloomFilter
+
+REVOKED_KEY_PREFIX: str = "jwt:revoked:"
+REVOKED_CHANNEL: str = "jwt:revoked"
+
+
+class TokenRevocations:
+    """
+    Revoked token ids, shared through Redis and mirrored in a local Bloom filter.
+
+    Until the filter has been loaded (and while the subscription is down) every
+    check goes to Redis, so a revocation is never missed.
+
+    Args:
+        capacity (int): Revocations the filter is sized for.
+        error_rate (float): Filter false positive rate at `capacity`.
+        rebuild_seconds (float): How often the filter is rebuilt to drop expired ids.
+    """
+
+    def __init__(
+        self,
+        capacity: int = JWT_REVOCATION_CAPACITY,
+        error_rate: float = JWT_REVOCATION_ERROR_RATE,
+        rebuild_seconds: float = JWT_REVOCATION_REBUILD_SECONDS,
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rebuild_seconds = rebuild_seconds
+        self._filter = BloomFilter(capacity, error_rate)
+        self._synced = False
+        self._listener: Optional[asyncio.Task] = None
+        self.local_checks = 0
+        self.redis_checks = 0
+        self.false_positives = 0
+
+    def _key(self, jti: str) -> str:
+        return f"{REVOKED_KEY_PREFIX}{jti}"
+
+    async def revoke(self, jti: str, expires_at: float) -> None:
+        """
+        Revoke a token on every worker until it expires.
+
+        Args:
+            jti (str): The token's id.
+            expires_at (float): The token's `exp` claim.
+        """
+        ttl = int(expires_at - time.time()) + 1
+        if ttl <= 0:
+            return
+        async with redis_pipeline(transaction=False) as pipe:
+            pipe.set(self._key(jti), "1", ex=ttl)
+            pipe.publish(REVOKED_CHANNEL, jti)
+            await pipe.execute()
+        self._filter.add(jti)
+
+    async def is_revoked(self, jti: str) -> bool:
+        self.start_listener()
+        if self._synced and jti not in self._filter:
+            self.local_checks += 1
+            return False
+
+        self.redis_checks += 1
+        try:
+            redis = await get_redis()
+            revoked = bool(await redis.exists(self._key(jti)))
+        except (RedisError, OSError) as exc:
+            logger.warning("Token revocation check failed: %s", exc)
+            # A filter hit is most likely a real revocation, so refuse it; without
+            # a loaded filter refusing would lock everyone out while Redis is down
+            return self._synced
+        if self._synced and not revoked:
+            self.false_positives += 1
+        return revoked
+
+    async def _rebuild(self) -> None:
+        """
+        Replace the filter with one holding exactly the revocations in Redis.
+        """
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        redis = await get_redis()
+        async for key in redis.scan_iter(match=f"{REVOKED_KEY_PREFIX}*", count=1000):
+            bloom.add(key[len(REVOKED_KEY_PREFIX):])
+        if bloom.count > self.capacity:
+            logger.warning(
+                "%d revoked tokens exceed JWT_REVOCATION_CAPACITY (%d); more checks will reach Redis",
+                bloom.count, self.capacity,
+            )
+        self._filter = bloom
+        self._synced = True
+
+    def start_listener(self) -> None:
+        """
+        Start following revocations for this worker if it isn't already.
+        """
+        if self._listener is not None and not self._listener.done():
+            return
+        try:
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+        except RuntimeError:
+            # No running loop (e.g. CLI scripts); checks go to Redis
+            self._listener = None
+
+    async def stop_listener(self) -> None:
+        if self._listener is None:
+            return
+        self._listener.cancel()
+        try:
+            await self._listener
+        except asyncio.CancelledError:
+            pass
+        except Exception as exc:
+            # It had already stopped on its own, shutdown goes on
+            logger.warning("Token revocation listener had failed: %s", exc)
+        self._listener = None
+        self._synced = False
+
+    async def _listen(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            pubsub = None
+            try:
+                redis = await get_redis()
+                pubsub = redis.pubsub()
+                await pubsub.subscribe(REVOKED_CHANNEL)
+                # Load after subscribing so nothing revoked in between is missed
+                await self._rebuild()
+                rebuild_at = loop.time() + self.rebuild_seconds
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None:
+                        self._filter.add(message["data"])
+                    if loop.time() >= rebuild_at:
+                        await self._rebuild()
+                        rebuild_at = loop.time() + self.rebuild_seconds
+            except asyncio.CancelledError:
+                raise
+            except (RedisError, OSError) as exc:
+                logger.warning("Token revocation listener error: %s", exc)
+            except Exception:
+                # Keep the task alive: is_revoked() would otherwise restart it,
+                # and rescan Redis, on every request
+                logger.exception("Token revocation listener failed")
+            finally:
+                if pubsub is not None:
+                    await pubsub.aclose()
+            # The filter may have missed revocations while the listener was
+            # down: check Redis directly until it is reloaded
+            self._synced = False
+            await asyncio.sleep(1)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "filter_items": self._filter.count,
+            "local_checks": self.local_checks,
+            "redis_checks": self.redis_checks,
+            "false_positives": self.false_positives,
+            "synced": int(self._synced),
+        }
+
+
+token_revocations = TokenRevocations()
@@ -0,0 +1,373 @@
+"""
+Redis-backed cache for JSON route responses.
+
+Routes opt in with the `cached` decorator. Entries are keyed on the route,
+path, query string and optionally the user, live in Redis as msgpack and in a
+small per-process LRU for the hottest keys, and carry an ETag so clients can
+revalidate with `If-None-Match`. Concurrent misses for a key are coalesced:
+within a worker through a shared future, across workers through a short
+Redis lock.
+"""
+
+import asyncio
+import hashlib
+import inspect
+import json
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import quote, urlencode
+
+import msgpack
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from redis.exceptions import RedisError
+
+from app.config import (
+    RESPONSE_CACHE_L1_MAX_SIZE,
+    RESPONSE_CACHE_L1_TTL_SECONDS,
+    RESPONSE_CACHE_LOCK_SECONDS,
+)
+from app.logging import logger
+from app.redis import get_redis_binary
+
+RESPONSE_CACHE_KEY_PREFIX: str = "response_cache:v1:"
+
+_REQUEST_PARAM = "_cache_request"
+
+
+class CachedEntry:
+    """
+    A stored response.
+
+    Args:
+        fresh_until (float): `time.time()` after which the entry is stale.
+        stale_until (float): `time.time()` after which the entry can't be served.
+        etag (str): Quoted entity tag of the body.
+        media_type (str): Response media type.
+        body (bytes): Response body.
+    """
+
+    __slots__ = ("fresh_until", "stale_until", "etag", "media_type", "body")
+
+    def __init__(self, fresh_until: float, stale_until: float, etag: str, media_type: str, body: bytes):
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+        self.etag = etag
+        self.media_type = media_type
+        self.body = body
+
+    def dumps(self) -> bytes:
+        return msgpack.packb(
+            [self.fresh_until, self.stale_until, self.etag, self.media_type, self.body],
+            use_bin_type=True,
+        )
+
+    @classmethod
+    def loads(cls, payload: bytes) -> "CachedEntry":
+        return cls(*msgpack.unpackb(payload, raw=False))
+
+
+class ResponseCache:
+    """
+    Response cache shared by all decorated routes in a worker.
+
+    Args:
+        l1_max_size (int): Entries kept in the in-process tier.
+        l1_ttl (float): Longest an entry is served from the in-process tier.
+        lock_timeout (float): How long a miss waits for another worker's computation.
+    """
+
+    def __init__(
+        self,
+        l1_max_size: int = RESPONSE_CACHE_L1_MAX_SIZE,
+        l1_ttl: float = RESPONSE_CACHE_L1_TTL_SECONDS,
+        lock_timeout: float = RESPONSE_CACHE_LOCK_SECONDS,
+    ):
+        self.l1_max_size = l1_max_size
+        self.l1_ttl = l1_ttl
+        self.lock_timeout = lock_timeout
+        self._local: "OrderedDict[str, Tuple[float, CachedEntry]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.counters: Dict[str, int] = {
+            "hits_local": 0,
+            "hits_redis": 0,
+            "hits_stale": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "not_modified": 0,
+            "errors": 0,
+        }
+
+    def key(self, namespace: str, request: Request, user_id: Any = None) -> str:
+        """
+        Cache key for a request: namespace plus a digest of path, query and user.
+        """
+        # Re-encoded, so a decoded "&" or "=" inside a value can't pose as a separator
+        query = urlencode(sorted(request.query_params.multi_items()))
+        digest = hashlib.sha1(f"{quote(request.url.path)}?{query}|{user_id}".encode()).hexdigest()
+        return f"{RESPONSE_CACHE_KEY_PREFIX}{namespace}:{digest}"
+
+    def _local_get(self, key: str) -> Optional[CachedEntry]:
+        item = self._local.get(key)
+        if item is None:
+            return None
+        expires_at, entry = item
+        if expires_at < time.monotonic():
+            self._local.pop(key, None)
+            return None
+        self._local.move_to_end(key)
+        return entry
+
+    def _local_set(self, key: str, entry: CachedEntry) -> None:
+        ttl = min(self.l1_ttl, entry.fresh_until - time.time())
+        if self.l1_max_size <= 0 or ttl <= 0:
+            return
+        self._local[key] = (time.monotonic() + ttl, entry)
+        self._local.move_to_end(key)
+        while len(self._local) > self.l1_max_size:
+            self._local.popitem(last=False)
+
+    async def _redis_get(self, key: str) -> Optional[CachedEntry]:
+        try:
+            redis = await get_redis_binary()
+            payload = await redis.get(key)
+        except (RedisError, OSError) as exc:
+            self.counters["errors"] += 1
+            logger.warning("Response cache: Redis read failed: %s", exc)
+            return None
+        return None if payload is None else CachedEntry.loads(payload)
+
+    async def _store(self, key: str, entry: CachedEntry) -> None:
+        self._local_set(key, entry)
+        try:
+            redis = await get_redis_binary()
+            ttl_ms = max(1, int((entry.stale_until - time.time()) * 1000))
+            await redis.set(key, entry.dumps(), px=ttl_ms)
+        except (RedisError, OSError) as exc:
+            self.counters["errors"] += 1
+            logger.warning("Response cache: Redis write failed: %s", exc)
+
+    async def _compute_once(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Optional[CachedEntry]]],
+        wait: bool = True,
+    ) -> Optional[CachedEntry]:
+        """
+        Run `compute` unless another worker already is. Then wait for that
+        worker's result, or return None straight away if `wait` is False.
+        """
+        lock_key = f"{key}:lock"
+        token = uuid.uuid4().hex
+        try:
+            redis = await get_redis_binary()
+            locked = await redis.set(lock_key, token, nx=True, px=int(self.lock_timeout * 1000))
+        except (RedisError, OSError) as exc:
+            logger.warning("Response cache: lock failed, computing anyway: %s", exc)
+            return await compute()
+
+        if not locked:
+            if not wait:
+                return None
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+                entry = await self._redis_get(key)
+                if entry is not None and entry.fresh_until > time.time():
+                    self.counters["coalesced"] += 1
+                    self._local_set(key, entry)
+                    return entry
+            return await compute()
+
+        try:
+            return await compute()
+        finally:
+            try:
+                if await redis.get(lock_key) == token.encode():
+                    await redis.delete(lock_key)
+            except (RedisError, OSError):
+                pass
+
+    async def _single_flight(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Optional[CachedEntry]]],
+        wait: bool = True,
+    ) -> Optional[CachedEntry]:
+        """
+        Coalesce concurrent computations of `key` in this worker into one.
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            self.counters["coalesced"] += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            entry = await self._compute_once(key, compute, wait)
+        except BaseException as exc:
+            if isinstance(exc, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(exc)
+                # Waiters re-raise it; don't warn when there are none
+                future.exception()
+            raise
+        else:
+            future.set_result(entry)
+            return entry
+        finally:
+            del self._inflight[key]
+
+    async def invalidate(self, namespace: str) -> None:
+        """
+        Drop every entry of a namespace in this worker's tier and in Redis.
+
+        Other workers' in-process copies expire within the L1 TTL.
+        """
+        prefix = f"{RESPONSE_CACHE_KEY_PREFIX}{namespace}:"
+        for key in [key for key in self._local if key.startswith(prefix)]:
+            del self._local[key]
+        try:
+            redis = await get_redis_binary()
+            async for key in redis.scan_iter(match=f"{prefix}*", count=500):
+                await redis.delete(key)
+        except (RedisError, OSError) as exc:
+            self.counters["errors"] += 1
+            logger.warning("Response cache: invalidation of %s failed: %s", namespace, exc)
+
+    def stats(self) -> Dict[str, int]:
+        return {**self.counters, "local_entries": len(self._local)}
+
+    def _respond(self, request: Request, entry: CachedEntry, state: str, private: bool) -> Response:
+        remaining = max(0, int(entry.fresh_until - time.time()))
+        headers = {
+            "ETag": entry.etag,
+            "Cache-Control": f"{'private, ' if private else ''}max-age={remaining}",
+            "X-Cache": state,
+        }
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and entry.etag in (tag.strip() for tag in if_none_match.split(",")):
+            self.counters["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type=entry.media_type, headers=headers)
+
+    def cached(
+        self,
+        ttl: float,
+        stale_ttl: float = 0,
+        user_param: Optional[str] = None,
+        namespace: Optional[str] = None,
+    ) -> Callable:
+        """
+        Cache a GET route's JSON response.
+
+        The route's return value is JSON encoded here, so `response_model`
+        filtering does not apply to cached routes; return exactly what should
+        be sent. Only 200 responses are cached.
+
+        Args:
+            ttl (float): Seconds a response is fresh.
+            stale_ttl (float): Further seconds a stale response is served to
+                other requests while one request refreshes it.
+            user_param (Optional[str]): Name of the route argument holding the
+                current user, to cache per user.
+            namespace (Optional[str]): Key namespace, defaults to the route function's name.
+        """
+
+        def decorator(func: Callable) -> Callable:
+            signature = inspect.signature(func)
+            request_param = next(
+                (name for name, param in signature.parameters.items() if param.annotation is Request),
+                None,
+            )
+            key_namespace = namespace or f"{func.__module__}.{func.__qualname__}"
+
+            @wraps(func)
+            async def wrapper(*args: Any, **kwargs: Any) -> Any:
+                request: Request = kwargs[request_param] if request_param else kwargs.pop(_REQUEST_PARAM)
+                if request.method not in ("GET", "HEAD"):
+                    return await func(*args, **kwargs)
+
+                user_id = getattr(kwargs.get(user_param), "id", None) if user_param else None
+                key = self.key(key_namespace, request, user_id)
+                passthrough: Dict[str, Any] = {}
+
+                async def compute() -> Optional[CachedEntry]:
+                    result = await func(*args, **kwargs)
+                    if isinstance(result, Response):
+                        if result.status_code != 200 or not hasattr(result, "body"):
+                            passthrough["response"] = result
+                            return None
+                        body, media_type = bytes(result.body), result.media_type or "application/json"
+                    else:
+                        body = json.dumps(
+                            jsonable_encoder(result),
+                            ensure_ascii=False,
+                            allow_nan=False,
+                            separators=(",", ":"),
+                        ).encode()
+                        media_type = "application/json"
+                    now = time.time()
+                    entry = CachedEntry(
+                        fresh_until=now + ttl,
+                        stale_until=now + ttl + stale_ttl,
+                        etag=f'"{hashlib.sha1(body).hexdigest()}"',
+                        media_type=media_type,
+                        body=body,
+                    )
+                    await self._store(key, entry)
+                    return entry
+
+                entry, source = self._local_get(key), "hits_local"
+                if entry is None:
+                    entry, source = await self._redis_get(key), "hits_redis"
+
+                now = time.time()
+                if entry is not None and now < entry.fresh_until:
+                    self.counters[source] += 1
+                    state = "HIT"
+                    if source == "hits_redis":
+                        self._local_set(key, entry)
+                elif entry is not None and now < entry.stale_until:
+                    # One request refreshes, everyone else gets the stale copy meanwhile.
+                    # Refreshing inline keeps the route's dependencies (e.g. its
+                    # DB session) alive for the computation.
+                    refreshed = None
+                    if key not in self._inflight:
+                        refreshed = await self._single_flight(key, compute, wait=False)
+                    if "response" in passthrough:
+                        return passthrough["response"]
+                    if refreshed is not None:
+                        self.counters["misses"] += 1
+                        entry, state = refreshed, "REVALIDATED"
+                    else:
+                        self.counters["hits_stale"] += 1
+                        state = "STALE"
+                else:
+                    self.counters["misses"] += 1
+                    state = "MISS"
+                    entry = await self._single_flight(key, compute)
+                    if entry is None:
+                        # Not cacheable (e.g. an error status) or a coalesced caller
+                        # of one; run the route for this request.
+                        return passthrough.get("response") or await func(*args, **kwargs)
+
+                return self._respond(request, entry, state, private=user_param is not None)
+
+            if request_param is None:
+                extra = inspect.Parameter(_REQUEST_PARAM, inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+                wrapper.__signature__ = signature.replace(
+                    parameters=[*signature.parameters.values(), extra]
+                )
+            return wrapper
+
+        return decorator
+
+
+response_cache = ResponseCache()
+cached = response_cache.cached
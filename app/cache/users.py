@@ -0,0 +1,275 @@
+"""
+Two-tier cache for user rows.
+
+Tier one is a per-process LRU with a short TTL, tier two is a shared Redis
+tier holding a compact JSON array of the row's column values. Invalidations
+are published on a Redis channel so every worker drops its local copy.
+"""
+
+import asyncio
+import enum
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from redis.exceptions import RedisError
+from sqlalchemy import DateTime, Enum, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.config import (
+    USER_CACHE_L1_TTL_SECONDS,
+    USER_CACHE_L1_MAX_SIZE,
+    USER_CACHE_REDIS_TTL_SECONDS,
+)
+from app.logging import logger
+from app.redis import get_redis
+
+USER_CACHE_KEY_PREFIX: str = "user_cache:v1:"
+USER_CACHE_CHANNEL: str = "user_cache:invalidate"
+
+Codec = Tuple[str, Callable[[Any], Any], Callable[[Any], Any]]
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _column_codec(key: str, column_type: Any) -> Codec:
+    """
+    Build the (key, encode, decode) triple for a single mapped column.
+    """
+    if isinstance(column_type, Enum) and column_type.enum_class is not None:
+        enum_class = column_type.enum_class
+
+        def encode_enum(value: Any) -> Any:
+            if value is None:
+                return None
+            return value.value if isinstance(value, enum.Enum) else value
+
+        def decode_enum(value: Any) -> Any:
+            return None if value is None else enum_class(value)
+
+        return key, encode_enum, decode_enum
+
+    if isinstance(column_type, DateTime):
+        def encode_datetime(value: Any) -> Any:
+            return None if value is None else value.isoformat()
+
+        def decode_datetime(value: Any) -> Any:
+            return None if value is None else datetime.fromisoformat(value)
+
+        return key, encode_datetime, decode_datetime
+
+    return key, _identity, _identity
+
+
+class UserCache:
+    """
+    Read-through cache of user rows keyed by primary key.
+
+    Cached rows are handed back as fresh instances merged into the caller's
+    session without emitting SQL, so they behave like rows loaded from the
+    database (updates and deletes through fastapi-users keep working).
+
+    Args:
+        model: The mapped user class.
+        l1_ttl (float): Seconds an entry lives in the in-process tier.
+        l1_max_size (int): Maximum number of entries in the in-process tier.
+        redis_ttl (int): Seconds an entry lives in the Redis tier.
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        l1_ttl: float = USER_CACHE_L1_TTL_SECONDS,
+        l1_max_size: int = USER_CACHE_L1_MAX_SIZE,
+        redis_ttl: int = USER_CACHE_REDIS_TTL_SECONDS,
+    ):
+        self.model = model
+        self.l1_ttl = l1_ttl
+        self.l1_max_size = l1_max_size
+        self.redis_ttl = redis_ttl
+        self._local: "OrderedDict[int, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._changed_at: Dict[int, float] = {}
+        self._codecs: Optional[List[Codec]] = None
+        self._listener: Optional[asyncio.Task] = None
+        self.hits_local = 0
+        self.hits_redis = 0
+        self.misses = 0
+
+    @property
+    def codecs(self) -> List[Codec]:
+        # Resolved lazily so the mapper is fully configured first.
+        if self._codecs is None:
+            self._codecs = [
+                _column_codec(attr.key, attr.columns[0].type)
+                for attr in inspect(self.model).column_attrs
+            ]
+        return self._codecs
+
+    def _key(self, user_id: Any) -> str:
+        return f"{USER_CACHE_KEY_PREFIX}{user_id}"
+
+    def dumps(self, values: Dict[str, Any]) -> str:
+        """
+        Encode a row as a JSON array ordered like the mapped columns.
+        """
+        return json.dumps(
+            [encode(values[key]) for key, encode, _ in self.codecs],
+            separators=(",", ":"),
+        )
+
+    def loads(self, payload: str) -> Dict[str, Any]:
+        """
+        Decode a payload produced by `dumps` back into column values.
+        """
+        return {
+            key: decode(value)
+            for (key, _, decode), value in zip(self.codecs, json.loads(payload))
+        }
+
+    def _local_get(self, user_id: Any) -> Optional[Dict[str, Any]]:
+        entry = self._local.get(user_id)
+        if entry is None:
+            return None
+        expires_at, values = entry
+        if expires_at < time.monotonic():
+            self._local.pop(user_id, None)
+            return None
+        self._local.move_to_end(user_id)
+        return values
+
+    def _local_set(self, user_id: Any, values: Dict[str, Any]) -> None:
+        self._local[user_id] = (time.monotonic() + self.l1_ttl, values)
+        self._local.move_to_end(user_id)
+        while len(self._local) > self.l1_max_size:
+            self._local.popitem(last=False)
+
+    def _mark_changed(self, user_id: int) -> None:
+        self._local.pop(user_id, None)
+        self._changed_at.pop(user_id, None)
+        self._changed_at[user_id] = time.time()
+        while len(self._changed_at) > self.l1_max_size:
+            del self._changed_at[next(iter(self._changed_at))]
+
+    def changed_since(self, user_id: Any, timestamp: float) -> bool:
+        """
+        Whether this worker has seen an invalidation for the user after `timestamp`.
+
+        Args:
+            user_id: The user id.
+            timestamp (float): A `time.time()` value.
+
+        Returns:
+            bool: True if the user changed after the timestamp.
+        """
+        return self._changed_at.get(user_id, 0) > timestamp
+
+    async def _build(self, session: AsyncSession, values: Dict[str, Any]) -> Any:
+        user = self.model(**values)
+        make_transient_to_detached(user)
+        return await session.merge(user, load=False)
+
+    async def get(self, session: AsyncSession, user_id: Any) -> Optional[Any]:
+        """
+        Return the cached user attached to `session`, or None on a miss.
+        """
+        self.start_listener()
+
+        values = self._local_get(user_id)
+        if values is not None:
+            self.hits_local += 1
+            return await self._build(session, values)
+
+        try:
+            redis = await get_redis()
+            payload = await redis.get(self._key(user_id))
+        except (RedisError, OSError) as exc:
+            logger.warning("User cache: Redis read failed: %s", exc)
+            payload = None
+
+        if payload is None:
+            self.misses += 1
+            return None
+
+        self.hits_redis += 1
+        values = self.loads(payload)
+        self._local_set(user_id, values)
+        return await self._build(session, values)
+
+    async def set(self, user: Any) -> None:
+        """
+        Store a freshly loaded user in both tiers.
+        """
+        values = {key: getattr(user, key) for key, _, _ in self.codecs}
+        self._local_set(user.id, values)
+        try:
+            redis = await get_redis()
+            await redis.set(self._key(user.id), self.dumps(values), ex=self.redis_ttl)
+        except (RedisError, OSError) as exc:
+            logger.warning("User cache: Redis write failed: %s", exc)
+
+    async def invalidate(self, user_id: Any) -> None:
+        """
+        Drop a user from both tiers and tell the other workers to do the same.
+        """
+        self._mark_changed(user_id)
+        try:
+            redis = await get_redis()
+            await redis.delete(self._key(user_id))
+            await redis.publish(USER_CACHE_CHANNEL, str(user_id))
+        except (RedisError, OSError) as exc:
+            logger.warning("User cache: Redis invalidation failed for %s: %s", user_id, exc)
+
+    def start_listener(self) -> None:
+        """
+        Start the invalidation subscriber for this worker if it isn't running.
+        """
+        if self._listener is not None and not self._listener.done():
+            return
+        try:
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+        except RuntimeError:
+            # No running loop (e.g. CLI scripts); local TTL bounds staleness.
+            self._listener = None
+
+    async def stop_listener(self) -> None:
+        """
+        Cancel the invalidation subscriber.
+        """
+        if self._listener is None:
+            return
+        self._listener.cancel()
+        try:
+            await self._listener
+        except asyncio.CancelledError:
+            pass
+        self._listener = None
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = None
+            try:
+                redis = await get_redis()
+                pubsub = redis.pubsub()
+                await pubsub.subscribe(USER_CACHE_CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    try:
+                        self._mark_changed(int(message["data"]))
+                    except ValueError:
+                        logger.warning("User cache: bad invalidation message %s", message["data"])
+            except asyncio.CancelledError:
+                raise
+            except (RedisError, OSError) as exc:
+                # Drop everything we might have missed while disconnected.
+                self._local.clear()
+                logger.warning("User cache: invalidation listener error: %s", exc)
+                await asyncio.sleep(1)
+            finally:
+                if pubsub is not None:
+                    await pubsub.aclose()
@@ -1,18 +1,376 @@
-from celery import Celery
-from app.config import REDIS_URL
-
-# Configure Celery for the backend
-celery = Celery(
-    "backend",
-    broker=REDIS_URL,
-    backend=REDIS_URL,
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional, Sequence, Set, Tuple
+from celery import states
+from redis.exceptions import RedisError
+from app.config import (
+    REDIS_URL,
+    CELERY_ENQUEUE_WORKERS,
+    CELERY_SERIALIZER,
+    CELERY_COMPRESSION_THRESHOLD,
+    CELERY_RESULT_EXPIRES,
 )
+from app.logging import logger
+from app.redis import get_redis_binary
+
+if TYPE_CHECKING:
+    from celery import Celery
+
+# Created on first use: importing Celery, kombu and the serializer adds
+# about 0.2s to startup that requests never touching a task don't need
+celery_app: Optional["Celery"] = None
+_celery_lock = threading.Lock()
+
+
+def get_celery() -> "Celery":
+    """
+    The Celery client used to enqueue tasks and read results, configured once.
+
+    Returns:
+        Celery: The shared client.
+    """
+    global celery_app
+    if celery_app is not None:
+        return celery_app
+    # Enqueue threads may race to create it
+    with _celery_lock:
+        if celery_app is None:
+            from celery import Celery
+            from celery_worker.routing import ROUTING_CONFIG
+            from celery_worker.serialization import register_serializer, SERIALIZER_NAME
+
+            register_serializer(CELERY_COMPRESSION_THRESHOLD)
+
+            # Configure Celery for the backend
+            celery = Celery(
+                "backend",
+                broker=REDIS_URL,
+                backend=REDIS_URL,
+            )
+
+            celery.conf.update(
+                task_serializer=CELERY_SERIALIZER,
+                accept_content=["json", SERIALIZER_NAME],
+                result_serializer=CELERY_SERIALIZER,
+                result_accept_content=["json", SERIALIZER_NAME],
+                result_expires=CELERY_RESULT_EXPIRES,
+                # Same queues and routes as the worker, so send_task by name lands on the right queue
+                **ROUTING_CONFIG,
+            )
+
+            # Keep enough pooled producers for every enqueue thread
+            celery.conf.broker_pool_limit = max(celery.conf.broker_pool_limit or 0, CELERY_ENQUEUE_WORKERS)
+            celery_app = celery
+    return celery_app
+
+
+# Publishing does blocking kombu/Redis socket I/O, so it runs on its own threads.
+# Created on first use and dropped by close_enqueue(), so a later lifespan in
+# the same process (tests, an embedding app) gets a fresh one
+enqueue_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_enqueue_executor() -> ThreadPoolExecutor:
+    """
+    The threads tasks are published from, started on first use.
+    """
+    global enqueue_executor
+    if enqueue_executor is None:
+        enqueue_executor = ThreadPoolExecutor(
+            max_workers=CELERY_ENQUEUE_WORKERS,
+            thread_name_prefix="celery-enqueue",
+        )
+    return enqueue_executor
+
+
+HELLO_WORLD_TASK = "celery_worker.tasks.hello_world"
+
+TaskCall = Tuple[Sequence[Any], Dict[str, Any]]
+
+
+def _send_task(name: str, args: Sequence[Any], kwargs: Dict[str, Any], options: Dict[str, Any]) -> str:
+    return get_celery().send_task(name, args=args, kwargs=kwargs, **options).id
+
+
+def _send_tasks(name: str, calls: Sequence[TaskCall], options: Dict[str, Any]) -> List[str]:
+    celery = get_celery()
+    # One pooled producer (and broker connection) for the whole batch
+    with celery.producer_or_acquire() as producer:
+        return [
+            celery.send_task(name, args=args, kwargs=kwargs, producer=producer, **options).id
+            for args, kwargs in calls
+        ]
+
+
+async def enqueue(
+    name: str,
+    args: Optional[Sequence[Any]] = None,
+    kwargs: Optional[Dict[str, Any]] = None,
+    **options: Any,
+) -> str:
+    """
+    Enqueues a task by name without blocking the event loop.
+
+    Returns:
+        str: The task id.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_enqueue_executor(), partial(_send_task, name, args or (), kwargs or {}, options)
+    )
+
+
+async def enqueue_many(name: str, calls: Sequence[TaskCall], **options: Any) -> List[str]:
+    """
+    Enqueues one task per (args, kwargs) pair over a single pooled producer.
+
+    Returns:
+        List[str]: The task ids, in the order of `calls`.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_enqueue_executor(), partial(_send_tasks, name, calls, options)
+    )
+
+
+def _connect_producer() -> None:
+    with get_celery().producer_or_acquire() as producer:
+        producer.connection.ensure_connection(max_retries=1)
+
+
+async def warm_up_enqueue() -> None:
+    """
+    Opens a pooled broker connection so the first enqueue doesn't pay for it.
+    """
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(get_enqueue_executor(), _connect_producer)
+
+
+def close_enqueue() -> None:
+    """
+    Waits for pending publishes, then closes the broker connection pool.
+    """
+    global enqueue_executor
+    executor, enqueue_executor = enqueue_executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+    if celery_app is not None:
+        celery_app.close()
 
 
 async def enqueue_hello_world():
     """
     Enqueues the 'hello_world' task defined in celery_worker.
     """
-    task_name = "celery_worker.tasks.hello_world"
-    task = celery.send_task(task_name)
-    return task.id
+    return await enqueue(HELLO_WORLD_TASK)
+
+
+async def enqueue_hello_world_bulk(count: int) -> List[str]:
+    """
+    Enqueues `count` 'hello_world' tasks in one batch on the bulk queue.
+    """
+    from celery_worker.routing import QUEUE_BULK, PRIORITY_LOW
+
+    return await enqueue_many(
+        HELLO_WORLD_TASK, [((), {})] * count, queue=QUEUE_BULK, priority=PRIORITY_LOW
+    )
+
+
+# Seconds between keepalives (and fallback status re-reads) on status streams
+STATUS_HEARTBEAT_SECONDS: float = 15.0
+# Reported for result keys holding something the backend can't decode
+STATUS_UNKNOWN = "UNKNOWN"
+
+
+def task_key(task_id: str) -> str:
+    """
+    Result backend key for a task; the Redis backend also publishes results on it.
+    """
+    return get_celery().backend.get_key_for_task(task_id).decode()
+
+
+def decode_task_meta(task_id: str, payload: Optional[Any]) -> Dict[str, Any]:
+    """
+    Turns a raw result backend payload into a status dictionary.
+    """
+    if payload is None:
+        return {"task_id": task_id, "status": states.PENDING, "result": None, "date_done": None}
+    # Loaded with the Celery client by get_celery() below, not at startup
+    from kombu.exceptions import KombuError
+
+    try:
+        meta = get_celery().backend.decode(payload)
+        status = meta["status"]
+    except (KombuError, ValueError, TypeError, KeyError) as exc:
+        # One bad key must not fail the lookup of every other task
+        logger.warning("Undecodable result for task %s: %s", task_id, exc)
+        return {"task_id": task_id, "status": STATUS_UNKNOWN, "result": None, "date_done": None}
+    return {
+        "task_id": task_id,
+        "status": status,
+        "result": meta.get("result"),
+        "date_done": meta.get("date_done"),
+    }
+
+
+async def get_task_statuses(task_ids: Sequence[str]) -> List[Dict[str, Any]]:
+    """
+    Looks up the status of many tasks with a single MGET.
+    """
+    if not task_ids:
+        return []
+    redis = await get_redis_binary()
+    payloads = await redis.mget([task_key(task_id) for task_id in task_ids])
+    return [
+        decode_task_meta(task_id, payload)
+        for task_id, payload in zip(task_ids, payloads)
+    ]
+
+
+class TaskStatusHub:
+    """
+    Shares one Redis pub/sub connection per worker between all status streams.
+
+    Each stream registers a queue for the result keys it cares about; a single
+    reader task fans published results out to those queues.
+    """
+
+    def __init__(self):
+        self._listeners: Dict[str, Set[asyncio.Queue]] = {}
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    async def subscribe(self, keys: Sequence[str], queue: asyncio.Queue) -> None:
+        async with self._lock:
+            new_keys = [key for key in keys if key not in self._listeners]
+            for key in keys:
+                self._listeners.setdefault(key, set()).add(queue)
+            if self._pubsub is None:
+                redis = await get_redis_binary()
+                self._pubsub = redis.pubsub()
+            if new_keys:
+                await self._pubsub.subscribe(*new_keys)
+            if self._reader is None or self._reader.done():
+                self._reader = asyncio.create_task(self._read())
+
+    async def unsubscribe(self, keys: Sequence[str], queue: asyncio.Queue) -> None:
+        async with self._lock:
+            idle_keys = []
+            for key in keys:
+                listeners = self._listeners.get(key)
+                if listeners is None:
+                    continue
+                listeners.discard(queue)
+                if not listeners:
+                    del self._listeners[key]
+                    idle_keys.append(key)
+            if idle_keys and self._pubsub is not None:
+                try:
+                    await self._pubsub.unsubscribe(*idle_keys)
+                except (RedisError, OSError) as exc:
+                    logger.warning("Task status hub: unsubscribe failed: %s", exc)
+
+    async def close(self) -> None:
+        """
+        Stops the reader and closes the pub/sub connection.
+        """
+        async with self._lock:
+            if self._reader is not None:
+                self._reader.cancel()
+                try:
+                    await self._reader
+                except asyncio.CancelledError:
+                    pass
+                self._reader = None
+            if self._pubsub is not None:
+                await self._pubsub.aclose()
+                self._pubsub = None
+
+    async def _read(self) -> None:
+        # Runs for the life of the worker; get_message just sleeps while idle
+        while True:
+            try:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+            except asyncio.CancelledError:
+                raise
+            except (RedisError, OSError) as exc:
+                # Streams fall back to periodic MGETs until we reconnect
+                logger.warning("Task status hub: pub/sub error: %s", exc)
+                await asyncio.sleep(1)
+                async with self._lock:
+                    try:
+                        await self._pubsub.aclose()
+                        redis = await get_redis_binary()
+                        self._pubsub = redis.pubsub()
+                        if self._listeners:
+                            await self._pubsub.subscribe(*self._listeners)
+                    except (RedisError, OSError) as exc:
+                        logger.warning("Task status hub: resubscribe failed: %s", exc)
+                continue
+            if message is None:
+                continue
+            channel = message["channel"].decode()
+            for queue in self._listeners.get(channel, ()):
+                queue.put_nowait((channel, message["data"]))
+
+
+status_hub = TaskStatusHub()
+
+
+async def stream_task_statuses(
+    task_ids: Sequence[str],
+    timeout: float,
+) -> AsyncIterator[Optional[Dict[str, Any]]]:
+    """
+    Yields task status changes as they are published until every task is ready.
+
+    Yields None as a keepalive when nothing changed for STATUS_HEARTBEAT_SECONDS.
+    Stops after `timeout` seconds even if some tasks are still running.
+    """
+    keys = {task_key(task_id): task_id for task_id in task_ids}
+    queue: asyncio.Queue = asyncio.Queue()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    last_status: Dict[str, str] = {}
+
+    await status_hub.subscribe(list(keys), queue)
+    try:
+        pending = set(task_ids)
+
+        def changed(status: Dict[str, Any]) -> bool:
+            if last_status.get(status["task_id"]) == status["status"]:
+                return False
+            last_status[status["task_id"]] = status["status"]
+            if status["status"] in states.READY_STATES:
+                pending.discard(status["task_id"])
+            return True
+
+        # Read current state after subscribing so no transition is missed
+        for status in await get_task_statuses(task_ids):
+            if changed(status):
+                yield status
+
+        while pending:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                key, payload = await asyncio.wait_for(
+                    queue.get(), min(remaining, STATUS_HEARTBEAT_SECONDS)
+                )
+            except asyncio.TimeoutError:
+                for status in await get_task_statuses(sorted(pending)):
+                    if changed(status):
+                        yield status
+                yield None
+                continue
+            status = decode_task_meta(keys[key], payload)
+            if changed(status):
+                yield status
+    finally:
+        await status_hub.unsubscribe(list(keys), queue)
@@ -1,6 +1,9 @@
 import os
+import re
+from functools import lru_cache
+from typing import Any, Dict
 from dotenv import load_dotenv
-from app.logging import logger
+from app.logging import logger, configure_logging
 from app.utils.general import string_snippet
 
 # Constants
@@ -19,6 +22,17 @@ if ENVIRONMENT == "dev" and not IS_DOCKER:
 else:
     logger.info(f"Running in {ENVIRONMENT} environment; loading environment variables from Dockerfile.")
 
+# Logging, applied before anything else is logged
+LOG_LEVEL: str = os.getenv("LOG_LEVEL", "DEBUG")
+# "text" or "json"
+LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text")
+# Per-logger levels, e.g. "sqlalchemy.engine=INFO,httpx=WARNING"
+LOG_LEVELS: str = os.getenv("LOG_LEVELS", "")
+LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Max records per second per message below WARNING; 0 disables sampling
+LOG_RATE_LIMIT: int = int(os.getenv("LOG_RATE_LIMIT", "50"))
+configure_logging(LOG_LEVEL, LOG_FORMAT, LOG_LEVELS, LOG_QUEUE_SIZE, LOG_RATE_LIMIT)
+
 # Environment variables
 DATABASE_URL: str = os.getenv("DATABASE_URL")
 TEST_DATABASE_URL: str = os.getenv("TEST_DATABASE_URL")
@@ -27,6 +41,136 @@ SECRET_KEY: str = os.getenv("SECRET_KEY")
 AUTH_SECRET_KEY: str = os.getenv("AUTH_SECRET_KEY")
 IS_TESTING: bool = os.getenv("TESTING") == "true"
 REDIS_URL: str = os.getenv("REDIS_URL")
+# Redis connection pool, per client (text and binary)
+REDIS_MAX_CONNECTIONS: int = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+# Seconds to wait for a free pooled connection before failing
+REDIS_POOL_TIMEOUT: float = float(os.getenv("REDIS_POOL_TIMEOUT", "2"))
+REDIS_SOCKET_TIMEOUT: float = float(os.getenv("REDIS_SOCKET_TIMEOUT", "5"))
+REDIS_SOCKET_CONNECT_TIMEOUT: float = float(os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT", "2"))
+# PING connections idle for longer than this before reuse; 0 disables
+REDIS_HEALTH_CHECK_INTERVAL: int = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))
+# Total Redis connections shared by all workers and both clients; 0 disables per-worker derivation
+REDIS_MAX_TOTAL_CONNECTIONS: int = int(os.getenv("REDIS_MAX_TOTAL_CONNECTIONS", "0"))
+# Optional comma separated read replica URLs
+DATABASE_REPLICA_URLS: list = [url for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url]
+# Seconds a failing replica is skipped before it is tried again
+DB_REPLICA_RETRY_SECONDS: float = float(os.getenv("DB_REPLICA_RETRY_SECONDS", "30"))
+
+# Database connection pool (per process unless DB_MAX_CONNECTIONS is set)
+DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+# Total connection budget shared by all workers; 0 disables per-worker derivation
+DB_MAX_CONNECTIONS: int = int(os.getenv("DB_MAX_CONNECTIONS", "0"))
+# Number of server worker processes (same variable uvicorn reads, app.server sets it)
+WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+# Production server (python -m app.server)
+SERVER_HOST: str = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT: int = int(os.getenv("SERVER_PORT", "5000"))
+# Pending connections the kernel queues before refusing new ones
+SERVER_BACKLOG: int = int(os.getenv("SERVER_BACKLOG", "2048"))
+# Keep longer than the load balancer's idle timeout so it never reuses a closed connection
+SERVER_KEEP_ALIVE_SECONDS: int = int(os.getenv("SERVER_KEEP_ALIVE_SECONDS", "75"))
+# Connections per worker before answering 503; 0 disables
+SERVER_LIMIT_CONCURRENCY: int = int(os.getenv("SERVER_LIMIT_CONCURRENCY", "1000"))
+# Requests a worker serves before it is replaced, to contain leaks; 0 disables
+SERVER_LIMIT_MAX_REQUESTS: int = int(os.getenv("SERVER_LIMIT_MAX_REQUESTS", "50000"))
+# Up to this many extra requests per worker, so workers aren't all replaced at once
+SERVER_LIMIT_MAX_REQUESTS_JITTER: int = int(os.getenv("SERVER_LIMIT_MAX_REQUESTS_JITTER", "5000"))
+
+# Startup warm-up and shutdown drain
+WARMUP_DB_CONNECTIONS: int = int(os.getenv("WARMUP_DB_CONNECTIONS", "2"))
+WARMUP_REDIS_CONNECTIONS: int = int(os.getenv("WARMUP_REDIS_CONNECTIONS", "2"))
+# Longest shutdown waits for in-flight requests before closing pools
+SHUTDOWN_DRAIN_SECONDS: float = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "25"))
+# How long /ready reuses its database and Redis check results
+HEALTH_CHECK_CACHE_SECONDS: float = float(os.getenv("HEALTH_CHECK_CACHE_SECONDS", "2"))
+
+# Celery enqueueing from the API
+CELERY_ENQUEUE_WORKERS: int = int(os.getenv("CELERY_ENQUEUE_WORKERS", "4"))
+CELERY_BULK_MAX_TASKS: int = int(os.getenv("CELERY_BULK_MAX_TASKS", "1000"))
+# Longest a task status stream stays open, in seconds
+CELERY_STATUS_STREAM_TIMEOUT: float = float(os.getenv("CELERY_STATUS_STREAM_TIMEOUT", "300"))
+# Must match the worker's settings; "json" or "msgpack_zlib"
+CELERY_SERIALIZER: str = os.getenv("CELERY_SERIALIZER", "msgpack_zlib")
+CELERY_COMPRESSION_THRESHOLD: int = int(os.getenv("CELERY_COMPRESSION_THRESHOLD", "1024"))
+CELERY_RESULT_EXPIRES: int = int(os.getenv("CELERY_RESULT_EXPIRES", "86400"))
+
+# Bearer token required on /metrics; unset leaves it open (restrict it at the proxy)
+METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "")
+
+# SQL instrumentation
+SQL_SLOW_QUERY_SECONDS: float = float(os.getenv("SQL_SLOW_QUERY_SECONDS", "0.2"))
+# Flag requests running the same statement more than this many times; 0 disables
+SQL_N_PLUS_ONE_THRESHOLD: int = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "10"))
+# Per-request query stats in response headers, on by default in dev only
+SQL_DEBUG_HEADERS: bool = os.getenv("SQL_DEBUG_HEADERS", str(ENVIRONMENT == "dev")).lower() == "true"
+
+# Sampling profiler, switched on from the admin panel
+PROFILER_INTERVAL_SECONDS: float = float(os.getenv("PROFILER_INTERVAL_SECONDS", "0.005"))
+# Distinct stacks kept per worker between flushes, and in the shared Redis hash
+PROFILER_MAX_STACKS: int = int(os.getenv("PROFILER_MAX_STACKS", "5000"))
+# How often workers pick up profiler settings and flush their samples
+PROFILER_SYNC_SECONDS: float = float(os.getenv("PROFILER_SYNC_SECONDS", "2"))
+# Profiling switches itself off after this long
+PROFILER_MAX_SECONDS: int = int(os.getenv("PROFILER_MAX_SECONDS", "600"))
+
+# User cache (in-process LRU in front of a shared Redis tier)
+USER_CACHE_L1_TTL_SECONDS: float = float(os.getenv("USER_CACHE_L1_TTL_SECONDS", "10"))
+USER_CACHE_L1_MAX_SIZE: int = int(os.getenv("USER_CACHE_L1_MAX_SIZE", "1024"))
+USER_CACHE_REDIS_TTL_SECONDS: int = int(os.getenv("USER_CACHE_REDIS_TTL_SECONDS", "300"))
+
+# Largest page of the user listing API
+USER_LIST_MAX_PAGE_SIZE: int = int(os.getenv("USER_LIST_MAX_PAGE_SIZE", "200"))
+
+# Bulk user import and export
+USER_IMPORT_BATCH_SIZE: int = int(os.getenv("USER_IMPORT_BATCH_SIZE", "1000"))
+# Threads hashing imported passwords, shared by all imports in a worker and
+# separate from PASSWORD_HASH_WORKERS; half the CPUs so logins keep the rest
+USER_IMPORT_HASH_WORKERS: int = int(os.getenv("USER_IMPORT_HASH_WORKERS", str(max(1, (os.cpu_count() or 1) // 2))))
+USER_EXPORT_CHUNK_SIZE: int = int(os.getenv("USER_EXPORT_CHUNK_SIZE", "1000"))
+
+# Response cache (in-process tier in front of Redis)
+RESPONSE_CACHE_L1_MAX_SIZE: int = int(os.getenv("RESPONSE_CACHE_L1_MAX_SIZE", "256"))
+RESPONSE_CACHE_L1_TTL_SECONDS: float = float(os.getenv("RESPONSE_CACHE_L1_TTL_SECONDS", "1"))
+# Longest a miss waits for another worker computing the same response
+RESPONSE_CACHE_LOCK_SECONDS: float = float(os.getenv("RESPONSE_CACHE_LOCK_SECONDS", "5"))
+
+# JWT revocation (revoked token ids in Redis, mirrored in a per-worker Bloom filter)
+JWT_REVOCATION_CAPACITY: int = int(os.getenv("JWT_REVOCATION_CAPACITY", "100000"))
+JWT_REVOCATION_ERROR_RATE: float = float(os.getenv("JWT_REVOCATION_ERROR_RATE", "0.001"))
+# Rebuild the filter from Redis this often, dropping expired revocations
+JWT_REVOCATION_REBUILD_SECONDS: float = float(os.getenv("JWT_REVOCATION_REBUILD_SECONDS", "3600"))
+
+# Rate limits, "METHOD /route/template=requests/seconds" separated by commas; empty disables
+RATE_LIMITS: str = os.getenv(
+    "RATE_LIMITS",
+    "POST /api/v1/auth/login=10/60,"
+    "POST /api/v1/auth/register=5/60,"
+    "POST /api/v1/auth/forgot-password=5/60,"
+    "GET /api/v1/ping_redis=120/60,"
+    "POST /api/v1/celery/helloworld/=60/60",
+)
+# Most tokens a worker takes from Redis at once, capped at a tenth of each limit
+RATE_LIMIT_PREFETCH: int = int(os.getenv("RATE_LIMIT_PREFETCH", "10"))
+
+# Admin session revalidation
+ADMIN_AUTH_REVALIDATE_SECONDS: float = float(os.getenv("ADMIN_AUTH_REVALIDATE_SECONDS", "60"))
+ADMIN_AUTH_STALE_GRACE_SECONDS: float = float(os.getenv("ADMIN_AUTH_STALE_GRACE_SECONDS", "300"))
+# How long admin list pages reuse an exact row count
+ADMIN_COUNT_CACHE_SECONDS: int = int(os.getenv("ADMIN_COUNT_CACHE_SECONDS", "60"))
+
+# Password hashing thread pool
+PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+
+# Shortened wherever settings are logged: every setting whose name looks like
+# a secret or a URL (which may embed credentials)
+_SECRET_NAME = re.compile(r"SECRET|TOKEN|PASSWORD|_URLS?$")
 
 # Configuration checks
 if DATABASE_URL is None:
@@ -49,16 +193,34 @@ if AUTH_SECRET_KEY is None:
 if REDIS_URL is None:
     raise ValueError("REDIS_URL is not set")
 
-logger.info("ENVIRONMENT: %s", ENVIRONMENT)
-logger.info("IS_DOCKER: %s", IS_DOCKER)
-logger.info("IS_TESTING: %s", IS_TESTING)
-logger.info("API_V1_PREFIX: %s", API_V1_PREFIX)
-logger.info("AUTH_PREFIX: %s", AUTH_PREFIX)
-logger.info("ENVIRONMENT: %s", ENVIRONMENT)
-logger.info("ALLOWED_ORIGINS: %s", ALLOWED_ORIGINS)
-logger.info("DATABASE_URL: %s", string_snippet(DATABASE_URL))
-logger.info("TEST_DATABASE_URL: %s", string_snippet(TEST_DATABASE_URL))
-logger.info("SECRET_KEY: %s", string_snippet(SECRET_KEY))
-logger.info("SECRET_KEY: %s", string_snippet(SECRET_KEY))
-logger.info("AUTH_SECRET_KEY: %s", string_snippet(AUTH_SECRET_KEY))
-logger.info("REDIS_URL: %s", string_snippet(REDIS_URL))
+
+def redact_setting(name: str, value: Any) -> Any:
+    """
+    A setting's value as it may be logged, shortened if the setting is a secret.
+    """
+    if _SECRET_NAME.search(name) is None:
+        return value
+    if isinstance(value, list):
+        return [string_snippet(item) for item in value]
+    # Numbers such as PASSWORD_HASH_WORKERS have nothing to hide
+    return string_snippet(value) if isinstance(value, str) else value
+
+
+@lru_cache(maxsize=None)
+def settings() -> Dict[str, Any]:
+    """
+    Every setting by name, with secrets shortened, built once.
+
+    Returns:
+        Dict[str, Any]: The settings, safe to log or expose to admins.
+    """
+    values = {}
+    for name, value in globals().items():
+        if not name.isupper() or name.startswith("_"):
+            continue
+        values[name] = redact_setting(name, value)
+    return values
+
+
+# One record instead of one per setting, so importing the config stays cheap
+logger.info("Settings: %s", settings())
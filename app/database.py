@@ -1,30 +1,374 @@
 import os
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import declarative_base
-from app.config import DATABASE_URL, TEST_DATABASE_URL
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import event, Select
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import declarative_base, Session, SessionTransactionOrigin
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.config import (
+    DATABASE_URL,
+    TEST_DATABASE_URL,
+    DATABASE_REPLICA_URLS,
+    DB_REPLICA_RETRY_SECONDS,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_MAX_CONNECTIONS,
+    WEB_CONCURRENCY,
+)
+from app.logging import logger
+from app.metrics.sql import instrument_engine
+from app.metrics.timing import request_timings
+from app.utils.stats import Histogram
+
+
+def async_database_url(database_url: str) -> str:
+    """
+    Swap a plain database URL onto its async driver.
+    """
+    # For async engine, the database URL needs to use 'asyncpg' driver
+    if database_url.startswith("postgresql://"):
+        return database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    if database_url.startswith("sqlite://"):
+        return database_url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return database_url
+
 
 # Determine the database URL to use
-current_database_url = TEST_DATABASE_URL if os.getenv("TESTING") == "true" else DATABASE_URL
+current_database_url = async_database_url(
+    TEST_DATABASE_URL if os.getenv("TESTING") == "true" else DATABASE_URL
+)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long checkouts wait and how often they time out.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.wait_time = Histogram()
+        self.timeouts = 0
+
+    def _do_get(self) -> Any:
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.wait_time.observe(time.perf_counter() - started)
+
+
+def pool_sizing(
+    pool_size: int,
+    max_overflow: int,
+    max_connections: int,
+    workers: int,
+) -> Tuple[int, int]:
+    """
+    Fit the per-process pool into a connection budget shared by all workers.
+
+    Args:
+        pool_size (int): Requested persistent connections per process.
+        max_overflow (int): Requested overflow connections per process.
+        max_connections (int): Total budget across workers; 0 means no budget.
+        workers (int): Number of worker processes sharing the budget.
+
+    Returns:
+        Tuple[int, int]: The pool_size and max_overflow to use.
+    """
+    if max_connections <= 0:
+        return pool_size, max_overflow
+    per_worker = max(1, max_connections // max(1, workers))
+    size = min(pool_size, per_worker)
+    return size, min(max_overflow, per_worker - size)
+
+
+def engine_options(database_url: str) -> Dict[str, Any]:
+    """
+    Build create_async_engine keyword arguments from the pool configuration.
+    """
+    url = make_url(database_url)
+    options: Dict[str, Any] = {}
+
+    # In-memory SQLite must share a single connection, leave its pool alone
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return options
+
+    pool_size, max_overflow = pool_sizing(
+        DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_MAX_CONNECTIONS, WEB_CONCURRENCY
+    )
+    options.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+
+    if url.get_driver_name() == "asyncpg":
+        options["connect_args"] = {
+            "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+        }
+
+    return options
+
+
+def pool_stats(target: Optional[AsyncEngine] = None) -> Dict[str, Any]:
+    """
+    Live statistics for an engine's connection pool.
+
+    Args:
+        target (AsyncEngine): The engine to inspect, defaults to the primary engine.
+
+    Returns:
+        Dict[str, Any]: Pool size, checked-in/out and overflow counts, timeouts
+        and the checkout wait time histogram.
+    """
+    pool = (target or engine).pool
+    if not isinstance(pool, InstrumentedQueuePool):
+        return {"pool": type(pool).__name__}
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(0, pool.overflow()),
+        "timeouts": pool.timeouts,
+        "wait_time_seconds": pool.wait_time.snapshot(),
+    }
 
-# For async engine, the database URL needs to use 'asyncpg' driver
-if current_database_url.startswith("postgresql://"):
-    current_database_url = current_database_url.replace("postgresql://", "postgresql+asyncpg://")
 
 # Initialize the async engine and session
-engine = create_async_engine(current_database_url, echo=False, future=True)
+engine = create_async_engine(
+    current_database_url, echo=False, future=True, **engine_options(current_database_url)
+)
+instrument_engine(engine.sync_engine)
+
+
+class ReplicaSet:
+    """
+    Round-robin selection over read replica engines that skips failing ones.
+
+    Args:
+        engines (List[AsyncEngine]): The replica engines.
+        retry_after (float): Seconds a failing replica is skipped.
+    """
+
+    def __init__(self, engines: List[AsyncEngine], retry_after: float = DB_REPLICA_RETRY_SECONDS):
+        self.engines = engines
+        self.retry_after = retry_after
+        self._next = 0
+        self._down_until: Dict[int, float] = {}
+        for replica in engines:
+            instrument_engine(replica.sync_engine)
+            event.listen(replica.sync_engine, "handle_error", self._on_error)
+
+    def choose(self) -> Optional[AsyncEngine]:
+        """
+        Returns the next healthy replica, or None if there is none.
+        """
+        now = time.monotonic()
+        for _ in range(len(self.engines)):
+            replica = self.engines[self._next % len(self.engines)]
+            self._next += 1
+            if self._down_until.get(id(replica.sync_engine), 0) <= now:
+                return replica
+        return None
+
+    def _on_error(self, context: Any) -> None:
+        # Connection failures and disconnects take the replica out of rotation
+        if context.is_disconnect or context.connection is None:
+            logger.warning("Read replica %s marked down: %s", context.engine.url, context.original_exception)
+            self._down_until[id(context.engine)] = time.monotonic() + self.retry_after
+
+
+class RoutingSession(Session):
+    """
+    Session that sends plain reads to a replica and everything else to the primary.
+
+    Once a session flushes or runs any non-SELECT statement it sticks to the
+    primary, so reads after a write in the same request see the write.
+    """
+
+    replicas = ReplicaSet([
+        create_async_engine(url, echo=False, future=True, **engine_options(url))
+        for url in map(async_database_url, DATABASE_REPLICA_URLS)
+    ])
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, **kw: Any) -> Any:
+        if (
+            not self.info.get("use_primary")
+            and not self._flushing
+            and isinstance(clause, Select)
+            and clause._for_update_arg is None
+        ):
+            replica = self.replicas.choose()
+            if replica is not None:
+                return replica.sync_engine
+        else:
+            self.info["use_primary"] = True
+        return super().get_bind(mapper, clause=clause, **kw)
+
 
 # Use `async_sessionmaker` from `sqlalchemy.ext.asyncio` instead of the regular `sessionmaker`
 async_session = async_sessionmaker(
     bind=engine, class_=AsyncSession, expire_on_commit=False
 )
 
+# Sessions for read-mostly work, routed to replicas when configured
+async_read_session = async_sessionmaker(
+    bind=engine, class_=AsyncSession, sync_session_class=RoutingSession, expire_on_commit=False
+)
+
 # Base class for models
 Base = declarative_base()
 
+# Process-wide counters for sessions handed out by `get_db`; the figures
+# for a single request are on its RequestTimings
+session_stats: Dict[str, int] = {"opened": 0, "connected": 0, "unused": 0}
+
+
+@event.listens_for(Session, "after_begin")
+def _mark_session_connected(session: Session, transaction: Any, connection: Any) -> None:
+    session.info["connected"] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_session_wrote(session: Session, flush_context: Any) -> None:
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _clear_session_wrote(session: Session, transaction: Any) -> None:
+    if transaction.parent is None:
+        session.info.pop("wrote", None)
+
+
+def _is_plain_read(statement: Any) -> bool:
+    return isinstance(statement, Select) and statement._for_update_arg is None
+
+
+class LazySession:
+    """
+    Stand-in for an AsyncSession that only builds the real session on first use.
+
+    AsyncSession itself defers the connection checkout to the first statement and
+    gives the connection back to the pool on commit/rollback; this proxy also
+    skips building the session for endpoints that never touch the database and
+    counts sessions that were handed out but never connected.
+
+    Reads through `execute`, `scalar`, `scalars` and `get` end the transaction
+    they autobegan as soon as their rows are fetched, so a read-only request
+    doesn't hold a connection until teardown. Once the transaction writes
+    (flushes, or runs anything but a plain SELECT) it is left to the caller's
+    commit or rollback, as are transactions opened with `begin()`.
+    """
+
+    def __init__(self, factory: Callable[[], AsyncSession]):
+        self._factory = factory
+        self._session: Optional[AsyncSession] = None
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self._factory()
+        return self._session
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
+
+    async def _end_read(self, read: bool) -> None:
+        session = self.session
+        if not read:
+            session.info["wrote"] = True
+            return
+        transaction = session.sync_session.get_transaction()
+        if (
+            transaction is None
+            or transaction.origin is not SessionTransactionOrigin.AUTOBEGIN
+            or session.info.get("wrote")
+            or session.new or session.dirty or session.deleted
+            # Committing would expire the objects just loaded
+            or session.sync_session.expire_on_commit
+        ):
+            return
+        # Nothing to write, so this only hands the connection back
+        await session.commit()
+
+    async def execute(self, statement: Any, *args: Any, **kwargs: Any) -> Any:
+        result = await self.session.execute(statement, *args, **kwargs)
+        await self._end_read(_is_plain_read(statement))
+        return result
+
+    async def scalar(self, statement: Any, *args: Any, **kwargs: Any) -> Any:
+        result = await self.session.scalar(statement, *args, **kwargs)
+        await self._end_read(_is_plain_read(statement))
+        return result
+
+    async def scalars(self, statement: Any, *args: Any, **kwargs: Any) -> Any:
+        result = await self.session.scalars(statement, *args, **kwargs)
+        await self._end_read(_is_plain_read(statement))
+        return result
+
+    async def get(self, *args: Any, **kwargs: Any) -> Any:
+        result = await self.session.get(*args, **kwargs)
+        await self._end_read(kwargs.get("with_for_update") is None)
+        return result
+
+    # Special methods are looked up on the type, not through __getattr__
+    async def __aenter__(self) -> AsyncSession:
+        return await self.session.__aenter__()
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.session.__aexit__(*exc_info)
+
+    async def close(self) -> None:
+        """
+        Close the underlying session, if one was built, and record usage.
+        """
+        connected = self._session is not None and bool(self._session.info.get("connected"))
+        session_stats["connected" if connected else "unused"] += 1
+        timings = request_timings.get()
+        if timings is not None:
+            timings.db_sessions += 1
+            timings.db_sessions_unused += not connected
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
 # Dependency to get the database session
 async def get_db():
     """
-    Get the database session.
+    Get a lazily created database session.
+    """
+    session_stats["opened"] += 1
+    session = LazySession(async_session)
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
+# Dependency to get a replica-routed database session
+async def get_read_db():
+    """
+    Get a lazily created database session that reads from replicas when configured.
     """
-    async with async_session() as session:
+    session_stats["opened"] += 1
+    session = LazySession(async_read_session)
+    try:
         yield session
+    finally:
+        await session.close()
@@ -0,0 +1,250 @@
+"""
+Application lifespan: connection warm-up, readiness and graceful drain.
+"""
+import asyncio
+import signal
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+from fastapi import FastAPI
+from fastapi_users.jwt import decode_jwt, generate_jwt
+from sqlalchemy import text
+
+from app.auth.backend import get_jwt_strategy
+from app.auth.passwords import import_password_service, password_service
+from app.auth.revocation import token_revocations
+from app.celery_tasks import close_enqueue, status_hub, warm_up_enqueue
+from app.config import (
+    WARMUP_DB_CONNECTIONS,
+    WARMUP_REDIS_CONNECTIONS,
+    SHUTDOWN_DRAIN_SECONDS,
+    HEALTH_CHECK_CACHE_SECONDS,
+)
+from app.database import engine, RoutingSession
+from app.logging import logger
+from app.metrics.middleware import route_metrics
+from app.metrics.profiler import profiler
+from app.models.users import user_cache
+from app.redis import close_redis, get_redis
+
+
+class AppState:
+    """
+    Readiness of this worker.
+
+    `ready` turns on once warm-up has finished and off as soon as shutdown
+    starts (or SIGTERM arrives), so load balancers stop sending new work
+    while in-flight requests drain.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.draining = False
+        # Monotonic time shutdown started, SIGTERM if it came first
+        self.draining_since: Optional[float] = None
+        self._checked_at = 0.0
+        self._checks: Dict[str, Any] = {}
+        self._check_lock = asyncio.Lock()
+
+    async def dependency_checks(self) -> Dict[str, Any]:
+        """
+        Database and Redis reachability, re-checked at most every HEALTH_CHECK_CACHE_SECONDS.
+        """
+        if time.monotonic() - self._checked_at < HEALTH_CHECK_CACHE_SECONDS:
+            return self._checks
+        async with self._check_lock:
+            # Another request may have refreshed the result while we waited
+            if time.monotonic() - self._checked_at < HEALTH_CHECK_CACHE_SECONDS:
+                return self._checks
+            checks = {}
+            try:
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+                checks["database"] = "ok"
+            except Exception as exc:
+                checks["database"] = f"error: {type(exc).__name__}"
+            try:
+                await (await get_redis()).ping()
+                checks["redis"] = "ok"
+            except Exception as exc:
+                checks["redis"] = f"error: {type(exc).__name__}"
+            self._checks, self._checked_at = checks, time.monotonic()
+        return self._checks
+
+    def start_draining(self) -> None:
+        self.ready = False
+        self.draining = True
+        if self.draining_since is None:
+            self.draining_since = time.monotonic()
+
+    def drain_time_left(self, budget: float) -> float:
+        """
+        What is left of a `budget` of seconds counted from when draining started.
+        """
+        if self.draining_since is None:
+            return budget
+        return budget - (time.monotonic() - self.draining_since)
+
+
+state = AppState()
+
+
+def in_flight_requests() -> int:
+    return sum(metrics.in_flight for metrics in route_metrics.values())
+
+
+async def _hold_connections(engine_: Any, count: int) -> None:
+    """
+    Check out `count` connections at once so the pool ends up holding that many.
+    """
+    pool = engine_.pool
+    if hasattr(pool, "size"):
+        # Never block on the pool timeout warming up more than it keeps
+        count = min(count, pool.size())
+    if count <= 0:
+        return
+    release = asyncio.Event()
+    connected = 0
+
+    async def hold() -> None:
+        nonlocal connected
+        try:
+            async with engine_.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                connected += 1
+                if connected == count:
+                    release.set()
+                await release.wait()
+        finally:
+            # One failure must not leave the others waiting forever
+            release.set()
+
+    results = await asyncio.gather(*(hold() for _ in range(count)), return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+
+
+async def _warm_redis(count: int) -> None:
+    redis = await get_redis()
+    pool = redis.connection_pool
+    connections = []
+    try:
+        for _ in range(min(count, pool.max_connections)):
+            connections.append(await pool.get_connection("PING"))
+    finally:
+        for connection in connections:
+            await pool.release(connection)
+
+
+async def _warm_jwt() -> None:
+    strategy = get_jwt_strategy()
+    token = generate_jwt({"sub": "warm-up", "aud": strategy.token_audience}, strategy.encode_key, 60)
+    decode_jwt(token, strategy.decode_key, strategy.token_audience)
+
+
+async def warm_up() -> None:
+    """
+    Open pooled connections and prime the auth machinery before taking traffic.
+
+    Failures are logged and skipped; lazy initialisation still covers them.
+    """
+    started = time.perf_counter()
+    steps = {
+        "database": _hold_connections(engine, WARMUP_DB_CONNECTIONS),
+        "redis": _warm_redis(WARMUP_REDIS_CONNECTIONS),
+        "password_hasher": password_service.hash("warm-up"),
+        "jwt": _warm_jwt(),
+        **{
+            f"replica_{index}": _hold_connections(replica, WARMUP_DB_CONNECTIONS)
+            for index, replica in enumerate(RoutingSession.replicas.engines)
+        },
+    }
+    results = await asyncio.gather(*steps.values(), return_exceptions=True)
+    for name, result in zip(steps, results):
+        if isinstance(result, Exception):
+            logger.warning("Warm-up of %s failed: %s", name, result)
+    logger.info("Warm-up finished in %.3fs", time.perf_counter() - started)
+
+
+async def warm_up_in_background() -> None:
+    """
+    Load the Celery client and open a broker connection after readiness.
+
+    Runs on an enqueue thread, so the import doesn't delay startup and the
+    first enqueue usually finds the client ready.
+    """
+    try:
+        await warm_up_enqueue()
+    except Exception as exc:
+        logger.warning("Warm-up of celery failed: %s", exc)
+
+
+async def drain(timeout: float) -> None:
+    """
+    Wait for in-flight requests to finish, at most `timeout` seconds.
+    """
+    deadline = time.monotonic() + timeout
+    while in_flight_requests() and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+    if in_flight_requests():
+        logger.warning("Shutting down with %d requests still in flight", in_flight_requests())
+
+
+async def close_resources() -> None:
+    """
+    Stop background listeners and executors, then close every pool.
+    """
+    await user_cache.stop_listener()
+    await token_revocations.stop_listener()
+    await profiler.stop_watcher()
+    await status_hub.close()
+    await asyncio.get_running_loop().run_in_executor(None, close_enqueue)
+    password_service.shutdown()
+    import_password_service.shutdown()
+    await close_redis()
+    await engine.dispose()
+    for replica in RoutingSession.replicas.engines:
+        await replica.dispose()
+
+
+def _stop_ready_on_sigterm() -> None:
+    """
+    Drop readiness the moment SIGTERM arrives, then let the server handle it.
+    """
+    try:
+        previous = signal.getsignal(signal.SIGTERM)
+
+        def handler(signum: int, frame: Optional[Any]) -> None:
+            state.start_draining()
+            if callable(previous):
+                previous(signum, frame)
+
+        signal.signal(signal.SIGTERM, handler)
+    except ValueError:
+        # Not on the main thread (e.g. test clients); shutdown still drains
+        pass
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    await warm_up()
+    _stop_ready_on_sigterm()
+    # A previous lifespan in this process may have drained
+    state.draining, state.draining_since = False, None
+    state.ready = True
+    background = asyncio.create_task(warm_up_in_background())
+    # Follows the profiler switch in the admin panel
+    profiler.start_watcher()
+    # Loads revoked tokens now rather than on the first authenticated request
+    token_revocations.start_listener()
+    try:
+        yield
+    finally:
+        background.cancel()
+        state.start_draining()
+        # uvicorn has already spent part of the budget closing connections since SIGTERM
+        await drain(state.drain_time_left(SHUTDOWN_DRAIN_SECONDS))
+        await close_resources()
+        logger.info("Shutdown complete")
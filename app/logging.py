@@ -1,17 +1,215 @@
+"""
+Queue-based logging.
+
+Handlers on the calling thread resolve the message and traceback and put the
+record on a bounded queue; a background listener thread formats the output
+line and writes it. A full queue drops the record and counts it instead of
+blocking the event loop on stderr.
+"""
+import atexit
+import copy
+import json
 import logging
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional, Tuple
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line, including `extra` fields.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # Already formatted by NonBlockingQueueHandler.prepare
+            payload["exc_info"] = record.exc_text
+        if record.stack_info:
+            payload["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(payload, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through at most `rate` records per second for each message template.
+
+    Only records below `max_level` are sampled, warnings and errors always pass.
+    Runs on the caller's thread, so suppressed records never reach the queue.
+
+    Args:
+        rate (int): Records per second per (logger, message) pair, 0 disables.
+        max_level (int): Records at or above this level are never sampled.
+    """
+
+    def __init__(self, rate: int = 0, max_level: int = logging.WARNING):
+        super().__init__()
+        self.rate = rate
+        self.max_level = max_level
+        self.suppressed = 0
+        self._windows: Dict[Tuple[str, Any], Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.levelno >= self.max_level:
+            return True
+        key = (record.name, record.msg)
+        second = int(time.monotonic())
+        with self._lock:
+            window, count = self._windows.get(key, (second, 0))
+            if window != second:
+                window, count = second, 0
+                if len(self._windows) > 10000:
+                    self._windows.clear()
+            if count >= self.rate:
+                self.suppressed += 1
+                return False
+            self._windows[key] = (window, count + 1)
+        return True
+
+
+_exception_formatter = logging.Formatter()
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler that never blocks and leaves output formatting to the listener.
+
+    Args:
+        max_size (int): Records buffered before new ones are dropped.
+    """
+
+    def __init__(self, max_size: int):
+        # Unbounded underneath so the listener's stop sentinel always fits
+        super().__init__(queue.SimpleQueue())
+        self.max_size = max_size
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Resolve `msg % args` and the traceback now, on the caller's thread.
+
+        Arguments may be mutated after the call, or be ORM instances that must
+        not lazy-load off the event loop. Unlike the stock prepare(), the line
+        format is still applied by the listener's formatter.
+        """
+        record = copy.copy(record)
+        record.message = record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.queue.qsize() >= self.max_size:
+            self.dropped += 1
+            return
+        self.queue.put_nowait(record)
+
+
+def _parse_levels(levels: str) -> Dict[str, str]:
+    """
+    Parse "name=LEVEL,name=LEVEL" into a dict.
+    """
+    parsed = {}
+    for item in filter(None, (part.strip() for part in levels.split(","))):
+        name, _, level = item.partition("=")
+        parsed[name.strip()] = level.strip().upper()
+    return parsed
+
 
 # Create a logger
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
-# Create a console handler to output logs to the terminal
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.DEBUG)
+rate_limit_filter = RateLimitFilter()
+queue_handler: Optional[NonBlockingQueueHandler] = None
+listener: Optional[QueueListener] = None
+
+
+def configure_logging(
+    level: str = "DEBUG",
+    fmt: str = "text",
+    levels: str = "",
+    queue_size: int = 10000,
+    rate_limit: int = 0,
+) -> None:
+    """
+    (Re)build the logging pipeline on the root logger.
+
+    Args:
+        level (str): Level of the application logger.
+        fmt (str): "text" or "json".
+        levels (str): Per-logger levels, e.g. "sqlalchemy.engine=INFO,httpx=WARNING".
+        queue_size (int): Records buffered before new ones are dropped.
+        rate_limit (int): Records per second per message below WARNING, 0 disables.
+    """
+    global queue_handler, listener
+    stop_logging()
+
+    # Create a console handler, written to from the listener thread only
+    console_handler = logging.StreamHandler(sys.stderr)
+    console_handler.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+
+    dropped = queue_handler.dropped if queue_handler is not None else 0
+    queue_handler = NonBlockingQueueHandler(queue_size)
+    queue_handler.dropped = dropped
+    rate_limit_filter.rate = rate_limit
+    queue_handler.addFilter(rate_limit_filter)
+
+    root = logging.getLogger()
+    for handler in [h for h in root.handlers if isinstance(h, NonBlockingQueueHandler)]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+
+    logger.setLevel(level.upper())
+    for name, logger_level in _parse_levels(levels).items():
+        logging.getLogger(name).setLevel(logger_level)
+
+    listener = QueueListener(queue_handler.queue, console_handler, respect_handler_level=True)
+    listener.start()
+
+
+def stop_logging() -> None:
+    """
+    Stop the listener thread after writing out everything already queued.
+    """
+    global listener
+    if listener is not None:
+        listener.stop()
+        listener = None
+
+
+def logging_stats() -> Dict[str, int]:
+    """
+    Counters for the logging pipeline.
+    """
+    return {
+        "queued": queue_handler.queue.qsize() if queue_handler is not None else 0,
+        "dropped": queue_handler.dropped if queue_handler is not None else 0,
+        "sampled_out": rate_limit_filter.suppressed,
+    }
 
-# Create a formatter and set it for the handler
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-console_handler.setFormatter(formatter)
 
-# Add the handler to the logger
-if not logger.hasHandlers():
-    logger.addHandler(console_handler)
+# Defaults until app.config applies the configured settings
+configure_logging()
+atexit.register(stop_logging)
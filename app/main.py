@@ -1,14 +1,16 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.logging import logger # Empty import required for logging to work
-from sqladmin import Admin
 from starlette.middleware.sessions import SessionMiddleware
-from app.database import engine
+from app.lifespan import lifespan
 from app.routers.hello_world import router as hello_world_router
-from app.admin.models import UserAdmin
-from app.admin.auth import AdminAuth
-from app.routers.users import fastapi_users
+from app.admin.panel import admin_panel
+from app.routers.users import fastapi_users, router as users_router
 from app.routers.celery import router as celery_router
+from app.routers.metrics import router as metrics_router
+from app.routers.health import router as health_router
+from app.metrics.middleware import MetricsMiddleware
+from app.ratelimit import RateLimitMiddleware
 from app.auth.backend import auth_backend
 from app.schemas.users import UserRead, UserCreate, UserUpdate
 from app.config import (
@@ -19,7 +21,11 @@ from app.config import (
 )
 
 
-app = FastAPI()
+# Warms connections up before serving and drains and closes them on shutdown
+app = FastAPI(lifespan=lifespan)
+
+# Innermost, so 429s still get CORS headers and show up in the metrics
+app.add_middleware(RateLimitMiddleware)
 
 app.add_middleware(
     SessionMiddleware,
@@ -40,17 +46,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Add admin panel
-authentication_backend = AdminAuth(secret_key=SECRET_KEY)
-admin = Admin(
-    app,
-    engine,
-    authentication_backend=authentication_backend,
-    base_url="/admin/",
-    title="Admin Panel"
-)
-admin.add_view(UserAdmin)
+# Outermost, so timings cover the other middleware too
+app.add_middleware(MetricsMiddleware)
+
+# Add admin panel, built on its first request
+app.mount("/admin", admin_panel, name="admin")
 app.include_router(celery_router, prefix=API_V1_PREFIX, tags=["celery"])
+app.include_router(metrics_router, tags=["metrics"])
+app.include_router(health_router, tags=["health"])
 
 # Include routers
 app.include_router(
@@ -71,6 +74,8 @@ app.include_router(
     tags=["auth"],
 )
 
+app.include_router(users_router, prefix=API_V1_PREFIX, tags=["users"])
+
 app.include_router(
     fastapi_users.get_users_router(UserRead, UserUpdate),
     prefix=API_V1_PREFIX + "/users",
@@ -0,0 +1,162 @@
+"""
+ASGI middleware recording per-route request metrics.
+"""
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import SQL_DEBUG_HEADERS, SQL_N_PLUS_ONE_THRESHOLD
+from app.logging import logger
+from app.metrics.profiler import profiler
+from app.metrics.sql import repeated_statement
+from app.metrics.timing import RequestTimings, request_timings
+from app.utils.stats import Histogram
+
+UNMATCHED_ROUTE = "<unmatched>"
+# Anything else is reported as OTHER so clients can't create new series
+METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+# Statements per request
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+
+class RouteMetrics:
+    """
+    Counters and histograms for one (method, route) pair.
+
+    Created once per pair and then only mutated from the event loop thread, so
+    recording a request is a few integer and float updates.
+    """
+
+    __slots__ = (
+        "in_flight", "responses", "latency", "db_time", "db_queries", "n_plus_one", "redis_time",
+        "unused_sessions",
+    )
+
+    def __init__(self):
+        self.in_flight = 0
+        self.responses: Dict[int, int] = {}
+        self.latency = Histogram()
+        self.db_time = Histogram()
+        self.db_queries = Histogram(QUERY_COUNT_BUCKETS)
+        # Requests that repeated one statement more than SQL_N_PLUS_ONE_THRESHOLD times
+        self.n_plus_one = 0
+        self.redis_time = Histogram()
+        # Sessions handed to requests of this route that never connected
+        self.unused_sessions = 0
+
+
+# (method, route template) -> RouteMetrics
+route_metrics: Dict[Tuple[str, str], RouteMetrics] = {}
+
+
+def _debug_headers(timings: RequestTimings) -> List[Tuple[bytes, bytes]]:
+    """
+    Query stats for the response headers, as far as the request got before responding.
+    """
+    server_timing = (
+        f'db;dur={timings.db_time * 1000:.1f};desc="{timings.db_queries} queries", '
+        f'db-slowest;dur={timings.db_slowest * 1000:.1f}, '
+        f'redis;dur={timings.redis_time * 1000:.1f};desc="{timings.redis_commands} commands"'
+    )
+    headers = [
+        (b"server-timing", server_timing.encode()),
+        (b"x-db-queries", str(timings.db_queries).encode()),
+    ]
+    repeated = repeated_statement(timings, SQL_N_PLUS_ONE_THRESHOLD)
+    if repeated is not None:
+        headers.append((b"x-db-repeated-statement", f"{repeated[1]}x {repeated[0]}"[:512].encode()))
+    return headers
+
+
+def _route_template(scope: Scope) -> str:
+    """
+    The templated path of the route that will handle the request.
+
+    Mounted apps (e.g. the admin panel) are reported under their mount path.
+    """
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match != Match.NONE:
+            return route.path or "/"
+    return UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """
+    Records request counts by status, in-flight requests, latency and the DB and
+    Redis time of each request, keyed by method and route template.
+
+    Args:
+        app (ASGIApp): The wrapped application.
+        max_routes (int): Route templates cached per method and path before the cache is reset.
+    """
+
+    def __init__(self, app: ASGIApp, max_routes: int = 4096):
+        self.app = app
+        self.max_routes = max_routes
+        self._templates: Dict[Tuple[str, str], str] = {}
+
+    def _template_for(self, scope: Scope) -> str:
+        key = (scope["method"], scope["path"])
+        template = self._templates.get(key)
+        if template is None:
+            if len(self._templates) >= self.max_routes:
+                self._templates.clear()
+            template = self._templates[key] = _route_template(scope)
+        return template
+
+    def _metrics_for(self, scope: Scope, template: str) -> RouteMetrics:
+        method = scope["method"] if scope["method"] in METHODS else "OTHER"
+        metrics = route_metrics.get((method, template))
+        if metrics is None:
+            metrics = route_metrics[(method, template)] = RouteMetrics()
+        return metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        template = self._template_for(scope)
+        metrics = self._metrics_for(scope, template)
+        # Off by default; then this is the only profiler cost per request
+        frame = sys._getframe() if profiler.enabled and profiler.should_sample(template) else None
+        if frame is not None:
+            profiler.register(frame, f"{scope['method']} {template}")
+        timings = RequestTimings()
+        token = request_timings.set(timings)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if SQL_DEBUG_HEADERS:
+                    message["headers"] = [*message.get("headers", ()), *_debug_headers(timings)]
+            await send(message)
+
+        metrics.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.latency.observe(time.perf_counter() - started)
+            metrics.db_time.observe(timings.db_time)
+            metrics.db_queries.observe(timings.db_queries)
+            repeated = repeated_statement(timings, SQL_N_PLUS_ONE_THRESHOLD)
+            if repeated is not None:
+                metrics.n_plus_one += 1
+                logger.warning(
+                    "Possible N+1 in %s %s: %d executions of %s",
+                    scope["method"], scope["path"], repeated[1], repeated[0],
+                )
+            metrics.redis_time.observe(timings.redis_time)
+            metrics.unused_sessions += timings.db_sessions_unused
+            metrics.responses[status_code] = metrics.responses.get(status_code, 0) + 1
+            metrics.in_flight -= 1
+            request_timings.reset(token)
+            if frame is not None:
+                profiler.unregister(frame)
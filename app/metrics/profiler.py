@@ -0,0 +1,356 @@
+"""
+Sampling profiler for live requests.
+
+When switched on (from the admin panel) MetricsMiddleware registers the frame
+of a random fraction of requests. A background thread wakes every
+PROFILER_INTERVAL_SECONDS and records one stack per registered request, under
+that request's route:
+
+- the live stack, read with sys._current_frames(), for the request the event
+  loop thread is running at that moment;
+- the chain of awaits for requests that are suspended, ending in what they
+  wait for (e.g. a Future for a socket read or a thread pool job).
+
+So the profile shows wall-clock time, including time spent waiting on the
+database or Redis. Code running in thread pools (e.g. password hashing) shows
+up as the await on its Future.
+
+Settings live in Redis so every worker follows the same switch; each worker
+flushes its counts into a shared Redis hash, which is downloadable in the
+collapsed-stack format flamegraph.pl and speedscope read. Both a worker's
+counts and the shared hash keep at most PROFILER_MAX_STACKS distinct stacks.
+
+While switched off the only cost is one attribute check per request.
+"""
+import asyncio
+import json
+import os
+import random
+import sys
+import sysconfig
+import threading
+import time
+from functools import lru_cache
+from types import CodeType, FrameType
+from typing import Any, Dict, List, Optional, Tuple
+
+from redis.exceptions import RedisError
+
+from app.config import (
+    PROFILER_INTERVAL_SECONDS,
+    PROFILER_MAX_STACKS,
+    PROFILER_SYNC_SECONDS,
+    PROFILER_MAX_SECONDS,
+)
+from app.logging import logger
+from app.redis import get_redis, redis_pipeline
+
+PROFILER_SETTINGS_KEY = "profiler:settings"
+PROFILER_STACKS_KEY = "profiler:stacks"
+# Samples of new stacks once a worker, or the shared hash, already held
+# PROFILER_MAX_STACKS distinct stacks
+OVERFLOW_STACK = "<other stacks>"
+# Collected stacks are kept this long after the last flush
+STACKS_TTL_SECONDS = 86400
+
+# Add ARGV[4..] (stack, count pairs) to the shared hash. Stacks the hash doesn't
+# have yet go to ARGV[3] once it holds ARGV[1] fields, so the limit holds across
+# workers. ARGV[2] is the hash's TTL.
+FLUSH_STACKS_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local size = redis.call('HLEN', KEYS[1])
+local overflow = 0
+for i = 4, #ARGV, 2 do
+    local count = tonumber(ARGV[i + 1])
+    local known = redis.call('HEXISTS', KEYS[1], ARGV[i]) == 1
+    if known or size < limit then
+        redis.call('HINCRBY', KEYS[1], ARGV[i], count)
+        if not known then
+            size = size + 1
+        end
+    else
+        overflow = overflow + count
+    end
+end
+if overflow > 0 then
+    redis.call('HINCRBY', KEYS[1], ARGV[3], overflow)
+end
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return size
+"""
+
+_STDLIB = sysconfig.get_paths()["stdlib"] + os.sep
+
+
+@lru_cache(maxsize=4096)
+def _frame_label(code: CodeType) -> str:
+    filename = code.co_filename
+    marker = filename.rfind("site-packages" + os.sep)
+    if marker != -1:
+        filename = filename[marker + len("site-packages") + 1:]
+    elif filename.startswith(_STDLIB):
+        filename = filename[len(_STDLIB):]
+    else:
+        filename = os.path.relpath(filename)
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+
+
+def _await_stack(task: "asyncio.Task", request_frame_id: int) -> Optional[List[str]]:
+    """
+    Labels of the coroutines a suspended task is awaiting below the request's frame.
+
+    Returns None if the request frame isn't part of the task's await chain.
+    """
+    labels: List[str] = []
+    found = False
+    awaitable: Any = task.get_coro()
+    while awaitable is not None:
+        if isinstance(awaitable, asyncio.Task):
+            awaitable = awaitable.get_coro()
+            continue
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is None:
+            # A Future or other awaitable at the bottom of the chain
+            if found:
+                # `await future` leaves the future's C iterator in cr_await
+                name = type(awaitable).__name__
+                labels.append("<Future>" if name == "FutureIter" else f"<{name}>")
+            break
+        if found:
+            labels.append(_frame_label(frame.f_code))
+        elif id(frame) == request_frame_id:
+            found = True
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+    return labels if found else None
+
+
+class SamplingProfiler:
+    """
+    Samples the event loop thread's stack while requests it was told about run.
+
+    Args:
+        interval (float): Seconds between samples.
+        max_stacks (int): Distinct stacks kept before new ones are lumped together.
+    """
+
+    def __init__(self, interval: float = PROFILER_INTERVAL_SECONDS, max_stacks: int = PROFILER_MAX_STACKS):
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self.enabled = False
+        self.fraction = 0.0
+        self.route = ""
+        self.samples = 0
+        # id(request frame) -> ("METHOD /route/template", task running the request)
+        self._requests: Dict[int, Tuple[str, asyncio.Task]] = {}
+        self._stacks: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._loop_thread_id: Optional[int] = None
+        self._watcher: Optional[asyncio.Task] = None
+        self._flush_script = None
+
+    def should_sample(self, route: str) -> bool:
+        """
+        Whether to profile a request to `route`; only called while enabled.
+        """
+        return route.startswith(self.route) and random.random() < self.fraction
+
+    def register(self, frame: FrameType, label: str) -> None:
+        """
+        Sample the request running in `frame` (a coroutine frame of the current task).
+        """
+        self._requests[id(frame)] = (label, asyncio.current_task())
+
+    def unregister(self, frame: FrameType) -> None:
+        self._requests.pop(id(frame), None)
+
+    def start(self, fraction: float, route: str = "") -> None:
+        """
+        Start sampling `fraction` of the requests whose route starts with `route`.
+
+        Must be called from the event loop thread.
+        """
+        self.fraction = fraction
+        self.route = route
+        self._loop_thread_id = threading.get_ident()
+        self.enabled = True
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop sampling; requests already registered are simply no longer sampled.
+        """
+        self.enabled = False
+        self._requests.clear()
+
+    def sample(self, running: Optional[FrameType]) -> None:
+        """
+        Count one stack for every registered request.
+
+        Args:
+            running (Optional[FrameType]): The frame the event loop thread is executing.
+        """
+        # The running request, if any, gets its live stack
+        live: List[str] = []
+        live_id = None
+        frame = running
+        while frame is not None:
+            if id(frame) in self._requests:
+                live_id = id(frame)
+                break
+            live.append(_frame_label(frame.f_code))
+            frame = frame.f_back
+
+        stacks = []
+        # A copy, the event loop thread keeps adding and removing requests
+        for frame_id, (label, task) in list(self._requests.items()):
+            if frame_id == live_id:
+                below = live[::-1]
+            else:
+                try:
+                    below = _await_stack(task, frame_id)
+                except (AttributeError, RuntimeError):
+                    # The task moved on while we walked it
+                    below = None
+                if below is None:
+                    continue
+            stacks.append(";".join([label, *below]))
+
+        with self._lock:
+            for key in stacks:
+                self.samples += 1
+                if key not in self._stacks and len(self._stacks) >= self.max_stacks:
+                    key = OVERFLOW_STACK
+                self._stacks[key] = self._stacks.get(key, 0) + 1
+
+    def drain(self) -> Dict[str, int]:
+        """
+        Take the stacks counted since the last drain.
+        """
+        with self._lock:
+            stacks, self._stacks = self._stacks, {}
+        return stacks
+
+    def _run(self) -> None:
+        while self.enabled:
+            time.sleep(self.interval)
+            if self._requests:
+                self.sample(sys._current_frames().get(self._loop_thread_id))
+
+    async def sync(self) -> None:
+        """
+        Apply the shared settings and flush this worker's stacks to Redis.
+        """
+        redis = await get_redis()
+        payload = await redis.get(PROFILER_SETTINGS_KEY)
+        if payload is None:
+            if self.enabled:
+                self.stop()
+        else:
+            settings = json.loads(payload)
+            if not self.enabled or (settings["fraction"], settings["route"]) != (self.fraction, self.route):
+                self.start(settings["fraction"], settings["route"])
+
+        stacks = self.drain()
+        if stacks:
+            if self._flush_script is None:
+                self._flush_script = redis.register_script(FLUSH_STACKS_SCRIPT)
+            await self._flush_script(
+                keys=[PROFILER_STACKS_KEY],
+                args=[self.max_stacks, STACKS_TTL_SECONDS, OVERFLOW_STACK,
+                      *(value for item in stacks.items() for value in item)],
+                client=redis,
+            )
+
+    def start_watcher(self) -> None:
+        """
+        Follow the shared settings from this worker, every PROFILER_SYNC_SECONDS.
+        """
+        if self._watcher is None or self._watcher.done():
+            self._watcher = asyncio.get_running_loop().create_task(self._watch())
+
+    async def stop_watcher(self) -> None:
+        self.stop()
+        if self._watcher is None:
+            return
+        self._watcher.cancel()
+        try:
+            await self._watcher
+        except asyncio.CancelledError:
+            pass
+        self._watcher = None
+
+    async def _watch(self) -> None:
+        while True:
+            try:
+                await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except (RedisError, OSError) as exc:
+                logger.warning("Profiler: sync failed: %s", exc)
+            await asyncio.sleep(PROFILER_SYNC_SECONDS)
+
+
+profiler = SamplingProfiler()
+
+
+async def start_profiling(fraction: float, route: str = "", seconds: int = PROFILER_MAX_SECONDS) -> None:
+    """
+    Switch profiling on for every worker.
+
+    Args:
+        fraction (float): Share of matching requests to sample, between 0 and 1.
+        route (str): Only sample routes whose template starts with this.
+        seconds (int): Switch off again after this long, at most PROFILER_MAX_SECONDS.
+    """
+    settings = {"fraction": min(max(fraction, 0.0), 1.0), "route": route, "started_at": time.time()}
+    redis = await get_redis()
+    await redis.set(PROFILER_SETTINGS_KEY, json.dumps(settings), ex=max(1, min(seconds, PROFILER_MAX_SECONDS)))
+    await profiler.sync()
+
+
+async def stop_profiling() -> None:
+    """
+    Switch profiling off for every worker.
+    """
+    redis = await get_redis()
+    await redis.delete(PROFILER_SETTINGS_KEY)
+    await profiler.sync()
+
+
+async def reset_profile() -> None:
+    """
+    Forget every collected stack.
+    """
+    profiler.drain()
+    redis = await get_redis()
+    await redis.delete(PROFILER_STACKS_KEY)
+
+
+async def profile_status() -> Dict[str, Any]:
+    """
+    The shared settings, seconds left and collected stacks so far.
+    """
+    async with redis_pipeline(transaction=False) as pipe:
+        pipe.get(PROFILER_SETTINGS_KEY)
+        pipe.ttl(PROFILER_SETTINGS_KEY)
+        pipe.hlen(PROFILER_STACKS_KEY)
+        payload, ttl, stacks = await pipe.execute()
+    return {
+        "settings": json.loads(payload) if payload else None,
+        "seconds_left": max(ttl, 0),
+        "stacks": stacks,
+    }
+
+
+async def collapsed_stacks() -> str:
+    """
+    All collected stacks as "frame;frame;frame count" lines, most sampled first.
+    """
+    await profiler.sync()
+    redis = await get_redis()
+    stacks = await redis.hgetall(PROFILER_STACKS_KEY)
+    lines = sorted(stacks.items(), key=lambda item: int(item[1]), reverse=True)
+    return "".join(f"{stack} {count}\n" for stack, count in lines)
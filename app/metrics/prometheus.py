@@ -0,0 +1,142 @@
+"""
+Prometheus text exposition of the in-process metrics.
+"""
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from app.admin.counts import admin_counts
+from app.auth.passwords import password_service
+from app.auth.revocation import token_revocations
+from app.cache.responses import response_cache
+from app.database import engine, pool_stats, session_stats
+from app.logging import logging_stats
+from app.metrics.middleware import route_metrics
+from app.metrics.sql import slow_queries
+from app.models.users import user_cache
+from app.ratelimit import rate_limiter
+from app.redis import redis_stats
+from app.utils.stats import Histogram
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[Tuple[str, Any], ...]
+
+# Extra metric sources, each returning lines of exposition text
+collectors: List[Callable[[], Iterable[str]]] = []
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _header(lines: List[str], name: str, kind: str, help_text: str) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def _histogram(lines: List[str], name: str, labels: Labels, snapshot: Dict[str, Any]) -> None:
+    for bound, count in snapshot["buckets"].items():
+        lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {count}")
+    lines.append(f"{name}_sum{_labels(labels)} {snapshot['sum']}")
+    lines.append(f"{name}_count{_labels(labels)} {snapshot['count']}")
+
+
+def _route_lines(lines: List[str]) -> None:
+    routes = sorted(route_metrics.items())
+
+    _header(lines, "http_requests_total", "counter", "Requests by route, method and status.")
+    for (method, route), metrics in routes:
+        for status, count in sorted(metrics.responses.items()):
+            labels = (("route", route), ("method", method), ("status", status))
+            lines.append(f"http_requests_total{_labels(labels)} {count}")
+
+    _header(lines, "http_requests_in_flight", "gauge", "Requests currently being handled.")
+    for (method, route), metrics in routes:
+        lines.append(f"http_requests_in_flight{_labels((('route', route), ('method', method)))} {metrics.in_flight}")
+
+    _header(lines, "http_requests_n_plus_one_total", "counter", "Requests that repeated one statement past the N+1 threshold.")
+    for (method, route), metrics in routes:
+        lines.append(f"http_requests_n_plus_one_total{_labels((('route', route), ('method', method)))} {metrics.n_plus_one}")
+
+    _header(lines, "http_requests_unused_sessions_total", "counter", "Database sessions handed to requests that never connected.")
+    for (method, route), metrics in routes:
+        lines.append(f"http_requests_unused_sessions_total{_labels((('route', route), ('method', method)))} {metrics.unused_sessions}")
+
+    for name, attribute, help_text in (
+        ("http_request_duration_seconds", "latency", "Request latency."),
+        ("http_request_db_seconds", "db_time", "Database time per request."),
+        ("http_request_db_queries", "db_queries", "Statements per request."),
+        ("http_request_redis_seconds", "redis_time", "Redis time per request."),
+    ):
+        _header(lines, name, "histogram", help_text)
+        for (method, route), metrics in routes:
+            histogram: Histogram = getattr(metrics, attribute)
+            _histogram(lines, name, (("route", route), ("method", method)), histogram.snapshot())
+
+
+def _gauges(lines: List[str], prefix: str, help_text: str, values: Dict[str, Any]) -> None:
+    for key, value in values.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            _header(lines, f"{prefix}_{key}", "gauge", f"{help_text} {key}.")
+            lines.append(f"{prefix}_{key} {value}")
+
+
+def render() -> str:
+    """
+    Render every metric in the Prometheus text format.
+    """
+    lines: List[str] = []
+    _route_lines(lines)
+
+    pool = pool_stats(engine)
+    _gauges(lines, "db_pool", "Database pool", pool)
+    if "wait_time_seconds" in pool:
+        _header(lines, "db_pool_wait_seconds", "histogram", "Connection checkout wait time.")
+        _histogram(lines, "db_pool_wait_seconds", (), pool["wait_time_seconds"])
+
+    _header(lines, "db_sessions_total", "counter", "Sessions handed out by this process, by outcome.")
+    for state, count in session_stats.items():
+        lines.append(f"db_sessions_total{_labels((('state', state),))} {count}")
+
+    passwords = password_service.stats()
+    _gauges(lines, "password_hash", "Password hashing", passwords)
+    for key in ("wait_time_seconds", "hash_time_seconds"):
+        _header(lines, f"password_hash_{key}", "histogram", f"Password hashing {key}.")
+        _histogram(lines, f"password_hash_{key}", (), passwords[key])
+
+    redis = redis_stats()
+    pools = sorted(redis["pools"].items())
+    for key in ("max_connections", "in_use", "available", "timeouts", "connect_errors"):
+        _header(lines, f"redis_pool_{key}", "gauge", f"Redis pool {key}.")
+        for client, pool in pools:
+            lines.append(f"redis_pool_{key}{_labels((('client', client),))} {pool[key]}")
+    _header(lines, "redis_pool_wait_seconds", "histogram", "Redis connection checkout wait time.")
+    for client, pool in pools:
+        _histogram(lines, "redis_pool_wait_seconds", (("client", client),), pool["wait_time_seconds"])
+    _header(lines, "redis_command_seconds", "histogram", "Redis command latency.")
+    for command, snapshot in sorted(redis["command_time_seconds"].items()):
+        _histogram(lines, "redis_command_seconds", (("command", command),), snapshot)
+
+    _header(lines, "db_slow_queries_total", "counter", "Statements slower than SQL_SLOW_QUERY_SECONDS.")
+    for statement, count in sorted(slow_queries.items()):
+        lines.append(f"db_slow_queries_total{_labels((('statement', statement),))} {count}")
+
+    _gauges(lines, "user_cache", "User cache", {
+        "hits_local": user_cache.hits_local,
+        "hits_redis": user_cache.hits_redis,
+        "misses": user_cache.misses,
+    })
+    _gauges(lines, "response_cache", "Response cache", response_cache.stats())
+    _gauges(lines, "jwt_revocation", "JWT revocation", token_revocations.stats())
+    _gauges(lines, "rate_limit", "Rate limiting", rate_limiter.stats())
+    _gauges(lines, "admin_count", "Admin list counts", admin_counts.stats())
+    _gauges(lines, "log_records", "Logging pipeline", logging_stats())
+
+    for collector in collectors:
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
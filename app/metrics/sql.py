@@ -0,0 +1,97 @@
+"""
+SQL statement instrumentation.
+
+Cursor events attribute every statement to the current request (count, total
+time, slowest statement and executions per normalized statement), log slow
+statements and count them.
+"""
+import re
+import time
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import SQL_SLOW_QUERY_SECONDS
+from app.logging import logger
+from app.metrics.timing import RequestTimings, request_timings
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_PARAM = re.compile(r"\$\d+|%\(\w+\)s|%s|(?<![:\w]):\w+|\?")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+# Slow statements by normalized SQL, reported on /metrics
+slow_queries: Dict[str, int] = {}
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(statement: str) -> str:
+    """
+    Collapse a statement to its shape: literals and bind parameters become `?`,
+    IN lists become `(?)` and whitespace is squashed.
+    """
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    statement = _STRING.sub("?", statement)
+    statement = _PARAM.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    return _LIST.sub("(?)", statement)
+
+
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    timings = request_timings.get()
+
+    slow = elapsed >= SQL_SLOW_QUERY_SECONDS > 0
+    if timings is None and not slow:
+        return
+
+    normalized = normalize_sql(statement)
+    if slow:
+        slow_queries[normalized] = slow_queries.get(normalized, 0) + 1
+        if len(slow_queries) > 1000:
+            slow_queries.clear()
+        logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, normalized)
+
+    if timings is not None:
+        timings.db_time += elapsed
+        timings.db_queries += 1
+        timings.db_statements[normalized] = timings.db_statements.get(normalized, 0) + 1
+        if elapsed > timings.db_slowest:
+            timings.db_slowest = elapsed
+            timings.db_slowest_statement = normalized
+
+
+def _handle_error(context: Any) -> None:
+    # Failed statements never reach after_cursor_execute
+    if context.connection is not None:
+        started = context.connection.info.get("query_started")
+        if started:
+            started.pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Attach the statement timing hooks to a (sync) engine.
+    """
+    if event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def repeated_statement(timings: RequestTimings, threshold: int) -> Optional[Tuple[str, int]]:
+    """
+    The most repeated statement of a request if it ran more than `threshold` times.
+    """
+    if threshold <= 0 or not timings.db_statements:
+        return None
+    statement, count = max(timings.db_statements.items(), key=lambda item: item[1])
+    return (statement, count) if count > threshold else None
@@ -0,0 +1,38 @@
+"""
+Per-request accounting of time spent in the database and in Redis, and of
+the database sessions a request was handed.
+
+The metrics middleware puts a RequestTimings in a context variable; the
+SQLAlchemy cursor events (app.metrics.sql) and the Redis client (app.redis)
+add to it. Both run on the event loop thread (SQLAlchemy's greenlets copy the
+caller's context), so plain attribute updates are safe without locks.
+"""
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+
+class RequestTimings:
+    """
+    Running totals for a single request.
+    """
+
+    __slots__ = (
+        "db_time", "db_queries", "db_slowest", "db_slowest_statement", "db_statements",
+        "redis_time", "redis_commands", "db_sessions", "db_sessions_unused",
+    )
+
+    def __init__(self):
+        self.db_time = 0.0
+        self.db_queries = 0
+        self.db_slowest = 0.0
+        self.db_slowest_statement: Optional[str] = None
+        # Normalized statement -> executions, for N+1 detection
+        self.db_statements: Dict[str, int] = {}
+        self.redis_time = 0.0
+        self.redis_commands = 0
+        # Sessions from get_db/get_read_db, and those that never connected
+        self.db_sessions = 0
+        self.db_sessions_unused = 0
+
+
+request_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
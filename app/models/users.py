@@ -2,14 +2,16 @@ import enum
 from datetime import datetime
 from datetime import UTC
 
-from typing import Optional, Union, Dict, Any
+from typing import Optional, Union, Dict, Any, List, Tuple
 
 from fastapi import Depends, Request
+from fastapi.security import OAuth2PasswordRequestForm
 from fastapi_users.db import SQLAlchemyBaseUserTable, SQLAlchemyUserDatabase
 from fastapi_users import (
     BaseUserManager,
     IntegerIDMixin,
     InvalidPasswordException,
+    exceptions,
 )
 
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -18,10 +20,16 @@ from sqlalchemy import (
     Integer,
     Enum,
     DateTime,
+    Index,
+    func,
+    select,
+    tuple_,
 )
 from sqlalchemy.orm import mapped_column, Mapped
 
-from app.database import Base, get_db
+from app.auth.passwords import password_service
+from app.cache.users import UserCache
+from app.database import Base, get_db, get_read_db
 from app.config import AUTH_SECRET_KEY
 from app.logging import logger
 from app.schemas.users import UserCreate
@@ -79,17 +87,135 @@ class User(SQLAlchemyBaseUserTable[int], Base):
     )
 
 
-async def get_user_db(session: AsyncSession = Depends(get_db)):
+# Keyset pagination over (created_at, id), optionally within one timezone
+Index("ix_users_created_at_id", User.created_at, User.id)
+Index("ix_users_timezone_created_at_id", User.timezone, User.created_at, User.id)
+# Case-insensitive email prefix search; also serves fastapi-users' lower(email) lookups
+Index(
+    "ix_users_email_lower_pattern",
+    func.lower(User.email).label("email_lower"),
+    postgresql_ops={"email_lower": "varchar_pattern_ops"},
+)
+
+
+def email_prefix_filter(prefix: str) -> Any:
+    """
+    Case-insensitive "email starts with" condition that can use ix_users_email_lower_pattern.
+
+    Args:
+        prefix (str): The start of the email address; LIKE wildcards are matched literally.
+
+    Returns:
+        Any: The SQLAlchemy condition.
+    """
+    escaped = prefix.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return func.lower(User.email).like(f"{escaped}%", escape="\\")
+
+
+async def list_users(
+    session: AsyncSession,
+    limit: int,
+    after: Optional[Tuple[datetime, int]] = None,
+    timezone: Optional[TimezoneEnum] = None,
+    is_active: Optional[bool] = None,
+    is_verified: Optional[bool] = None,
+    email_prefix: Optional[str] = None,
+) -> List[User]:
+    """
+    Newest users first, a page at a time, continuing after a (created_at, id) position.
+
+    Seeks on the (created_at, id) indexes instead of skipping rows, so every
+    page costs the same however deep it is.
+
+    Args:
+        session (AsyncSession): The database session.
+        limit (int): Users to return.
+        after (Optional[Tuple[datetime, int]]): created_at and id of the last user of the previous page.
+        timezone (Optional[TimezoneEnum]): Only users in this timezone.
+        is_active (Optional[bool]): Only active or only inactive users.
+        is_verified (Optional[bool]): Only verified or only unverified users.
+        email_prefix (Optional[str]): Only users whose email starts with this, ignoring case.
+
+    Returns:
+        List[User]: Up to `limit` users.
+    """
+    stmt = select(User).order_by(User.created_at.desc(), User.id.desc()).limit(limit)
+    if after is not None:
+        stmt = stmt.where(tuple_(User.created_at, User.id) < tuple_(*after))
+    if timezone is not None:
+        stmt = stmt.where(User.timezone == timezone)
+    if is_active is not None:
+        stmt = stmt.where(User.is_active == is_active)
+    if is_verified is not None:
+        stmt = stmt.where(User.is_verified == is_verified)
+    if email_prefix:
+        stmt = stmt.where(email_prefix_filter(email_prefix))
+    return list((await session.execute(stmt)).scalars())
+
+
+user_cache = UserCache(User)
+
+
+class CachedSQLAlchemyUserDatabase(SQLAlchemyUserDatabase):
+    """
+    SQLAlchemyUserDatabase that serves lookups by id from the two-tier user cache.
+
+    Args:
+        session (AsyncSession): Primary session, used for writes and every other lookup.
+        user_table (type): The user model.
+        read_session (AsyncSession): Replica-routed session for cache misses in `get`.
+    """
+
+    def __init__(self, session: AsyncSession, user_table: type, read_session: Optional[AsyncSession] = None):
+        super().__init__(session, user_table)
+        self.read_session = read_session
+
+    async def get(self, id: int) -> Optional[User]:
+        """
+        Gets a user by id, falling back to the database on a cache miss.
+
+        Args:
+            id (int): The user id.
+
+        Returns:
+            Optional[User]: The user attached to the primary session, or None if it does not exist.
+        """
+        user = await user_cache.get(self.session, id)
+        if user is not None:
+            return user
+
+        if self.read_session is None:
+            user = await super().get(id)
+        else:
+            result = await self.read_session.execute(select(User).where(User.id == id))
+            user = result.unique().scalar_one_or_none()
+            if user is not None:
+                # Updates to the user (e.g. PATCH /users/me) go through the primary session
+                user = await self.session.merge(user, load=False)
+        if user is not None:
+            await user_cache.set(user)
+        return user
+
+
+async def get_user_db(
+    session: AsyncSession = Depends(get_db),
+    read_session: AsyncSession = Depends(get_read_db),
+):
     """
     Provides a SQLAlchemyUserDatabase instance for interacting with the user table.
 
+    Only resolving a token to its user may read from a replica. Registration
+    and login look users up by email on the primary, so they never miss a user
+    that was just created.
+
     Args:
         session (AsyncSession): The SQLAlchemy async session.
+        read_session (AsyncSession): The replica-routed session for token lookups.
 
     Yields:
         SQLAlchemyUserDatabase: The user database handler.
     """
-    yield SQLAlchemyUserDatabase(session, User)
+    yield CachedSQLAlchemyUserDatabase(session, User)
 
 
 class UserManager(IntegerIDMixin, BaseUserManager[User, Integer]):
@@ -106,6 +232,109 @@ class UserManager(IntegerIDMixin, BaseUserManager[User, Integer]):
     verification_token_secret = AUTH_SECRET_KEY
     reset_password_token_lifetime_seconds = 86400
 
+    def __init__(self, user_db: SQLAlchemyUserDatabase):
+        super().__init__(user_db, password_service.password_helper)
+
+    async def create(
+        self,
+        user_create: UserCreate,
+        safe: bool = False,
+        request: Optional[Request] = None,
+    ) -> User:
+        """
+        Creates a user, hashing the password on the password service pool.
+
+        Args:
+            user_create (UserCreate): The user to create.
+            safe (bool): If True, ignore sensitive fields such as is_superuser.
+            request (Optional[Request]): The request that triggered this action.
+
+        Returns:
+            User: The created user.
+
+        Raises:
+            UserAlreadyExists: If a user with the same email exists.
+        """
+        await self.validate_password(user_create.password, user_create)
+
+        existing_user = await self.user_db.get_by_email(user_create.email)
+        if existing_user is not None:
+            raise exceptions.UserAlreadyExists()
+
+        user_dict = (
+            user_create.create_update_dict()
+            if safe
+            else user_create.create_update_dict_superuser()
+        )
+        password = user_dict.pop("password")
+        user_dict["hashed_password"] = await password_service.hash(password)
+
+        created_user = await self.user_db.create(user_dict)
+
+        await self.on_after_register(created_user, request)
+
+        return created_user
+
+    async def authenticate(
+        self,
+        credentials: OAuth2PasswordRequestForm
+    ) -> Optional[User]:
+        """
+        Authenticates a user by email and password on the password service pool.
+
+        Args:
+            credentials (OAuth2PasswordRequestForm): The submitted credentials.
+
+        Returns:
+            Optional[User]: The user if the credentials are valid, otherwise None.
+        """
+        try:
+            user = await self.get_by_email(credentials.username)
+        except exceptions.UserNotExists:
+            # Run the hasher anyway to mitigate timing attacks
+            await password_service.hash(credentials.password)
+            return None
+
+        verified, updated_password_hash = await password_service.verify_and_update(
+            credentials.password, user.hashed_password
+        )
+        if not verified:
+            return None
+
+        # Upgrade the stored hash if the hasher changed
+        if updated_password_hash is not None:
+            await self.user_db.update(user, {"hashed_password": updated_password_hash})
+            await user_cache.invalidate(user.id)
+
+        return user
+
+    async def _update(self, user: User, update_dict: Dict[str, Any]) -> User:
+        """
+        Validates and applies an update, hashing new passwords on the password service pool.
+
+        Args:
+            user (User): The user to update.
+            update_dict (Dict[str, Any]): The fields to update.
+
+        Returns:
+            User: The updated user.
+        """
+        validated_update_dict = {}
+        for field, value in update_dict.items():
+            if field == "email" and value != user.email:
+                try:
+                    await self.get_by_email(value)
+                    raise exceptions.UserAlreadyExists()
+                except exceptions.UserNotExists:
+                    validated_update_dict["email"] = value
+                    validated_update_dict["is_verified"] = False
+            elif field == "password" and value is not None:
+                await self.validate_password(value, user)
+                validated_update_dict["hashed_password"] = await password_service.hash(value)
+            else:
+                validated_update_dict[field] = value
+        return await self.user_db.update(user, validated_update_dict)
+
     async def on_after_register(
         self,
         user: User,
@@ -193,6 +422,49 @@ class UserManager(IntegerIDMixin, BaseUserManager[User, Integer]):
             response (Optional[Any]): The response object.
         """
         logger.info("User %d has been updated with %s.", user.id, update_dict)
+        await user_cache.invalidate(user.id)
+
+    async def on_after_verify(
+        self,
+        user: User,
+        request: Optional[Request] = None
+    ):
+        """
+        Called after a user has verified their email.
+
+        Args:
+            user (User): The user who has been verified.
+            request (Optional[Request]): The request that triggered this action.
+        """
+        await user_cache.invalidate(user.id)
+
+    async def on_after_reset_password(
+        self,
+        user: User,
+        request: Optional[Request] = None
+    ):
+        """
+        Called after a user has reset their password.
+
+        Args:
+            user (User): The user who has reset their password.
+            request (Optional[Request]): The request that triggered this action.
+        """
+        await user_cache.invalidate(user.id)
+
+    async def on_after_delete(
+        self,
+        user: User,
+        request: Optional[Request] = None
+    ):
+        """
+        Called after a user has been deleted.
+
+        Args:
+            user (User): The user who has been deleted.
+            request (Optional[Request]): The request that triggered this action.
+        """
+        await user_cache.invalidate(user.id)
 
     async def validate_password(
         self,
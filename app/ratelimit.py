@@ -0,0 +1,278 @@
+"""
+Per-route, per-client rate limiting.
+
+Each rule is a token bucket in Redis, one per client, updated atomically by a
+Lua script. Clients are identified by the user id in their bearer token, or
+by IP address when there is no valid token.
+
+Workers take up to RATE_LIMIT_PREFETCH tokens per script call and spend them
+locally, and remember a refusal until the bucket refills, so a busy client
+costs a Redis round trip every few requests instead of on each one. Tokens a
+worker holds are already gone from the bucket, and unspent ones are dropped
+once the bucket could have refilled them, so a client can't save them up to
+go over the limit; a client spread over several workers may just be refused
+slightly early.
+
+If Redis is unavailable requests are let through.
+"""
+import math
+import re
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import jwt
+from fastapi_users.jwt import decode_jwt
+from redis.exceptions import RedisError
+from starlette.routing import compile_path
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.auth.backend import get_jwt_strategy
+from app.config import AUTH_SECRET_KEY, RATE_LIMITS, RATE_LIMIT_PREFETCH
+from app.logging import logger
+from app.redis import get_redis
+
+RATE_LIMIT_KEY_PREFIX = "ratelimit:"
+# How long to stop asking Redis after it failed
+RETRY_REDIS_SECONDS = 1.0
+
+# Refill the bucket for the time since its last update, then take up to
+# ARGV[3] whole tokens. Returns the tokens granted and, when none were, the
+# seconds until the next one.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local wanted = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local granted = math.min(wanted, math.floor(tokens))
+tokens = tokens - granted
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+local retry_after = 0
+if granted == 0 then
+    retry_after = (1 - tokens) / rate
+end
+return {granted, tostring(retry_after)}
+"""
+
+
+class RateLimitRule(NamedTuple):
+    """
+    `limit` requests per `seconds` for one method and route template.
+    """
+
+    method: str
+    path: str
+    limit: int
+    seconds: float
+    path_regex: "re.Pattern[str]"
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.path}"
+
+    @property
+    def rate(self) -> float:
+        return self.limit / self.seconds
+
+    def matches(self, scope: Scope) -> bool:
+        return scope["method"] == self.method and self.path_regex.match(scope["path"]) is not None
+
+
+def parse_rules(rules: str) -> List[RateLimitRule]:
+    """
+    Parse "METHOD /route/template=requests/seconds,..." into rules.
+
+    Args:
+        rules (str): The rules, e.g. "POST /api/v1/auth/login=10/60".
+
+    Returns:
+        List[RateLimitRule]: One rule per entry.
+    """
+    parsed = []
+    for item in filter(None, (part.strip() for part in rules.split(","))):
+        route, _, quota = item.rpartition("=")
+        method, _, path = route.strip().partition(" ")
+        limit, _, seconds = quota.partition("/")
+        path_regex, _, _ = compile_path(path.strip())
+        parsed.append(RateLimitRule(method.upper(), path.strip(), int(limit), float(seconds), path_regex))
+    return parsed
+
+
+class RateLimiter:
+    """
+    Token buckets in Redis, with tokens prefetched and refusals remembered per worker.
+
+    Args:
+        rules (List[RateLimitRule]): The limits to enforce.
+        prefetch (int): Most tokens taken from Redis at once, capped at a tenth of a rule's limit.
+        max_keys (int): Clients tracked locally before the local state is reset.
+    """
+
+    def __init__(self, rules: List[RateLimitRule], prefetch: int = RATE_LIMIT_PREFETCH, max_keys: int = 10000):
+        self.rules = rules
+        self.prefetch = prefetch
+        self.max_keys = max_keys
+        self._script = None
+        # Bucket key -> tokens taken from Redis and not yet spent, and the
+        # monotonic time they are dropped at
+        self._tokens: Dict[str, Tuple[int, float]] = {}
+        # Bucket key -> monotonic time the bucket has a token again
+        self._refused_until: Dict[str, float] = {}
+        self._redis_down_until = 0.0
+        self.allowed_local = 0
+        self.allowed_redis = 0
+        self.limited = 0
+        self.errors = 0
+
+    def rule_for(self, scope: Scope) -> Optional[RateLimitRule]:
+        for rule in self.rules:
+            if rule.matches(scope):
+                return rule
+        return None
+
+    def _prefetch_for(self, rule: RateLimitRule) -> int:
+        return max(1, min(self.prefetch, rule.limit // 10))
+
+    async def _take(self, key: str, rule: RateLimitRule) -> Tuple[int, float]:
+        redis = await get_redis()
+        if self._script is None:
+            self._script = redis.register_script(TOKEN_BUCKET_SCRIPT)
+        granted, retry_after = await self._script(
+            keys=[key], args=[rule.limit, rule.rate, self._prefetch_for(rule)], client=redis,
+        )
+        return int(granted), float(retry_after)
+
+    async def acquire(self, rule: RateLimitRule, identity: str) -> float:
+        """
+        Spend one token of `identity`'s bucket for `rule`.
+
+        Args:
+            rule (RateLimitRule): The rule the request falls under.
+            identity (str): The client, e.g. "user:<id>" or "ip:<address>".
+
+        Returns:
+            float: 0 if the request may go ahead, otherwise seconds until it may be retried.
+        """
+        key = f"{RATE_LIMIT_KEY_PREFIX}{rule.name}:{identity}"
+        now = time.monotonic()
+
+        refused_until = self._refused_until.get(key)
+        if refused_until is not None:
+            if now < refused_until:
+                self.limited += 1
+                return refused_until - now
+            del self._refused_until[key]
+
+        held = self._tokens.get(key)
+        if held is not None:
+            tokens, expires_at = held
+            if now < expires_at:
+                if tokens > 1:
+                    self._tokens[key] = (tokens - 1, expires_at)
+                else:
+                    del self._tokens[key]
+                self.allowed_local += 1
+                return 0.0
+            del self._tokens[key]
+
+        if now < self._redis_down_until:
+            return 0.0
+        try:
+            granted, retry_after = await self._take(key, rule)
+        except (RedisError, OSError) as exc:
+            self.errors += 1
+            self._redis_down_until = now + RETRY_REDIS_SECONDS
+            logger.warning("Rate limiting skipped, Redis unavailable: %s", exc)
+            return 0.0
+
+        if len(self._tokens) + len(self._refused_until) >= self.max_keys:
+            self._tokens.clear()
+            self._refused_until.clear()
+        if granted == 0:
+            self._refused_until[key] = now + retry_after
+            self.limited += 1
+            return retry_after
+        if granted > 1:
+            # Once Redis has refilled what was taken, held tokens would come on
+            # top of a full bucket
+            self._tokens[key] = (granted - 1, now + granted / rule.rate)
+        self.allowed_redis += 1
+        return 0.0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "allowed_local": self.allowed_local,
+            "allowed_redis": self.allowed_redis,
+            "limited": self.limited,
+            "errors": self.errors,
+            "tracked_clients": len(self._tokens) + len(self._refused_until),
+        }
+
+
+rate_limiter = RateLimiter(parse_rules(RATE_LIMITS))
+
+
+def client_identity(scope: Scope, audience: List[str]) -> str:
+    """
+    The user id from a valid bearer token, otherwise the client's IP address.
+
+    Only the token's signature and expiry are checked, so identifying a client
+    needs no database or Redis lookup.
+    """
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                try:
+                    user_id = decode_jwt(token, AUTH_SECRET_KEY, audience).get("sub")
+                except jwt.PyJWTError:
+                    user_id = None
+                if user_id is not None:
+                    return f"user:{user_id}"
+            break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class RateLimitMiddleware:
+    """
+    Answers 429 with a Retry-After header once a client exceeds a route's limit.
+
+    Args:
+        app (ASGIApp): The wrapped application.
+        limiter (RateLimiter): The limits and their state.
+    """
+
+    def __init__(self, app: ASGIApp, limiter: RateLimiter = rate_limiter):
+        self.app = app
+        self.limiter = limiter
+        self.audience: List[str] = get_jwt_strategy().token_audience
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.limiter.rules:
+            await self.app(scope, receive, send)
+            return
+        rule = self.limiter.rule_for(scope)
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = await self.limiter.acquire(rule, client_identity(scope, self.audience))
+        if not retry_after:
+            await self.app(scope, receive, send)
+            return
+
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": b'{"detail":"Too many requests"}'})
@@ -1,13 +1,210 @@
-import redis.asyncio as redis
-from redis.asyncio.client import Redis
-from typing import Dict, Any, Optional
-from app.config import REDIS_URL
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+from redis.asyncio import BlockingConnectionPool
+from redis.asyncio.client import Pipeline, Redis
+from redis.exceptions import ConnectionError as RedisConnectionError, RedisError
+from app.config import (
+    REDIS_URL,
+    REDIS_MAX_CONNECTIONS,
+    REDIS_POOL_TIMEOUT,
+    REDIS_SOCKET_TIMEOUT,
+    REDIS_SOCKET_CONNECT_TIMEOUT,
+    REDIS_HEALTH_CHECK_INTERVAL,
+    REDIS_MAX_TOTAL_CONNECTIONS,
+    WEB_CONCURRENCY,
+)
+from app.metrics.timing import request_timings
+from app.utils.stats import Histogram
+
+# Command latency by command name, plus "PIPELINE" for whole pipelines
+command_time: Dict[str, Histogram] = {}
+
+
+def _record(command: str, started: float) -> None:
+    elapsed = time.perf_counter() - started
+    histogram = command_time.get(command)
+    if histogram is None:
+        histogram = command_time[command] = Histogram()
+    histogram.observe(elapsed)
+    timings = request_timings.get()
+    if timings is not None:
+        timings.redis_time += elapsed
+        timings.redis_commands += 1
+
+
+class InstrumentedConnectionPool(BlockingConnectionPool):
+    """
+    Bounded pool that waits up to `timeout` for a free connection and records
+    how long callers wait, how often they give up (`timeouts`, the pool is
+    exhausted) and how often connecting fails (`connect_errors`, Redis is
+    unreachable).
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.wait_time = Histogram()
+        self.timeouts = 0
+        self.connect_errors = 0
+
+    async def get_connection(self, command_name: Any, *keys: Any, **options: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return await super().get_connection(command_name, *keys, **options)
+        except (RedisError, OSError) as exc:
+            # Waiting for a free connection ends in a ConnectionError raised from
+            # the wait's TimeoutError; anything else came from connecting
+            if isinstance(exc, RedisConnectionError) and isinstance(exc.__cause__, asyncio.TimeoutError):
+                self.timeouts += 1
+            else:
+                self.connect_errors += 1
+            raise
+        finally:
+            self.wait_time.observe(time.perf_counter() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_connections": self.max_connections,
+            "in_use": len(self._in_use_connections),
+            "available": len(self._available_connections),
+            "timeouts": self.timeouts,
+            "connect_errors": self.connect_errors,
+            "wait_time_seconds": self.wait_time.snapshot(),
+        }
+
+
+class InstrumentedPipeline(Pipeline):
+    """
+    Pipeline that records its round trip as one command.
+    """
+
+    async def execute(self, raise_on_error: bool = True) -> Any:
+        started = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            _record("PIPELINE", started)
+
+
+class InstrumentedRedis(Redis):
+    """
+    Redis client that records each command's latency, globally and for the current request.
+    """
+
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            _record(str(args[0]).upper(), started)
+
+    def pipeline(self, transaction: bool = True, shard_hint: Optional[str] = None) -> Pipeline:
+        return InstrumentedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+
+# Each worker has a text and a binary client, each with its own pool
+CLIENTS_PER_WORKER = 2
+
+
+def redis_pool_size(max_connections: int, max_total: int, workers: int) -> int:
+    """
+    Fit each client's pool into a connection budget shared by all workers.
+
+    Args:
+        max_connections (int): Requested connections per client.
+        max_total (int): Total budget across workers and clients; 0 means no budget.
+        workers (int): Number of worker processes sharing the budget.
+
+    Returns:
+        int: The max_connections to give each pool.
+    """
+    if max_total <= 0:
+        return max_connections
+    per_client = max_total // (max(1, workers) * CLIENTS_PER_WORKER)
+    return max(1, min(max_connections, per_client))
+
+
+def create_redis(decode_responses: bool) -> InstrumentedRedis:
+    """
+    Build a client on its own bounded pool using the REDIS_* settings.
+    """
+    pool = InstrumentedConnectionPool.from_url(
+        REDIS_URL,
+        max_connections=redis_pool_size(REDIS_MAX_CONNECTIONS, REDIS_MAX_TOTAL_CONNECTIONS, WEB_CONCURRENCY),
+        timeout=REDIS_POOL_TIMEOUT,
+        socket_timeout=REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=REDIS_SOCKET_CONNECT_TIMEOUT,
+        socket_keepalive=True,
+        health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+        retry_on_timeout=True,
+        decode_responses=decode_responses,
+    )
+    return InstrumentedRedis(connection_pool=pool)
+
 
 redis_client: Redis = None
+# Client for binary payloads (e.g. Celery results), responses are left as bytes
+redis_binary_client: Redis = None
 
 
 async def get_redis() -> Redis:
     global redis_client
     if redis_client is None:
-        redis_client = redis.from_url(REDIS_URL, decode_responses=True)
+        redis_client = create_redis(decode_responses=True)
     return redis_client
+
+
+async def get_redis_binary() -> Redis:
+    global redis_binary_client
+    if redis_binary_client is None:
+        redis_binary_client = create_redis(decode_responses=False)
+    return redis_binary_client
+
+
+@asynccontextmanager
+async def redis_pipeline(transaction: bool = False, binary: bool = False) -> AsyncIterator[Pipeline]:
+    """
+    Batch commands into a single round trip.
+
+        async with redis_pipeline() as pipe:
+            pipe.set("key", "value")
+            pipe.get("key")
+            _, value = await pipe.execute()
+
+    Args:
+        transaction (bool): Wrap the commands in MULTI/EXEC.
+        binary (bool): Use the bytes client instead of the decoding one.
+    """
+    redis = await (get_redis_binary() if binary else get_redis())
+    async with redis.pipeline(transaction=transaction) as pipe:
+        yield pipe
+
+
+def redis_stats() -> Dict[str, Any]:
+    """
+    Pool statistics per client and command latency histograms.
+    """
+    pools = {
+        name: client.connection_pool.stats()
+        for name, client in (("text", redis_client), ("binary", redis_binary_client))
+        if client is not None
+    }
+    return {
+        "pools": pools,
+        "command_time_seconds": {name: histogram.snapshot() for name, histogram in command_time.items()},
+    }
+
+
+async def close_redis() -> None:
+    """
+    Close both clients and disconnect their pools.
+    """
+    global redis_client, redis_binary_client
+    for client in (redis_client, redis_binary_client):
+        if client is not None:
+            await client.aclose()
+            await client.connection_pool.disconnect()
+    redis_client = redis_binary_client = None
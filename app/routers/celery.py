@@ -1,9 +1,19 @@
-from fastapi import APIRouter, Depends
+import json
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from app.models.users import User
-from app.celery_tasks import enqueue_hello_world
+from app.celery_tasks import (
+    enqueue_hello_world,
+    enqueue_hello_world_bulk,
+    get_task_statuses,
+    stream_task_statuses,
+)
+from app.config import CELERY_BULK_MAX_TASKS, CELERY_STATUS_STREAM_TIMEOUT
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
 from app.routers.users import fastapi_users
+from app.schemas.celery import BulkEnqueue, BulkEnqueued, TaskStatus, TaskStatusQuery
 
 current_user = fastapi_users.current_user(active=True)
 
@@ -17,3 +27,57 @@ async def hello_world_celery(
 ):
     task_id = await enqueue_hello_world()  # Await the coroutine
     return {"task_id": task_id, "status": "Hello World task enqueued"}
+
+
+@router.post("/celery/helloworld/bulk/", response_model=BulkEnqueued)
+async def hello_world_celery_bulk(
+    payload: BulkEnqueue,
+    user: User = Depends(current_user),
+):
+    task_ids = await enqueue_hello_world_bulk(payload.count)
+    return {"task_ids": task_ids, "status": f"{len(task_ids)} Hello World tasks enqueued"}
+
+
+@router.get("/celery/tasks/stream/")
+async def task_status_stream(
+    task_ids: List[str] = Query(...),
+    user: User = Depends(current_user),
+):
+    """
+    Server-sent events with every status change of the given tasks.
+
+    Emits a `status` event per change, comment keepalives while waiting and an
+    `end` event once all tasks are ready or the stream times out.
+    """
+    if len(task_ids) > CELERY_BULK_MAX_TASKS:
+        raise HTTPException(status_code=422, detail="Too many task ids")
+
+    async def events():
+        async for status in stream_task_statuses(task_ids, CELERY_STATUS_STREAM_TIMEOUT):
+            if status is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: status\ndata: {json.dumps(status, default=str)}\n\n"
+        yield "event: end\ndata: {}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/celery/tasks/{task_id}/", response_model=TaskStatus)
+async def task_status(
+    task_id: str,
+    user: User = Depends(current_user),
+):
+    return (await get_task_statuses([task_id]))[0]
+
+
+@router.post("/celery/tasks/status/", response_model=List[TaskStatus])
+async def task_statuses(
+    payload: TaskStatusQuery,
+    user: User = Depends(current_user),
+):
+    return await get_task_statuses(payload.task_ids)
@@ -0,0 +1,32 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.lifespan import state
+
+router = APIRouter()
+
+
+@router.get("/health")
+async def health():
+    """
+    Liveness: the process is up and serving. Touches no dependencies.
+    """
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+async def ready():
+    """
+    Readiness: warmed up, not draining, and the database and Redis respond.
+    Dependency checks are cached for HEALTH_CHECK_CACHE_SECONDS.
+    """
+    if not state.ready:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "draining" if state.draining else "starting"},
+        )
+    checks = await state.dependency_checks()
+    healthy = all(result == "ok" for result in checks.values())
+    return JSONResponse(
+        status_code=200 if healthy else 503,
+        content={"status": "ready" if healthy else "degraded", "checks": checks},
+    )
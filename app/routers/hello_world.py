@@ -2,7 +2,7 @@ from fastapi import APIRouter, Request, Depends
 from app.logging import logger
 from app.database import get_db
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.redis import get_redis
+from app.redis import redis_pipeline
 from app.routers.users import fastapi_users
 
 current_user = fastapi_users.current_user(active=True)
@@ -26,15 +26,15 @@ async def hello_world(
 @router.get("/ping_redis")
 async def hello_world(
     request: Request,
-    redis=Depends(get_redis),
     current_user=Depends(current_user),
 ):
     """
     Hello Redis endpoint.
     """
-    # add redis key hellow world to redis
-    await redis.set("ping", "pong from redis server")
-    # get redis key hello
-    value = await redis.get("ping")
+    # set and read back the key in a single round trip
+    async with redis_pipeline() as pipe:
+        pipe.set("ping", "pong from redis server")
+        pipe.get("ping")
+        _, value = await pipe.execute()
     logger.info("Ping Redis endpoint")
     return value
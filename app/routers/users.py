@@ -1,9 +1,73 @@
-from app.models.users import User, get_user_manager
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+
+from app.models.users import TimezoneEnum, User, get_user_manager, list_users
 from sqlalchemy import Integer
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi_users import FastAPIUsers
 from app.auth.backend import auth_backend
+from app.config import USER_LIST_MAX_PAGE_SIZE
+from app.database import get_read_db
+from app.schemas.users import UserPage
 
 fastapi_users = FastAPIUsers[User, Integer](
     get_user_manager,
     [auth_backend],
 )
+
+current_superuser = fastapi_users.current_user(active=True, superuser=True)
+
+router = APIRouter()
+
+
+def encode_cursor(user: User) -> str:
+    """
+    Opaque cursor pointing just after `user` in the listing order.
+    """
+    position = f"{user.created_at.isoformat()}|{user.id}"
+    return base64.urlsafe_b64encode(position.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    The (created_at, id) position a cursor points after.
+
+    Raises:
+        HTTPException: 400 if the cursor wasn't produced by encode_cursor.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, _, user_id = base64.urlsafe_b64decode(padded).decode().partition("|")
+        return datetime.fromisoformat(created_at), int(user_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+@router.get("/users/", response_model=UserPage)
+async def users_list(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=USER_LIST_MAX_PAGE_SIZE),
+    timezone: Optional[TimezoneEnum] = None,
+    is_active: Optional[bool] = None,
+    is_verified: Optional[bool] = None,
+    email: Optional[str] = Query(None, min_length=1, description="Email prefix, case-insensitive"),
+    user: User = Depends(current_superuser),
+    session: AsyncSession = Depends(get_read_db),
+):
+    """
+    Newest users first, paginated with `next_cursor` rather than page numbers.
+    """
+    users = await list_users(
+        session,
+        # One extra row tells whether there is a next page
+        limit=limit + 1,
+        after=decode_cursor(cursor) if cursor else None,
+        timezone=timezone,
+        is_active=is_active,
+        is_verified=is_verified,
+        email_prefix=email,
+    )
+    next_cursor = encode_cursor(users[limit - 1]) if len(users) > limit else None
+    return {"items": users[:limit], "next_cursor": next_cursor}
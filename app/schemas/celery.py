@@ -0,0 +1,23 @@
+from typing import Any, List, Optional
+from pydantic import BaseModel, Field
+from app.config import CELERY_BULK_MAX_TASKS
+
+
+class BulkEnqueue(BaseModel):
+    count: int = Field(ge=1, le=CELERY_BULK_MAX_TASKS)
+
+
+class BulkEnqueued(BaseModel):
+    task_ids: List[str]
+    status: str
+
+
+class TaskStatusQuery(BaseModel):
+    task_ids: List[str] = Field(min_length=1, max_length=CELERY_BULK_MAX_TASKS)
+
+
+class TaskStatus(BaseModel):
+    task_id: str
+    status: str
+    result: Optional[Any] = None
+    date_done: Optional[str] = None
@@ -1,5 +1,7 @@
-from typing import Optional
+from datetime import datetime
+from typing import List, Optional
 from fastapi_users import schemas
+from pydantic import BaseModel, EmailStr, Field, model_validator
 
 
 class UserRead(schemas.BaseUser[int]):
@@ -12,3 +14,28 @@ class UserCreate(schemas.BaseUserCreate):
 
 class UserUpdate(schemas.BaseUserUpdate):
     timezone: Optional[str]
+
+
+class UserPage(BaseModel):
+    items: List[UserRead]
+    # Pass as `cursor` to get the next page; None on the last page
+    next_cursor: Optional[str] = None
+
+
+class UserImport(BaseModel):
+    email: EmailStr
+    # Exactly one of password and hashed_password
+    password: Optional[str] = None
+    # The users.hashed_password column length
+    hashed_password: Optional[str] = Field(None, max_length=1024)
+    timezone: str = "Europe/London"
+    is_active: bool = True
+    is_superuser: bool = False
+    is_verified: bool = False
+    created_at: Optional[datetime] = None
+
+    @model_validator(mode="after")
+    def one_password(self) -> "UserImport":
+        if (self.password is None) == (self.hashed_password is None):
+            raise ValueError("exactly one of password and hashed_password is required")
+        return self
@@ -0,0 +1,129 @@
+"""
+Production entry point: uvicorn with one worker process per available CPU.
+
+    python -m app.server
+
+WEB_CONCURRENCY overrides the number of workers. The resolved number is
+exported before the app is imported, so every worker sizes its database and
+Redis pools to its share of DB_MAX_CONNECTIONS and REDIS_MAX_TOTAL_CONNECTIONS.
+Workers are restarted by uvicorn's supervisor when they exit, including after
+SERVER_LIMIT_MAX_REQUESTS (plus a per-worker random jitter) requests.
+"""
+import importlib.util
+import math
+import os
+import random
+from functools import partial
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import socket
+    import uvicorn
+
+
+def available_cpus() -> int:
+    """
+    CPUs this process may run on, honouring CPU affinity and a cgroup v2 quota.
+
+    Returns:
+        int: At least 1.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        # Containers limited with --cpus see every host CPU but get a quota
+        with open("/sys/fs/cgroup/cpu.max") as cpu_max:
+            quota, period = cpu_max.read().split()
+        if quota != "max":
+            cpus = min(cpus, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+def worker_count() -> int:
+    """
+    WEB_CONCURRENCY when set, otherwise one worker per available CPU.
+    """
+    return int(os.getenv("WEB_CONCURRENCY") or 0) or available_cpus()
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def server_options(workers: int) -> Dict[str, Any]:
+    """
+    Build uvicorn.run keyword arguments from the SERVER_* settings.
+
+    Args:
+        workers (int): Number of worker processes.
+
+    Returns:
+        Dict[str, Any]: Options for uvicorn.run.
+    """
+    from app.config import (
+        SERVER_HOST,
+        SERVER_PORT,
+        SERVER_BACKLOG,
+        SERVER_KEEP_ALIVE_SECONDS,
+        SERVER_LIMIT_CONCURRENCY,
+        SERVER_LIMIT_MAX_REQUESTS,
+        SHUTDOWN_DRAIN_SECONDS,
+    )
+
+    return {
+        "host": SERVER_HOST,
+        "port": SERVER_PORT,
+        "workers": workers,
+        # Fall back to the pure Python implementations where the C ones aren't available
+        "loop": "uvloop" if _installed("uvloop") else "asyncio",
+        "http": "httptools" if _installed("httptools") else "h11",
+        "backlog": SERVER_BACKLOG,
+        "timeout_keep_alive": SERVER_KEEP_ALIVE_SECONDS,
+        "limit_concurrency": SERVER_LIMIT_CONCURRENCY or None,
+        "limit_max_requests": SERVER_LIMIT_MAX_REQUESTS or None,
+        # Counted from SIGTERM; the lifespan drain then only gets what is left
+        "timeout_graceful_shutdown": math.ceil(SHUTDOWN_DRAIN_SECONDS),
+        # Fail fast instead of serving without warmed-up connections
+        "lifespan": "on",
+    }
+
+
+def _serve(config: "uvicorn.Config", sockets: Optional[List["socket.socket"]] = None) -> None:
+    """
+    Run one server process, with its own max-requests limit.
+    """
+    import uvicorn
+    from app.config import SERVER_LIMIT_MAX_REQUESTS_JITTER
+
+    if config.limit_max_requests:
+        config.limit_max_requests += random.randint(0, SERVER_LIMIT_MAX_REQUESTS_JITTER)
+    uvicorn.Server(config).run(sockets=sockets)
+
+
+def main() -> None:
+    # Must happen before app.config is imported, here and in the spawned workers
+    os.environ["WEB_CONCURRENCY"] = str(worker_count())
+
+    import uvicorn
+    from uvicorn.supervisors import Multiprocess
+    from app.logging import logger
+
+    options = server_options(int(os.environ["WEB_CONCURRENCY"]))
+    logger.info(
+        "Starting %d workers on %s:%d (loop=%s, http=%s)",
+        options["workers"], options["host"], options["port"], options["loop"], options["http"],
+    )
+    # What uvicorn.run does, but each worker goes through _serve
+    config = uvicorn.Config("app.main:app", **options)
+    if config.workers > 1:
+        Multiprocess(config, target=partial(_serve, config), sockets=[config.bind_socket()]).run()
+    else:
+        _serve(config)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Lightweight in-process statistics helpers.
+"""
+
+from bisect import bisect_left
+from typing import Any, Dict, Sequence
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS: Sequence[float] = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram.
+
+    Observations only touch a preallocated list and two numbers, so recording
+    is cheap enough for hot paths. Not thread-safe; observe from the event loop.
+
+    Args:
+        buckets (Sequence[float]): Sorted upper bounds of the buckets.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns the histogram as cumulative `le` buckets plus count, sum and max.
+        """
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = self.count
+        return {
+            "buckets": buckets,
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+        }
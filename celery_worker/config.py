@@ -1,5 +1,14 @@
-from celery import Celery
-from celery_worker.config_environment import REDIS_URL
+from celery import Celery, Task
+from celery_worker.config_environment import (
+    REDIS_URL,
+    CELERY_SERIALIZER,
+    CELERY_COMPRESSION_THRESHOLD,
+    CELERY_RESULT_EXPIRES,
+)
+from celery_worker.routing import ROUTING_CONFIG
+from celery_worker.serialization import register_serializer, SERIALIZER_NAME
+
+register_serializer(CELERY_COMPRESSION_THRESHOLD)
 
 # Configure Celery
 celery = Celery(
@@ -9,13 +18,33 @@ celery = Celery(
 )
 
 celery.conf.update(
-    task_serializer="json",
-    accept_content=["json"],
-    result_serializer="json",
+    task_serializer=CELERY_SERIALIZER,
+    # Accept both so the API and worker can be switched one at a time
+    accept_content=["json", SERIALIZER_NAME],
+    result_serializer=CELERY_SERIALIZER,
+    result_accept_content=["json", SERIALIZER_NAME],
+    result_expires=CELERY_RESULT_EXPIRES,
     timezone="UTC",
     enable_utc=True,
+    # Publish STARTED so API status streams see the transition
+    task_track_started=True,
+    **ROUTING_CONFIG,
 )
 
+
+class ResultTTLTask(Task):
+    """
+    Task base that keeps its stored result for `result_ttl` seconds instead of
+    the global `result_expires`.
+    """
+
+    result_ttl = None
+
+    def after_return(self, status, retval, task_id, args, kwargs, einfo):
+        if self.result_ttl and not self.ignore_result:
+            self.backend.expire(self.backend.get_key_for_task(task_id), self.result_ttl)
+
+
 celery.autodiscover_tasks(packages=[
     "celery_worker",
 ])
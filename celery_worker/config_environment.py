@@ -21,6 +21,14 @@ else:
 # Environment variables
 REDIS_URL: str = os.getenv("REDIS_URL")
 DATABASE_URL: str = os.getenv("DATABASE_URL")
+# Must match the API's settings; "json" or "msgpack_zlib"
+CELERY_SERIALIZER: str = os.getenv("CELERY_SERIALIZER", "msgpack_zlib")
+CELERY_COMPRESSION_THRESHOLD: int = int(os.getenv("CELERY_COMPRESSION_THRESHOLD", "1024"))
+# Default result lifetime in seconds; tasks may set a shorter result_ttl
+CELERY_RESULT_EXPIRES: int = int(os.getenv("CELERY_RESULT_EXPIRES", "86400"))
+# Worker profile from celery_worker.routing.WORKER_PROFILES, and its process count (0 keeps the profile's)
+CELERY_WORKER_PROFILE: str = os.getenv("CELERY_WORKER_PROFILE", "all")
+CELERY_WORKER_CONCURRENCY: int = int(os.getenv("CELERY_WORKER_CONCURRENCY", "0"))
 
 # Configuration checks
 if REDIS_URL is None:
@@ -33,3 +41,8 @@ logger.info("ENVIRONMENT: %s", ENVIRONMENT)
 logger.info("IS_DOCKER: %s", IS_DOCKER)
 logger.info("REDIS_URL: %s", REDIS_URL)
 logger.info("DATABASE_URL: %s", DATABASE_URL)
+logger.info("CELERY_SERIALIZER: %s", CELERY_SERIALIZER)
+logger.info("CELERY_COMPRESSION_THRESHOLD: %s", CELERY_COMPRESSION_THRESHOLD)
+logger.info("CELERY_RESULT_EXPIRES: %s", CELERY_RESULT_EXPIRES)
+logger.info("CELERY_WORKER_PROFILE: %s", CELERY_WORKER_PROFILE)
+logger.info("CELERY_WORKER_CONCURRENCY: %s", CELERY_WORKER_CONCURRENCY)
@@ -0,0 +1,72 @@
+"""
+Queues, routes and worker profiles shared by the API and the worker.
+
+User-facing tasks go to the `interactive` queue, fan-out work to `bulk` and
+anything unrouted to `default`. Each queue gets its own worker profile so a
+backlog of bulk jobs never delays interactive ones.
+"""
+from typing import Any, Dict
+
+from kombu import Exchange, Queue
+
+QUEUE_INTERACTIVE = "interactive"
+QUEUE_DEFAULT = "default"
+QUEUE_BULK = "bulk"
+
+# Redis priorities: 0 is served first, 9 last
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 9
+
+TASK_QUEUES = tuple(
+    Queue(name, Exchange(name, type="direct"), routing_key=name)
+    for name in (QUEUE_INTERACTIVE, QUEUE_DEFAULT, QUEUE_BULK)
+)
+
+# Task name -> publish options; explicit send options (e.g. queue=QUEUE_BULK) win
+TASK_ROUTES: Dict[str, Dict[str, Any]] = {
+    "celery_worker.tasks.hello_world": {"queue": QUEUE_INTERACTIVE, "priority": PRIORITY_HIGH},
+}
+
+# Must be the same on both sides, the publisher picks the priority list to push to
+BROKER_TRANSPORT_OPTIONS: Dict[str, Any] = {
+    "priority_steps": list(range(10)),
+    "sep": ":",
+    "queue_order_strategy": "priority",
+}
+
+ROUTING_CONFIG: Dict[str, Any] = {
+    "task_queues": TASK_QUEUES,
+    "task_routes": TASK_ROUTES,
+    "task_default_queue": QUEUE_DEFAULT,
+    "task_default_priority": PRIORITY_NORMAL,
+    "broker_transport_options": BROKER_TRANSPORT_OPTIONS,
+}
+
+# Worker settings per queue group. concurrency None means one process per CPU.
+WORKER_PROFILES: Dict[str, Dict[str, Any]] = {
+    # Short tasks, fetch one at a time so nothing sits behind a busy process
+    "interactive": {
+        "queues": [QUEUE_INTERACTIVE, QUEUE_DEFAULT],
+        "prefetch_multiplier": 1,
+        "acks_late": True,
+        "concurrency": None,
+        "pool": "prefork",
+    },
+    # Throughput over latency, prefetch in batches
+    "bulk": {
+        "queues": [QUEUE_BULK],
+        "prefetch_multiplier": 8,
+        "acks_late": True,
+        "concurrency": None,
+        "pool": "prefork",
+    },
+    # Single worker for local development
+    "all": {
+        "queues": [QUEUE_INTERACTIVE, QUEUE_DEFAULT, QUEUE_BULK],
+        "prefetch_multiplier": 1,
+        "acks_late": True,
+        "concurrency": None,
+        "pool": "prefork",
+    },
+}
@@ -0,0 +1,64 @@
+"""
+Compact binary serializer shared by the API and the worker.
+
+Messages and results are packed with msgpack; payloads at or above the
+compression threshold are zlib-compressed. A one byte header records which
+form was used, and JSON payloads written before the switch still decode.
+"""
+import json
+import zlib
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any
+from uuid import UUID
+
+import msgpack
+from kombu.serialization import register
+
+SERIALIZER_NAME = "msgpack_zlib"
+CONTENT_TYPE = "application/x-msgpack-zlib"
+
+_RAW = b"\x00"
+_COMPRESSED = b"\x01"
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (UUID, Decimal)):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def register_serializer(compression_threshold: int) -> None:
+    """
+    Register the `msgpack_zlib` serializer with kombu.
+
+    Args:
+        compression_threshold (int): Payloads of at least this many bytes are compressed.
+    """
+
+    def dumps(value: Any) -> bytes:
+        packed = msgpack.packb(value, use_bin_type=True, default=_default)
+        if len(packed) >= compression_threshold:
+            return _COMPRESSED + zlib.compress(packed)
+        return _RAW + packed
+
+    def loads(payload: Any) -> Any:
+        header, body = payload[:1], payload[1:]
+        if header == _COMPRESSED:
+            return msgpack.unpackb(zlib.decompress(body), raw=False)
+        if header == _RAW:
+            return msgpack.unpackb(body, raw=False)
+        # Written by the JSON serializer before the switch
+        return json.loads(payload)
+
+    register(
+        SERIALIZER_NAME,
+        dumps,
+        loads,
+        content_type=CONTENT_TYPE,
+        content_encoding="binary",
+    )
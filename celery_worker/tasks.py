@@ -1,7 +1,11 @@
-from .config import celery
+from .config import celery, ResultTTLTask
 
+# Queue and priority come from celery_worker.routing.TASK_ROUTES
 @celery.task(
     name="celery_worker.tasks.hello_world",
+    base=ResultTTLTask,
+    # Clients read this through the status endpoints shortly after it finishes
+    result_ttl=3600,
     result_backend_transport_options={
         'key_prefix': 'hello_world_from_celery'
     }
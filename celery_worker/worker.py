@@ -0,0 +1,57 @@
+"""
+Start a Celery worker with one of the profiles in celery_worker.routing.
+
+    python -m celery_worker.worker --profile interactive
+    python -m celery_worker.worker --profile bulk --concurrency 2
+
+Any further arguments are passed on to `celery worker`.
+"""
+import argparse
+from typing import List, Optional
+
+from celery_worker.config_environment import CELERY_WORKER_PROFILE, CELERY_WORKER_CONCURRENCY
+from celery_worker.routing import WORKER_PROFILES
+from celery_worker.tasks import celery
+
+
+def worker_argv(profile: str, concurrency: int = 0, extra: Optional[List[str]] = None) -> List[str]:
+    """
+    Build the `celery worker` arguments for a profile and apply its settings.
+
+    Args:
+        profile (str): Key of WORKER_PROFILES.
+        concurrency (int): Processes to run, 0 keeps the profile's setting.
+        extra (Optional[List[str]]): Additional `celery worker` arguments.
+
+    Returns:
+        List[str]: Arguments for `celery.worker_main`.
+    """
+    settings = WORKER_PROFILES[profile]
+    celery.conf.task_acks_late = settings["acks_late"]
+    # A task that crashed its process would otherwise be redelivered forever
+    celery.conf.task_reject_on_worker_lost = False
+
+    argv = [
+        "worker",
+        "--loglevel=info",
+        f"--hostname={profile}@%h",
+        f"--queues={','.join(settings['queues'])}",
+        f"--prefetch-multiplier={settings['prefetch_multiplier']}",
+        f"--pool={settings['pool']}",
+    ]
+    processes = concurrency or settings["concurrency"]
+    if processes:
+        argv.append(f"--concurrency={processes}")
+    return argv + (extra or [])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a Celery worker profile")
+    parser.add_argument("--profile", choices=sorted(WORKER_PROFILES), default=CELERY_WORKER_PROFILE)
+    parser.add_argument("--concurrency", type=int, default=CELERY_WORKER_CONCURRENCY)
+    args, extra = parser.parse_known_args()
+    celery.worker_main(worker_argv(args.profile, args.concurrency, extra))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import json
+
+import pytest
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.admin import bulk
+from app.admin.bulk import UserImporter, export_users, parse_rows
+from app.database import Base, async_read_session, async_session
+
+pytest.importorskip("aiosqlite")
+
+
+async def chunked(data: bytes, size: int = 7):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def import_rows(data: bytes, fmt: str):
+    events = [event async for event in UserImporter(batch_size=2, hash_workers=2).run(parse_rows(chunked(data), fmt))]
+    return [event for event in events if "error" in event], events[-1]["done"]
+
+
+@pytest.fixture
+async def database():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    previous_bind = async_session.kw["bind"]
+    async_session.configure(bind=engine)
+    async_read_session.configure(bind=engine)
+    try:
+        yield engine
+    finally:
+        async_session.configure(bind=previous_bind)
+        async_read_session.configure(bind=previous_bind)
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_import_reports_bad_rows_and_round_trips_export(database):
+    """
+    Ensure an import skips and reports invalid rows, and an export with hashes re-imports as is
+    """
+    csv_data = (
+        b"email,password,timezone\r\n"
+        b"one@example.com,secret123!,Asia/Tokyo\r\n"
+        b"not-an-email,secret123!,\r\n"
+        b'"two@example.com","secret\n123!",\r\n'
+        b"ONE@example.com,secret123!,\r\n"
+        b"three@example.com,secret123!,Mars/Base\r\n"
+    )
+    errors, done = await import_rows(csv_data, "csv")
+    assert done == {"processed": 5, "imported": 2, "failed": 3}
+    # Line numbers count physical lines, including the quoted newline
+    assert sorted((error["line"], error["error"]) for error in errors) == [
+        (3, "email: value is not a valid email address: An email address must have an @-sign."),
+        (6, "email: already registered"),
+        (7, "timezone: unknown timezone 'Mars/Base'"),
+    ]
+
+    exported = b"".join([chunk async for chunk in export_users("ndjson", include_password_hashes=True)])
+    users = [json.loads(line) for line in exported.splitlines()]
+    assert [(user["email"], user["timezone"]) for user in users] == [
+        ("one@example.com", "Asia/Tokyo"), ("two@example.com", "Europe/London"),
+    ]
+
+    # Every row is now taken; rename them to re-import the same hashes
+    errors, done = await import_rows(exported, "ndjson")
+    assert done["imported"] == 0 and {error["error"] for error in errors} == {"email: already registered"}
+    renamed = b"".join(
+        (json.dumps({**user, "email": "copy." + user["email"]}) + "\n").encode() for user in users
+    )
+    errors, done = await import_rows(renamed, "ndjson")
+    assert errors == [] and done["imported"] == 2
+
+    csv_export = b"".join([chunk async for chunk in export_users("csv")]).decode().splitlines()
+    assert csv_export[0] == "id,email,timezone,is_active,is_superuser,is_verified,created_at"
+    assert len(csv_export) == 5
+
+
+@pytest.mark.asyncio
+async def test_batch_rejected_by_the_database_is_reported(database, monkeypatch):
+    """
+    Ensure a batch the database rejects is reported row by row and later batches still import
+    """
+    write = bulk._write
+
+    async def failing_write(session, rows):
+        if any(row["email"] == "rejected@example.com" for row in rows):
+            raise DBAPIError("INSERT", None, Exception("value too long for type character varying(1024)"))
+        await write(session, rows)
+
+    monkeypatch.setattr(bulk, "_write", failing_write)
+    rows = b"".join(
+        (json.dumps({"email": email, "hashed_password": "$argon2id$x"}) + "\n").encode()
+        for email in ("first@example.com", "rejected@example.com", "third@example.com", "fourth@example.com")
+    )
+    errors, done = await import_rows(rows + b'{"email": "long@example.com", "hashed_password": "' + b"x" * 1025 + b'"}\n', "ndjson")
+
+    assert done == {"processed": 5, "imported": 2, "failed": 3}
+    assert [(error["line"], error["error"]) for error in errors] == [
+        (1, "not imported: value too long for type character varying(1024)"),
+        (2, "not imported: value too long for type character varying(1024)"),
+        (5, "hashed_password: String should have at most 1024 characters"),
+    ]
@@ -0,0 +1,39 @@
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app import redis as app_redis
+from app.admin.counts import CountProvider
+from app.database import Base
+from app.models.users import User
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("aiosqlite")
+
+
+@pytest.mark.asyncio
+async def test_exact_counts_are_reused_until_they_expire(monkeypatch):
+    """
+    Ensure an exact count is cached per statement and estimates are skipped off PostgreSQL
+    """
+    monkeypatch.setattr(app_redis, "redis_client", fakeredis.FakeAsyncRedis(decode_responses=True))
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    counts = CountProvider(ttl=60)
+    async with AsyncSession(engine) as session:
+        session.add(User(email="a@example.com", hashed_password="x", is_active=True, is_superuser=False, is_verified=False))
+        await session.commit()
+
+        assert await counts.estimate(session, "users") is None
+        stmt = select(func.count(User.id))
+        assert await counts.exact(session, stmt) == 1
+
+        session.add(User(email="b@example.com", hashed_password="x", is_active=True, is_superuser=False, is_verified=False))
+        await session.commit()
+        assert await counts.exact(session, stmt) == 1
+        assert await counts.exact(session, stmt.where(User.email == "b@example.com")) == 1
+
+    assert counts.stats() == {"estimates": 0, "exact_hits": 1, "exact_misses": 2}
+    await engine.dispose()
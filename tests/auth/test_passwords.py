@@ -0,0 +1,38 @@
+import asyncio
+import pytest
+from app.auth.passwords import PasswordService, PasswordServiceOverloaded
+
+
+@pytest.mark.asyncio
+async def test_password_service_hash_and_verify():
+    """
+    Ensure hashes produced on the pool verify and record timings
+    """
+    service = PasswordService(max_workers=1, max_queue=1)
+
+    hashed = await service.hash("correct horse")
+    verified, _ = await service.verify_and_update("correct horse", hashed)
+
+    assert verified
+    assert service.hash_time.count == 2
+    assert service.in_flight == 0
+    service.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_password_service_rejects_when_queue_full():
+    """
+    Ensure work beyond the worker and queue limits is rejected with a 503
+    """
+    service = PasswordService(max_workers=1, max_queue=0)
+
+    first = asyncio.ensure_future(service.hash("first password"))
+    await asyncio.sleep(0)
+
+    with pytest.raises(PasswordServiceOverloaded) as exc_info:
+        await service.hash("second password")
+
+    assert exc_info.value.status_code == 503
+    assert service.rejected == 1
+    await first
+    service.shutdown()
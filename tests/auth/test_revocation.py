@@ -0,0 +1,89 @@
+import asyncio
+import time
+
+import pytest
+
+from app import redis as app_redis
+from app.auth.revocation import REVOKED_CHANNEL, TokenRevocations
+from app.utils.bloom import BloomFilter
+
+
+def test_bloom_filter_has_no_false_negatives():
+    """
+    Ensure every added item is found and the false positive rate stays near the target
+    """
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for index in range(1000):
+        bloom.add(f"token-{index}")
+
+    assert all(f"token-{index}" in bloom for index in range(1000))
+    false_positives = sum(f"other-{index}" in bloom for index in range(10000))
+    assert false_positives < 300
+
+
+@pytest.mark.asyncio
+async def test_revocation_reaches_other_workers(monkeypatch):
+    """
+    Ensure a revoked token is refused by a worker that only learns of it from Redis
+    """
+    fakeredis = pytest.importorskip("fakeredis")
+    monkeypatch.setattr(app_redis, "redis_client", fakeredis.FakeAsyncRedis(decode_responses=True))
+    worker, other = TokenRevocations(capacity=100), TokenRevocations(capacity=100)
+    other.start_listener()
+    try:
+        # Wait until the other worker has loaded its filter
+        for _ in range(50):
+            if other.stats()["synced"]:
+                break
+            await asyncio.sleep(0.05)
+
+        await worker.revoke("revoked", time.time() + 60)
+        await asyncio.sleep(0.2)
+
+        assert await other.is_revoked("revoked")
+        assert not await other.is_revoked("valid")
+        assert other.stats()["local_checks"] == 1
+    finally:
+        await other.stop_listener()
+        await worker.stop_listener()
+
+
+@pytest.mark.asyncio
+async def test_listener_failure_stops_trusting_the_filter(monkeypatch):
+    """
+    Ensure an unexpected listener error sends checks to Redis until the same listener reloads the filter
+    """
+    fakeredis = pytest.importorskip("fakeredis")
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(app_redis, "redis_client", redis)
+    revocations = TokenRevocations(capacity=100)
+    revocations.start_listener()
+    try:
+        for _ in range(50):
+            if revocations.stats()["synced"]:
+                break
+            await asyncio.sleep(0.05)
+        assert revocations.stats()["synced"]
+
+        def broken_add(item):
+            raise ValueError("unexpected payload")
+
+        listener = revocations._listener
+        monkeypatch.setattr(revocations._filter, "add", broken_add)
+        await redis.publish(REVOKED_CHANNEL, "jti")
+        for _ in range(50):
+            if not revocations.stats()["synced"]:
+                break
+            await asyncio.sleep(0.05)
+        assert not revocations.stats()["synced"]
+        assert await revocations.is_revoked("other") is False
+        assert revocations._listener is listener and not listener.done()
+
+        # After the back-off the same listener reloads the filter
+        for _ in range(50):
+            if revocations.stats()["synced"]:
+                break
+            await asyncio.sleep(0.05)
+        assert revocations.stats()["synced"]
+    finally:
+        await revocations.stop_listener()
@@ -0,0 +1,87 @@
+"""
+In-process fixtures for the benchmarks: SQLite through aiosqlite, an
+in-memory Redis server and Celery's in-memory broker, so nothing outside the
+process is needed.
+
+Benchmarks only run when RUN_BENCHMARKS=1:
+
+    RUN_BENCHMARKS=1 pytest tests/benchmarks -s
+"""
+import os
+
+import fakeredis
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import app.redis
+from app.auth.passwords import password_service
+from app.celery_tasks import get_celery
+from app.database import Base, async_read_session, async_session, engine_options
+from app.main import app as fastapi_app
+from app.metrics.sql import instrument_engine
+from app.models.users import user_cache
+from app.ratelimit import rate_limiter
+from app.redis import InstrumentedConnectionPool, InstrumentedRedis
+
+RUN_BENCHMARKS = os.getenv("RUN_BENCHMARKS") == "1"
+
+
+def pytest_collection_modifyitems(config, items):
+    if RUN_BENCHMARKS:
+        return
+    skip = pytest.mark.skip(reason="set RUN_BENCHMARKS=1 to run benchmarks")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+def _fake_redis(server, decode_responses: bool) -> InstrumentedRedis:
+    pool = InstrumentedConnectionPool(
+        max_connections=app.redis.REDIS_MAX_CONNECTIONS,
+        timeout=app.redis.REDIS_POOL_TIMEOUT,
+        connection_class=fakeredis.FakeAsyncRedis().connection_pool.connection_class,
+        server=server,
+        decode_responses=decode_responses,
+    )
+    return InstrumentedRedis(connection_pool=pool)
+
+
+@pytest.fixture
+async def bench_client(tmp_path, monkeypatch):
+    """
+    An HTTP client for the app, backed by a fresh SQLite database and Redis.
+    """
+    url = f"sqlite+aiosqlite:///{tmp_path / 'bench.db'}"
+    engine = create_async_engine(url, **engine_options(url))
+    instrument_engine(engine.sync_engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    previous_bind = async_session.kw["bind"]
+    async_session.configure(bind=engine)
+    async_read_session.configure(bind=engine)
+
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(app.redis, "redis_client", _fake_redis(server, decode_responses=True))
+    monkeypatch.setattr(app.redis, "redis_binary_client", _fake_redis(server, decode_responses=False))
+
+    # Scenarios call login and register far more often than the limits allow
+    monkeypatch.setattr(rate_limiter, "rules", [])
+    # and run more of them at once than PASSWORD_HASH_MAX_QUEUE; measure them
+    # instead of the 503s that shed the excess
+    monkeypatch.setattr(password_service, "max_queue", 1000)
+
+    celery = get_celery()
+    celery.close()
+    monkeypatch.setitem(celery.conf, "broker_url", "memory://")
+
+    transport = httpx.ASGITransport(app=fastapi_app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            yield client
+    finally:
+        await user_cache.stop_listener()
+        celery.close()
+        async_session.configure(bind=previous_bind)
+        async_read_session.configure(bind=previous_bind)
+        await engine.dispose()
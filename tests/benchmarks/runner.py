@@ -0,0 +1,189 @@
+"""
+Load generation and result bookkeeping for the in-process benchmarks.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# One (scenario -> concurrency -> stats) mapping, as written to disk
+Results = Dict[str, Dict[str, Dict[str, float]]]
+
+
+def calibrate(repeats: int = 20) -> float:
+    """
+    Milliseconds this machine takes for a fixed CPU-bound workload, best of `repeats`.
+
+    The workload uses no app code, so a regression can't hide by slowing the
+    calibration down along with the scenarios.
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        rows = [{"id": index, "email": f"user-{index}@example.com", "active": index % 3 != 0} for index in range(5000)]
+        rows.sort(key=lambda row: row["email"])
+        hashlib.sha256(json.dumps(rows).encode()).hexdigest()
+        best = min(best, time.perf_counter() - started)
+    return round(best * 1000, 3)
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def measure(
+    call: Callable[[int], Awaitable[bool]],
+    requests: int,
+    concurrency: int,
+) -> Dict[str, float]:
+    """
+    Run `call` `requests` times from `concurrency` concurrent clients.
+
+    Args:
+        call (Callable[[int], Awaitable[bool]]): Sends request number N, returns whether it succeeded.
+        requests (int): Total requests to send.
+        concurrency (int): Requests in flight at once.
+
+    Returns:
+        Dict[str, float]: Throughput, error count and latency percentiles in milliseconds.
+    """
+    latencies: List[float] = []
+    errors = 0
+    numbers = iter(range(requests))
+
+    async def client() -> None:
+        nonlocal errors
+        for number in numbers:
+            started = time.perf_counter()
+            ok = await call(number)
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2),
+    }
+
+
+def write_results(path: Path, results: Results, calibration_ms: float) -> None:
+    """
+    Write results as JSON along with the machine they were measured on and its calibration.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "calibration_ms": calibration_ms,
+        },
+        "measured_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "results": results,
+    }
+    path.write_text(json.dumps(payload, indent=2, sort_keys=True) + "\n")
+
+
+def load_results(path: Path) -> Optional[Tuple[Results, float]]:
+    """
+    Results and the calibration of the machine they were measured on, None without a file.
+    """
+    if not path.exists():
+        return None
+    payload = json.loads(path.read_text())
+    return payload["results"], payload["machine"]["calibration_ms"]
+
+
+def rescale(results: Results, calibration_ms: float, to_calibration_ms: float) -> Results:
+    """
+    Results measured on a machine with `calibration_ms`, as they would be on one with `to_calibration_ms`.
+    """
+    slower = to_calibration_ms / calibration_ms
+    scaled: Results = {}
+    for scenario, levels in results.items():
+        for concurrency, stats in levels.items():
+            scaled.setdefault(scenario, {})[concurrency] = {
+                key: round(value / slower, 1) if key == "throughput_rps"
+                else round(value * slower, 2) if key.endswith("_ms")
+                else value
+                for key, value in stats.items()
+            }
+    return scaled
+
+
+def envelope(runs: List[Results]) -> Results:
+    """
+    The worst figures of several runs, so a baseline doesn't record one lucky run.
+    """
+    merged: Results = {}
+    for run in runs:
+        for scenario, levels in run.items():
+            for concurrency, stats in levels.items():
+                worst = merged.setdefault(scenario, {}).setdefault(concurrency, dict(stats))
+                for key, value in stats.items():
+                    # Throughput is the only figure where lower is worse
+                    worst[key] = min(worst[key], value) if key == "throughput_rps" else max(worst[key], value)
+    return merged
+
+
+def regressions(results: Results, baseline: Results, tolerance: float, min_delta_ms: float = 0.0) -> List[str]:
+    """
+    Compare against a baseline measured on the same machine, or rescaled to it.
+
+    A scenario regresses when its p95 latency grows, or its throughput drops,
+    by more than `tolerance` (0.25 = 25%), or when it starts failing requests.
+    Changes of less than `min_delta_ms` in p95 latency, or in time per request
+    for throughput, are treated as noise.
+
+    Returns:
+        List[str]: One line per regression, empty when there is none.
+    """
+    found = []
+    for scenario, levels in sorted(results.items()):
+        for concurrency, stats in sorted(levels.items(), key=lambda item: int(item[0])):
+            before: Dict[str, Any] = baseline.get(scenario, {}).get(concurrency)
+            if before is None:
+                continue
+            label = f"{scenario} @ {concurrency}"
+            if stats["p95_ms"] > max(before["p95_ms"] * (1 + tolerance), before["p95_ms"] + min_delta_ms):
+                found.append(f"{label}: p95 {before['p95_ms']}ms -> {stats['p95_ms']}ms")
+            # Each of the `concurrency` clients spends this long per request
+            slower_ms = int(concurrency) * 1000 * (1 / stats["throughput_rps"] - 1 / before["throughput_rps"])
+            if stats["throughput_rps"] < before["throughput_rps"] * (1 - tolerance) and slower_ms > min_delta_ms:
+                found.append(f"{label}: throughput {before['throughput_rps']} -> {stats['throughput_rps']} req/s")
+            if stats["errors"] > before["errors"]:
+                found.append(f"{label}: errors {before['errors']} -> {stats['errors']}")
+    return found
+
+
+def report(results: Results) -> str:
+    """
+    Results as a fixed-width table.
+    """
+    lines = [f"{'scenario':<18}{'conc':>6}{'req/s':>10}{'p50':>9}{'p95':>9}{'p99':>9}{'errors':>8}"]
+    for scenario, levels in results.items():
+        for concurrency, stats in levels.items():
+            lines.append(
+                f"{scenario:<18}{concurrency:>6}{stats['throughput_rps']:>10}"
+                f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}{stats['errors']:>8}"
+            )
+    return "\n".join(lines)
@@ -0,0 +1,124 @@
+"""
+Throughput and latency of the main endpoints at several concurrency levels.
+
+Results are written to BENCHMARK_RESULTS and compared against
+BENCHMARK_BASELINE; a missing baseline fails the run. Each run times a fixed
+CPU-bound workload first, and the baseline is rescaled by the two machines'
+calibrations before comparing, so it needn't come from the same machine.
+Re-record it with BENCHMARK_UPDATE_BASELINE=1; it keeps the worst figures of
+BENCHMARK_BASELINE_RUNS runs.
+"""
+import itertools
+import os
+import uuid
+from pathlib import Path
+
+import pytest
+
+from tests.benchmarks.runner import (
+    calibrate,
+    envelope,
+    load_results,
+    measure,
+    regressions,
+    report,
+    rescale,
+    write_results,
+)
+
+HERE = Path(__file__).parent
+CONCURRENCY = [int(level) for level in os.getenv("BENCHMARK_CONCURRENCY", "1,10,50").split(",")]
+REQUESTS = int(os.getenv("BENCHMARK_REQUESTS", "500"))
+# Register and login hash passwords, so they get fewer requests
+AUTH_REQUESTS = int(os.getenv("BENCHMARK_AUTH_REQUESTS", "100"))
+# Allowed slowdown against the baseline, as a fraction
+TOLERANCE = float(os.getenv("BENCHMARK_TOLERANCE", "0.25"))
+# Latency changes below this many milliseconds are noise, whatever the fraction
+MIN_DELTA_MS = float(os.getenv("BENCHMARK_MIN_DELTA_MS", "2"))
+RESULTS_PATH = Path(os.getenv("BENCHMARK_RESULTS", HERE / "results" / "latest.json"))
+BASELINE_PATH = Path(os.getenv("BENCHMARK_BASELINE", HERE / "baseline.json"))
+UPDATE_BASELINE = os.getenv("BENCHMARK_UPDATE_BASELINE") == "1"
+# Runs a new baseline is taken over
+BASELINE_RUNS = int(os.getenv("BENCHMARK_BASELINE_RUNS", "3"))
+
+API = "/api/v1"
+PASSWORD = "benchmark-password-1"
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_api_throughput_and_latency(bench_client):
+    """
+    Ensure no endpoint got slower than the stored baseline
+    """
+    client = bench_client
+    email = "bench@example.com"
+    res = await client.post(f"{API}/auth/register", json={"email": email, "password": PASSWORD})
+    assert res.status_code == 201, res.text
+    res = await client.post(f"{API}/auth/login", data={"username": email, "password": PASSWORD})
+    headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+    run_id = uuid.uuid4().hex[:8]
+    accounts = itertools.count()
+
+    async def ping(number: int) -> bool:
+        return (await client.get(f"{API}/ping", headers=headers)).status_code == 200
+
+    async def ping_redis(number: int) -> bool:
+        return (await client.get(f"{API}/ping_redis", headers=headers)).status_code == 200
+
+    async def register(number: int) -> bool:
+        body = {"email": f"bench-{run_id}-{next(accounts)}@example.com", "password": PASSWORD}
+        return (await client.post(f"{API}/auth/register", json=body)).status_code == 201
+
+    async def login(number: int) -> bool:
+        form = {"username": email, "password": PASSWORD}
+        return (await client.post(f"{API}/auth/login", data=form)).status_code == 200
+
+    async def users_me(number: int) -> bool:
+        return (await client.get(f"{API}/users/me", headers=headers)).status_code == 200
+
+    async def celery_hello_world(number: int) -> bool:
+        return (await client.post(f"{API}/celery/helloworld/", headers=headers)).status_code == 200
+
+    scenarios = {
+        "ping": (ping, REQUESTS),
+        "ping_redis": (ping_redis, REQUESTS),
+        "register": (register, AUTH_REQUESTS),
+        "login": (login, AUTH_REQUESTS),
+        "users_me": (users_me, REQUESTS),
+        "celery_hello_world": (celery_hello_world, REQUESTS),
+    }
+
+    async def run_scenarios():
+        calibrations = [calibrate()]
+        results = {}
+        for name, (call, requests) in scenarios.items():
+            # A short warm-up so one-off costs (first connection, first import) aren't measured
+            await measure(call, min(requests, 10), 1)
+            results[name] = {}
+            for concurrency in CONCURRENCY:
+                results[name][str(concurrency)] = await measure(call, requests, concurrency)
+            calibrations.append(calibrate())
+        # Calibrated between scenarios; the fastest is the least disturbed by other load
+        return results, min(calibrations)
+
+    results, calibration_ms = await run_scenarios()
+    write_results(RESULTS_PATH, results, calibration_ms)
+    print(f"\ncalibration {calibration_ms}ms\n" + report(results))
+
+    if UPDATE_BASELINE:
+        runs = [(results, calibration_ms)] + [await run_scenarios() for _ in range(BASELINE_RUNS - 1)]
+        # Bring every run to the first one's machine speed before taking the envelope
+        write_results(
+            BASELINE_PATH,
+            envelope([rescale(run, calibration, calibration_ms) for run, calibration in runs]),
+            calibration_ms,
+        )
+        return
+    loaded = load_results(BASELINE_PATH)
+    if loaded is None:
+        pytest.fail(f"No baseline at {BASELINE_PATH}; record one with BENCHMARK_UPDATE_BASELINE=1")
+    baseline, baseline_calibration_ms = loaded
+    baseline = rescale(baseline, baseline_calibration_ms, calibration_ms)
+    found = regressions(results, baseline, TOLERANCE, MIN_DELTA_MS)
+    assert not found, "Performance regressions against the baseline:\n" + "\n".join(found)
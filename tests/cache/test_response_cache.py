@@ -0,0 +1,64 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from starlette.requests import Request
+
+from app.cache import responses
+from app.cache.responses import ResponseCache
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.mark.asyncio
+async def test_cached_route_coalesces_misses_and_revalidates(monkeypatch):
+    """
+    Ensure concurrent misses compute once, hits are served from cache and ETags give 304s
+    """
+    redis = fakeredis.FakeAsyncRedis()
+
+    async def get_redis_binary():
+        return redis
+
+    monkeypatch.setattr(responses, "get_redis_binary", get_redis_binary)
+    cache = ResponseCache(l1_max_size=16, l1_ttl=1, lock_timeout=1)
+    calls = []
+    app = FastAPI()
+
+    @app.get("/report")
+    @cache.cached(ttl=30)
+    async def report(page: int = 1):
+        calls.append(page)
+        await asyncio.sleep(0.05)
+        return {"page": page}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        first = await asyncio.gather(*(client.get("/report", params={"page": 1}) for _ in range(5)))
+        assert calls == [1]
+        assert {res.json()["page"] for res in first} == {1}
+
+        hit = await client.get("/report", params={"page": 1})
+        assert hit.headers["x-cache"] == "HIT"
+
+        not_modified = await client.get("/report", params={"page": 1}, headers={"If-None-Match": hit.headers["etag"]})
+        assert not_modified.status_code == 304
+
+        await client.get("/report", params={"page": 2})
+        assert calls == [1, 2]
+
+    assert cache.counters["coalesced"] == 4
+
+
+def test_key_keeps_encoded_separators_apart():
+    """
+    Ensure an escaped "&" or "=" in a query value doesn't share a key with real separators
+    """
+    cache = ResponseCache()
+
+    def key(query_string: bytes) -> str:
+        return cache.key("report", Request({"type": "http", "path": "/report", "query_string": query_string, "headers": []}))
+
+    assert key(b"a=1%26b%3D2") != key(b"a=1&b=2")
+    assert key(b"b=2&a=1") == key(b"a=1&b=2")
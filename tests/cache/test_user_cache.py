@@ -0,0 +1,53 @@
+from datetime import datetime, UTC
+from app.cache.users import UserCache
+from app.models.users import User, TimezoneEnum, user_cache
+
+
+def test_user_cache_round_trip():
+    """
+    Ensure a user row survives the compact Redis encoding unchanged
+    """
+    values = {
+        "id": 1,
+        "email": "user@example.com",
+        "hashed_password": "hash",
+        "is_active": True,
+        "is_superuser": False,
+        "is_verified": False,
+        "timezone": TimezoneEnum.ASIA_TOKYO,
+        "created_at": datetime(2024, 12, 10, 9, 37, tzinfo=UTC),
+    }
+
+    payload = user_cache.dumps(values)
+
+    assert payload.startswith("[")
+    assert user_cache.loads(payload) == values
+
+
+def test_user_cache_local_tier_is_bounded():
+    """
+    Ensure the in-process tier evicts least recently used entries
+    """
+    cache = UserCache(User, l1_ttl=60, l1_max_size=2)
+
+    cache._local_set(1, {"id": 1})
+    cache._local_set(2, {"id": 2})
+    cache._local_get(1)
+    cache._local_set(3, {"id": 3})
+
+    assert cache._local_get(2) is None
+    assert cache._local_get(1) == {"id": 1}
+    assert cache._local_get(3) == {"id": 3}
+
+
+def test_user_cache_tracks_changes():
+    """
+    Ensure invalidations are visible to admin session revalidation
+    """
+    cache = UserCache(User, l1_ttl=60, l1_max_size=2)
+
+    cache._mark_changed(1)
+
+    assert cache.changed_since(1, 0)
+    assert not cache.changed_since(1, cache._changed_at[1])
+    assert not cache.changed_since(2, 0)
@@ -0,0 +1,80 @@
+import threading
+
+import httpx
+import pytest
+from kombu.transport import memory
+
+from app import celery_tasks
+from app.celery_tasks import close_enqueue, enqueue, get_celery
+from app.main import app
+from app.models.users import User
+from app.routers.celery import current_user
+from celery_worker.routing import QUEUE_BULK, QUEUE_INTERACTIVE
+
+
+@pytest.fixture
+def memory_broker(monkeypatch):
+    """
+    The Celery client publishing to kombu's in-memory broker.
+    """
+    celery = get_celery()
+    celery.close()
+    monkeypatch.setitem(celery.conf, "broker_url", "memory://")
+    memory.Channel.queues.clear()
+    yield celery
+    celery.close()
+    memory.Channel.queues.clear()
+
+
+def published(queue: str) -> int:
+    return memory.Channel.queues[queue].qsize() if queue in memory.Channel.queues else 0
+
+
+@pytest.mark.asyncio
+async def test_enqueue_publishes_on_enqueue_threads(memory_broker, monkeypatch):
+    """
+    Ensure tasks are published from the enqueue executor, not the event loop thread
+    """
+    threads = []
+    send_task = memory_broker.send_task
+
+    def recording_send_task(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        return send_task(*args, **kwargs)
+
+    monkeypatch.setattr(memory_broker, "send_task", recording_send_task)
+
+    task_id = await enqueue(celery_tasks.HELLO_WORLD_TASK)
+
+    assert task_id
+    assert published(QUEUE_INTERACTIVE) == 1
+    assert threads and all(name.startswith("celery-enqueue") for name in threads)
+
+
+@pytest.mark.asyncio
+async def test_bulk_endpoint_publishes_one_message_per_task(memory_broker, monkeypatch):
+    """
+    Ensure a bulk request publishes every task to the bulk queue and returns their ids
+    """
+    monkeypatch.setitem(app.dependency_overrides, current_user, lambda: User(id=1, is_active=True))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/api/v1/celery/helloworld/bulk/", json={"count": 25})
+
+    assert response.status_code == 200
+    task_ids = response.json()["task_ids"]
+    assert len(set(task_ids)) == 25
+    assert published(QUEUE_BULK) == 25
+    assert published(QUEUE_INTERACTIVE) == 0
+
+
+@pytest.mark.asyncio
+async def test_enqueue_works_after_close(memory_broker):
+    """
+    Ensure closing enqueueing at shutdown doesn't break enqueues of a later lifespan
+    """
+    await enqueue(celery_tasks.HELLO_WORLD_TASK)
+    close_enqueue()
+    await enqueue(celery_tasks.HELLO_WORLD_TASK)
+
+    assert published(QUEUE_INTERACTIVE) == 2
@@ -0,0 +1,99 @@
+import asyncio
+
+import httpx
+import pytest
+from celery import states
+
+from app import celery_tasks
+from app.celery_tasks import TaskStatusHub, get_celery, get_task_statuses, status_hub, task_key
+from app.main import app
+from app.models.users import User
+from app.routers.celery import current_user
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    client = fakeredis.FakeAsyncRedis()
+
+    async def get_redis_binary():
+        return client
+
+    monkeypatch.setattr(celery_tasks, "get_redis_binary", get_redis_binary)
+    return client
+
+
+def result_payload(status: str, result=None) -> bytes:
+    return get_celery().backend.encode({"status": status, "result": result, "date_done": None})
+
+
+@pytest.mark.asyncio
+async def test_batch_lookup_reports_missing_and_undecodable_tasks(redis):
+    """
+    Ensure one MGET answers for every id, in order, whatever each key holds
+    """
+    await redis.set(task_key("done"), result_payload(states.SUCCESS, 42))
+    await redis.set(task_key("garbage"), b"\x00\xff")
+
+    statuses = await get_task_statuses(["done", "missing", "garbage"])
+
+    assert [(status["task_id"], status["status"]) for status in statuses] == [
+        ("done", states.SUCCESS), ("missing", states.PENDING), ("garbage", celery_tasks.STATUS_UNKNOWN),
+    ]
+    assert statuses[0]["result"] == 42
+
+
+@pytest.mark.asyncio
+async def test_hub_fans_out_until_unsubscribed(redis):
+    """
+    Ensure every stream subscribed to a key gets its messages, and only until it unsubscribes
+    """
+    hub = TaskStatusHub()
+    first, second = asyncio.Queue(), asyncio.Queue()
+    await hub.subscribe(["key"], first)
+    await hub.subscribe(["key", "other"], second)
+    try:
+        await redis.publish("key", b"one")
+        assert await asyncio.wait_for(first.get(), 2) == ("key", b"one")
+        assert await asyncio.wait_for(second.get(), 2) == ("key", b"one")
+
+        await hub.unsubscribe(["key"], first)
+        await redis.publish("key", b"two")
+        assert await asyncio.wait_for(second.get(), 2) == ("key", b"two")
+        assert first.empty()
+    finally:
+        await hub.close()
+
+
+@pytest.mark.asyncio
+async def test_status_stream_ends_once_every_task_is_ready(redis, monkeypatch):
+    """
+    Ensure the SSE stream sends each change and an end event after the last task finishes
+    """
+    monkeypatch.setitem(app.dependency_overrides, current_user, lambda: User(id=1, is_active=True))
+    await redis.set(task_key("first"), result_payload(states.SUCCESS))
+
+    async def finish_second():
+        key = task_key("second")
+        while (await redis.pubsub_numsub(key))[0][1] == 0:
+            await asyncio.sleep(0.01)
+        # Stored and published the way the Redis result backend does
+        payload = result_payload(states.FAILURE)
+        await redis.set(key, payload)
+        await redis.publish(key, payload)
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            finisher = asyncio.create_task(finish_second())
+            response = await asyncio.wait_for(
+                client.get("/api/v1/celery/tasks/stream/", params={"task_ids": ["first", "second"]}), 5,
+            )
+            await finisher
+    finally:
+        await status_hub.close()
+
+    events = [block.split("\n")[0] for block in response.text.strip().split("\n\n")]
+    assert events == ["event: status"] * 3 + ["event: end"]
+    assert '"status": "PENDING"' in response.text and '"status": "FAILURE"' in response.text
@@ -0,0 +1,16 @@
+from app.celery_tasks import get_celery, HELLO_WORLD_TASK
+from celery_worker.routing import QUEUE_INTERACTIVE, QUEUE_DEFAULT, QUEUE_BULK, PRIORITY_HIGH
+
+
+def test_api_routes_tasks_like_the_worker():
+    """
+    Ensure tasks sent by name from the API land on their declared queue
+    """
+    router = get_celery().amqp.router
+
+    options = router.route({}, HELLO_WORLD_TASK)
+    assert options["queue"].name == QUEUE_INTERACTIVE
+    assert options["priority"] == PRIORITY_HIGH
+
+    assert router.route({}, "celery_worker.tasks.unknown")["queue"].name == QUEUE_DEFAULT
+    assert router.route({"queue": QUEUE_BULK}, HELLO_WORLD_TASK)["queue"].name == QUEUE_BULK
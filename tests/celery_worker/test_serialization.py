@@ -0,0 +1,36 @@
+import json
+from datetime import datetime, timezone
+
+from kombu.serialization import dumps, loads
+
+from celery_worker.serialization import register_serializer, SERIALIZER_NAME, CONTENT_TYPE
+
+register_serializer(compression_threshold=256)
+
+
+def _round_trip(value):
+    content_type, encoding, payload = dumps(value, serializer=SERIALIZER_NAME)
+    return payload, loads(payload, content_type, encoding, accept=[content_type])
+
+
+def test_round_trip_small_and_compressed():
+    """
+    Ensure small payloads are stored raw, large ones compressed, and both decode
+    """
+    small, decoded = _round_trip({"status": "SUCCESS", "result": [1, 2, 3]})
+    assert small[:1] == b"\x00"
+    assert decoded == {"status": "SUCCESS", "result": [1, 2, 3]}
+
+    value = {"result": "x" * 4096, "date_done": datetime(2024, 1, 1, tzinfo=timezone.utc)}
+    large, decoded = _round_trip(value)
+    assert large[:1] == b"\x01"
+    assert len(large) < 4096
+    assert decoded == {"result": "x" * 4096, "date_done": "2024-01-01T00:00:00+00:00"}
+
+
+def test_json_payloads_still_decode():
+    """
+    Ensure results written by the JSON serializer before the switch still load
+    """
+    payload = json.dumps({"status": "SUCCESS"}).encode()
+    assert loads(payload, CONTENT_TYPE, "binary", accept=[CONTENT_TYPE]) == {"status": "SUCCESS"}
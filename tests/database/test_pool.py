@@ -0,0 +1,28 @@
+from app.database import engine_options, pool_sizing, InstrumentedQueuePool
+
+
+def test_pool_sizing_without_budget():
+    """
+    Ensure the configured pool is used as-is when no budget is set
+    """
+    assert pool_sizing(5, 10, 0, 8) == (5, 10)
+
+
+def test_pool_sizing_splits_budget_across_workers():
+    """
+    Ensure the connection budget is divided between worker processes
+    """
+    assert pool_sizing(5, 10, 40, 4) == (5, 5)
+    assert pool_sizing(5, 10, 16, 8) == (2, 0)
+    assert pool_sizing(5, 10, 4, 8) == (1, 0)
+
+
+def test_engine_options():
+    """
+    Ensure pool options are applied to server databases but not in-memory SQLite
+    """
+    options = engine_options("postgresql+asyncpg://u:p@localhost/db")
+
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert "statement_cache_size" in options["connect_args"]
+    assert engine_options("sqlite+aiosqlite://") == {}
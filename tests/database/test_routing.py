@@ -0,0 +1,104 @@
+import pytest
+from sqlalchemy import Column, MetaData, String, Table, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app.database import ReplicaSet, RoutingSession
+
+metadata = MetaData()
+marker = Table("marker", metadata, Column("name", String(20)))
+
+
+async def make_database(path, name):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(metadata.create_all)
+        await conn.execute(marker.insert().values(name=name))
+    return engine
+
+
+@pytest.mark.asyncio
+async def test_routing_session_reads_replica_until_write(tmp_path):
+    """
+    Ensure reads go to the replica and stick to the primary after a write
+    """
+    primary = await make_database(tmp_path / "primary.db", "primary")
+    replica = await make_database(tmp_path / "replica.db", "replica")
+
+    class Routing(RoutingSession):
+        replicas = ReplicaSet([replica])
+
+    async with async_sessionmaker(bind=primary, sync_session_class=Routing)() as session:
+        assert (await session.execute(select(marker.c.name))).scalar() == "replica"
+
+        await session.execute(marker.insert().values(name="written"))
+
+        names = (await session.execute(select(marker.c.name))).scalars().all()
+        assert names == ["primary", "written"]
+
+    await primary.dispose()
+    await replica.dispose()
+
+
+@pytest.mark.asyncio
+async def test_routing_session_skips_failed_replica(tmp_path):
+    """
+    Ensure a replica that fails to connect is taken out of rotation
+    """
+    primary = await make_database(tmp_path / "primary.db", "primary")
+    broken = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'replica.db'}")
+
+    class Routing(RoutingSession):
+        replicas = ReplicaSet([broken], retry_after=60)
+
+    maker = async_sessionmaker(bind=primary, sync_session_class=Routing)
+    async with maker() as session:
+        with pytest.raises(OperationalError):
+            await session.execute(select(marker.c.name))
+
+    async with maker() as session:
+        assert (await session.execute(select(marker.c.name))).scalar() == "primary"
+
+    await primary.dispose()
+    await broken.dispose()
+
+
+@pytest.mark.asyncio
+async def test_user_db_reads_replica_only_for_token_lookups(tmp_path, monkeypatch):
+    """
+    Ensure email lookups stay on the primary and only id lookups read the replica
+    """
+    from app.database import Base
+    from app.models.users import CachedSQLAlchemyUserDatabase, TimezoneEnum, User, user_cache
+
+    async def cache_miss(session, user_id):
+        return None
+
+    async def skip_cache(user):
+        return None
+
+    monkeypatch.setattr(user_cache, "get", cache_miss)
+    monkeypatch.setattr(user_cache, "set", skip_cache)
+
+    engines = {}
+    for name in ("primary", "replica"):
+        engines[name] = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / name}.db")
+        async with engines[name].begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            # The replica lags behind: it has not seen the new user's email yet
+            await conn.execute(User.__table__.insert().values(
+                id=1, email=f"{name}@example.com", hashed_password="x", timezone=TimezoneEnum.EUROPE_LONDON.name,
+                is_active=True, is_superuser=False, is_verified=False,
+            ))
+
+    class Routing(RoutingSession):
+        replicas = ReplicaSet([engines["replica"]])
+
+    async with async_sessionmaker(bind=engines["primary"], expire_on_commit=False)() as session, \
+            async_sessionmaker(bind=engines["primary"], sync_session_class=Routing)() as read_session:
+        user_db = CachedSQLAlchemyUserDatabase(session, User, read_session=read_session)
+        assert await user_db.get_by_email("primary@example.com") is not None
+        user = await user_db.get(1)
+        assert user.email == "replica@example.com" and user in session
+
+    for engine in engines.values():
+        await engine.dispose()
@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.database import Base, LazySession, engine_options, get_db, session_stats
+from app.metrics.timing import RequestTimings, request_timings
+from app.models.users import User
+
+
+@pytest.mark.asyncio
+async def test_get_db_is_lazy():
+    """
+    Ensure a session that is never used does not build an AsyncSession
+    """
+    unused = session_stats["unused"]
+    timings = RequestTimings()
+    token = request_timings.set(timings)
+
+    dependency = get_db()
+    session = await dependency.__anext__()
+    await dependency.aclose()
+    request_timings.reset(token)
+
+    assert session._session is None
+    assert session_stats["unused"] == unused + 1
+    assert (timings.db_sessions, timings.db_sessions_unused) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_lazy_session_works_as_context_manager():
+    """
+    Ensure `async with` on a LazySession enters and closes the real session
+    """
+    pytest.importorskip("aiosqlite")
+    engine = create_async_engine("sqlite+aiosqlite://")
+    session = LazySession(async_sessionmaker(bind=engine, class_=AsyncSession))
+
+    async with session as entered:
+        assert isinstance(entered, AsyncSession)
+        assert (await entered.execute(text("SELECT 1"))).scalar() == 1
+        assert entered.in_transaction()
+    assert not entered.in_transaction()
+
+    await session.close()
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_reads_give_the_connection_back_before_teardown(tmp_path):
+    """
+    Ensure a read ends its transaction at once, while a write keeps it for the caller's commit
+    """
+    pytest.importorskip("aiosqlite")
+    url = f"sqlite+aiosqlite:///{tmp_path / 'lazy.db'}"
+    engine = create_async_engine(url, **engine_options(url))
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session = LazySession(async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False))
+
+    assert (await session.execute(select(User))).scalars().all() == []
+    assert not session.in_transaction()
+    assert engine.pool.checkedout() == 0
+
+    session.add(User(email="lazy@example.com", hashed_password="x"))
+    await session.flush()
+    assert await session.scalar(select(User.email)) == "lazy@example.com"
+    assert session.in_transaction()
+    await session.commit()
+
+    user = await session.scalar(select(User))
+    assert not session.in_transaction()
+    assert user.email == "lazy@example.com"
+
+    await session.close()
+    await engine.dispose()
@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.database import engine_options, InstrumentedQueuePool
+from app.lifespan import AppState, _hold_connections, state, warm_up
+from app.main import app
+import httpx
+
+
+@pytest.mark.asyncio
+async def test_warm_up_fills_the_pool(tmp_path):
+    """
+    Ensure warm-up leaves the requested number of connections in the pool
+    """
+    url = f"sqlite+aiosqlite:///{tmp_path / 'warm.db'}"
+    engine = create_async_engine(url, **engine_options(url))
+    assert isinstance(engine.pool, InstrumentedQueuePool)
+
+    await _hold_connections(engine, 3)
+
+    assert engine.pool.checkedin() == 3
+    assert engine.pool.checkedout() == 0
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_warm_up_skips_failing_steps(monkeypatch, caplog):
+    """
+    Ensure a failing JWT warm-up is logged while the other steps still run
+    """
+    finished = []
+
+    async def step(name):
+        finished.append(name)
+
+    def broken_strategy():
+        raise RuntimeError("no signing key")
+
+    monkeypatch.setattr("app.lifespan._hold_connections", lambda engine, count: step("database"))
+    monkeypatch.setattr("app.lifespan._warm_redis", lambda count: step("redis"))
+    monkeypatch.setattr("app.lifespan.password_service.hash", lambda password: step("password_hasher"))
+    monkeypatch.setattr("app.lifespan.get_jwt_strategy", broken_strategy)
+
+    await warm_up()
+
+    assert {"database", "redis", "password_hasher"} <= set(finished)
+    assert "Warm-up of jwt failed: no signing key" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_ready_reports_unavailable_until_warmed_up(monkeypatch):
+    """
+    Ensure /ready is 503 while starting or draining and /health always answers
+    """
+    monkeypatch.setattr(state, "ready", False)
+    monkeypatch.setattr(state, "draining", True)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        ready = await client.get("/ready")
+        assert ready.status_code == 503
+        assert ready.json() == {"status": "draining"}
+        assert (await client.get("/health")).json() == {"status": "ok"}
+
+
+def test_drain_budget_is_counted_from_sigterm(monkeypatch):
+    """
+    Ensure time the server spent draining since SIGTERM comes out of the lifespan's drain
+    """
+    clock = [100.0]
+    monkeypatch.setattr("app.lifespan.time.monotonic", lambda: clock[0])
+    app_state = AppState()
+    assert app_state.drain_time_left(25) == 25
+
+    app_state.start_draining()
+    clock[0] += 20
+    # Shutdown reaching the lifespan later keeps the SIGTERM time
+    app_state.start_draining()
+    assert app_state.drain_time_left(25) == 5
+    assert not app_state.ready and app_state.draining
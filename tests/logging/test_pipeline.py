@@ -0,0 +1,64 @@
+import json
+import logging
+import sys
+
+from app.logging import JsonFormatter, NonBlockingQueueHandler, RateLimitFilter
+
+
+def _record(msg="hello %s", level=logging.INFO, **extra):
+    record = logging.makeLogRecord({"name": "app.test", "msg": msg, "args": ("world",), "levelno": level})
+    record.__dict__.update(extra)
+    return record
+
+
+def test_queue_handler_drops_when_full():
+    """
+    Ensure records beyond the queue size are counted and dropped, not blocked on
+    """
+    handler = NonBlockingQueueHandler(max_size=2)
+    for _ in range(5):
+        handler.handle(_record())
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+
+
+def test_queue_handler_resolves_messages_on_the_calling_thread():
+    """
+    Ensure queued records carry the message and traceback as they were at the log call
+    """
+    handler = NonBlockingQueueHandler(max_size=10)
+    items = ["first"]
+    record = logging.makeLogRecord({"name": "app.test", "msg": "items %s", "args": (items,)})
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record.exc_info = sys.exc_info()
+    handler.handle(record)
+    items.append("second")
+
+    queued = handler.queue.get_nowait()
+    assert (queued.getMessage(), queued.args, queued.exc_info) == ("items ['first']", None, None)
+    assert "ValueError: boom" in json.loads(JsonFormatter().format(queued))["exc_info"]
+    assert logging.Formatter("%(message)s").format(queued).endswith("ValueError: boom")
+
+
+def test_rate_limit_filter_samples_below_warning(monkeypatch):
+    """
+    Ensure hot messages are capped per second while warnings always pass
+    """
+    monkeypatch.setattr("app.logging.time.monotonic", lambda: 100.0)
+    sampler = RateLimitFilter(rate=3)
+    passed = [sampler.filter(_record()) for _ in range(10)]
+    assert sum(passed) == 3
+    assert sampler.suppressed == 7
+    assert all(sampler.filter(_record(level=logging.WARNING)) for _ in range(10))
+
+
+def test_json_formatter_includes_extra_fields():
+    """
+    Ensure JSON output carries the message and any `extra` fields
+    """
+    payload = json.loads(JsonFormatter().format(_record(request_id="abc")))
+    assert payload["message"] == "hello world"
+    assert payload["logger"] == "app.test"
+    assert payload["request_id"] == "abc"
@@ -0,0 +1,36 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.metrics.middleware import MetricsMiddleware, route_metrics, UNMATCHED_ROUTE
+from app.metrics.prometheus import render
+
+
+@pytest.mark.asyncio
+async def test_requests_are_recorded_by_route_template():
+    """
+    Ensure requests are counted under their route template, method and status
+    """
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        for item_id in range(3):
+            assert (await client.get(f"/items/{item_id}")).status_code == 200
+        assert (await client.get("/items/not-a-number")).status_code == 422
+        assert (await client.get("/missing")).status_code == 404
+
+    metrics = route_metrics[("GET", "/items/{item_id}")]
+    assert metrics.responses == {200: 3, 422: 1}
+    assert metrics.latency.count == 4
+    assert metrics.in_flight == 0
+    assert route_metrics[("GET", UNMATCHED_ROUTE)].responses[404] >= 1
+
+    text = render()
+    assert 'http_requests_total{route="/items/{item_id}",method="GET",status="200"} 3' in text
+    assert 'http_request_duration_seconds_count{route="/items/{item_id}",method="GET"} 4' in text
@@ -0,0 +1,92 @@
+import asyncio
+import sys
+
+import pytest
+
+from app.metrics import profiler as profiler_module
+from app.metrics.profiler import (
+    OVERFLOW_STACK,
+    PROFILER_STACKS_KEY,
+    SamplingProfiler,
+    collapsed_stacks,
+    profiler as shared_profiler,
+    start_profiling,
+    stop_profiling,
+)
+
+
+@pytest.mark.asyncio
+async def test_samples_running_and_suspended_requests():
+    """
+    Ensure the running request gets its live stack and suspended ones their await chain
+    """
+    profiler = SamplingProfiler(interval=1, max_stacks=10)
+    release = asyncio.Event()
+
+    async def query_database():
+        await release.wait()
+
+    async def slow_request():
+        profiler.register(sys._getframe(), "GET /slow")
+        try:
+            await query_database()
+        finally:
+            profiler.unregister(sys._getframe())
+
+    def render():
+        profiler.sample(sys._getframe())
+
+    async def fast_request():
+        profiler.register(sys._getframe(), "GET /fast")
+        render()
+        profiler.unregister(sys._getframe())
+
+    slow = asyncio.create_task(slow_request())
+    await asyncio.sleep(0)
+    await fast_request()
+    release.set()
+    await slow
+
+    stacks = profiler.drain()
+    assert profiler.samples == 2
+    [running] = [stack for stack in stacks if stack.startswith("GET /fast;")]
+    assert running.startswith("GET /fast;test_samples_running_and_suspended_requests.<locals>.render (tests/metrics/")
+    [suspended] = [stack for stack in stacks if stack.startswith("GET /slow;")]
+    assert "query_database" in suspended
+    assert suspended.endswith("<Future>")
+    assert profiler.drain() == {}
+
+
+@pytest.mark.asyncio
+async def test_workers_share_settings_and_a_bounded_stack_hash(monkeypatch):
+    """
+    Ensure workers follow the shared switch and their flushes stay under the stack limit
+    """
+    fakeredis = pytest.importorskip("fakeredis")
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+    async def get_redis():
+        return redis
+
+    monkeypatch.setattr(profiler_module, "get_redis", get_redis)
+    monkeypatch.setattr(shared_profiler, "max_stacks", 3)
+    other_worker = SamplingProfiler(interval=1, max_stacks=3)
+    try:
+        await start_profiling(0.5, "/api", seconds=60)
+        assert (shared_profiler.enabled, shared_profiler.fraction, shared_profiler.route) == (True, 0.5, "/api")
+
+        shared_profiler._stacks.update({"GET /a;x": 2, "GET /a;y": 1})
+        await shared_profiler.sync()
+        other_worker._stacks.update({"GET /a;x": 1, "GET /b;z": 4, "GET /c;w": 5})
+        await other_worker.sync()
+        assert other_worker.enabled
+
+        assert await collapsed_stacks() == f"{OVERFLOW_STACK} 5\nGET /b;z 4\nGET /a;x 3\nGET /a;y 1\n"
+        assert await redis.ttl(PROFILER_STACKS_KEY) > 0
+
+        await stop_profiling()
+        await other_worker.sync()
+        assert not shared_profiler.enabled and not other_worker.enabled
+    finally:
+        shared_profiler.stop()
+        other_worker.stop()
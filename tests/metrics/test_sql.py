@@ -0,0 +1,38 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.metrics.sql import instrument_engine, normalize_sql, repeated_statement
+from app.metrics.timing import RequestTimings, request_timings
+
+
+def test_normalize_sql():
+    """
+    Ensure literals, bind parameters and IN lists collapse to one statement shape
+    """
+    assert normalize_sql(
+        "SELECT users.id FROM users\n WHERE users.id = $1::INTEGER AND x IN ($2, $3) AND n = 'a''b' LIMIT 10"
+    ) == "SELECT users.id FROM users WHERE users.id = ?::INTEGER AND x IN (?) AND n = ? LIMIT ?"
+
+
+@pytest.mark.asyncio
+async def test_statements_are_attributed_to_the_request():
+    """
+    Ensure statements are counted per request and repeated ones are flagged
+    """
+    engine = create_async_engine("sqlite+aiosqlite://")
+    instrument_engine(engine.sync_engine)
+    timings = RequestTimings()
+    token = request_timings.set(timings)
+    try:
+        async with engine.connect() as conn:
+            for user_id in range(12):
+                await conn.execute(text("SELECT :id"), {"id": user_id})
+    finally:
+        request_timings.reset(token)
+        await engine.dispose()
+
+    assert timings.db_queries == 12
+    assert timings.db_slowest_statement == "SELECT ?"
+    assert repeated_statement(timings, 10) == ("SELECT ?", 12)
+    assert repeated_statement(timings, 20) is None
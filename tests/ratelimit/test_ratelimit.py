@@ -0,0 +1,86 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app import redis as app_redis
+from app.ratelimit import RateLimiter, RateLimitMiddleware, parse_rules
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+
+def _client(limiter: RateLimiter) -> httpx.AsyncClient:
+    app = FastAPI()
+
+    @app.post("/items/{item_id}")
+    async def item(item_id: int):
+        return {"item_id": item_id}
+
+    @app.get("/open")
+    async def open_route():
+        return {}
+
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_limit_is_shared_across_workers_and_answered_locally(monkeypatch):
+    """
+    Ensure two workers together never exceed the limit and refusals carry Retry-After
+    """
+    monkeypatch.setattr(app_redis, "redis_client", fakeredis.FakeAsyncRedis(decode_responses=True))
+    rules = parse_rules("POST /items/{item_id}=100/60")
+    workers = [RateLimiter(rules, prefetch=5), RateLimiter(rules, prefetch=5)]
+
+    responses = []
+    for limiter in workers:
+        async with _client(limiter) as client:
+            for index in range(60):
+                responses.append(await client.post(f"/items/{index}"))
+            assert (await client.get("/open")).status_code == 200
+
+    assert [res.status_code for res in responses].count(200) == 100
+    assert responses[-1].status_code == 429
+    assert int(responses[-1].headers["retry-after"]) >= 1
+    # Prefetched tokens and remembered refusals spare most round trips
+    assert workers[0].stats()["allowed_local"] == 48
+    assert workers[1].stats()["limited"] == 20
+
+
+@pytest.mark.asyncio
+async def test_prefetched_tokens_expire(monkeypatch):
+    """
+    Ensure unspent prefetched tokens are dropped once the bucket could have refilled them
+    """
+    monkeypatch.setattr(app_redis, "redis_client", fakeredis.FakeAsyncRedis(decode_responses=True))
+    clock = [1000.0]
+    monkeypatch.setattr("app.ratelimit.time.monotonic", lambda: clock[0])
+    rule = parse_rules("POST /items/{item_id}=100/60")[0]
+    limiter = RateLimiter([rule], prefetch=5)
+
+    assert await limiter.acquire(rule, "ip:1") == 0
+    assert await limiter.acquire(rule, "ip:1") == 0
+    assert limiter.stats()["allowed_local"] == 1
+
+    # 5 tokens refill in 3 seconds at 100/60
+    clock[0] += 3
+    assert await limiter.acquire(rule, "ip:1") == 0
+    stats = limiter.stats()
+    assert stats["allowed_local"] == 1
+    assert stats["allowed_redis"] == 2
+
+
+@pytest.mark.asyncio
+async def test_fails_open_without_redis(monkeypatch):
+    """
+    Ensure requests go through when Redis can't be reached
+    """
+    async def get_redis():
+        raise ConnectionError("Redis is down")
+
+    monkeypatch.setattr("app.ratelimit.get_redis", get_redis)
+    limiter = RateLimiter(parse_rules("POST /items/{item_id}=1/60"))
+    async with _client(limiter) as client:
+        assert [(await client.post("/items/1")).status_code for _ in range(3)] == [200, 200, 200]
+    assert limiter.stats()["errors"] == 1
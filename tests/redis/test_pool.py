@@ -0,0 +1,52 @@
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.redis import InstrumentedConnectionPool, InstrumentedRedis, command_time
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.mark.asyncio
+async def test_exhausted_pool_times_out_and_is_counted():
+    """
+    Ensure callers wait at most the pool timeout for a connection and timeouts are counted
+    """
+    pool = InstrumentedConnectionPool(
+        max_connections=1,
+        timeout=0.05,
+        connection_class=fakeredis.FakeAsyncRedis().connection_pool.connection_class,
+        server=fakeredis.FakeServer(),
+    )
+    held = await pool.get_connection("PING")
+    with pytest.raises(RedisConnectionError):
+        await pool.get_connection("PING")
+    await pool.release(held)
+
+    stats = pool.stats()
+    assert stats["timeouts"] == 1
+    assert stats["in_use"] == 0
+    assert stats["wait_time_seconds"]["count"] == 2
+
+    client = InstrumentedRedis(connection_pool=pool)
+    async with client.pipeline(transaction=False) as pipe:
+        pipe.set("ping", "pong")
+        pipe.get("ping")
+        assert await pipe.execute() == [True, b"pong"]
+    assert command_time["PIPELINE"].count >= 1
+    await pool.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_unreachable_redis_is_not_counted_as_timeout():
+    """
+    Ensure failing to connect is counted apart from waiting for a free connection
+    """
+    pool = InstrumentedConnectionPool(host="127.0.0.1", port=1, max_connections=1, timeout=0.05)
+    with pytest.raises(RedisConnectionError):
+        await pool.get_connection("PING")
+
+    stats = pool.stats()
+    assert stats["connect_errors"] == 1
+    assert stats["timeouts"] == 0
+    assert stats["in_use"] == 0
+    await pool.disconnect()
@@ -0,0 +1,23 @@
+from app.redis import redis_pool_size
+from app.server import server_options
+
+
+def test_server_options_follow_settings():
+    """
+    Ensure the launcher passes the worker count and turns 0 limits into no limit
+    """
+    options = server_options(workers=8)
+
+    assert options["workers"] == 8
+    assert options["loop"] in ("uvloop", "asyncio")
+    assert options["http"] in ("httptools", "h11")
+    assert options["limit_concurrency"] is None or options["limit_concurrency"] > 0
+
+
+def test_connection_budgets_are_split_across_workers():
+    """
+    Ensure each worker's Redis pools fit the configured total
+    """
+    assert redis_pool_size(50, 0, 8) == 50
+    assert redis_pool_size(50, 160, 8) == 10
+    assert redis_pool_size(50, 4, 8) == 1
@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, Tuple
+
+# Cumulative seconds `import app.main` may take; raise it on slow machines
+IMPORT_TIME_BUDGET_SECONDS = float(os.getenv("IMPORT_TIME_BUDGET_SECONDS", "1.5"))
+# Only loaded on first use
+LAZY_MODULES = ("sqladmin", "celery.app", "kombu.serialization")
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def import_profile(module: str) -> Tuple[List[Tuple[str, int, int]], str]:
+    """
+    Import `module` in a fresh interpreter with -X importtime.
+
+    Returns:
+        Tuple[List[Tuple[str, int, int]], str]: (name, self us, cumulative us) per
+            imported module and the loaded module names printed by the child.
+    """
+    code = f"import sys, {module}; print(' '.join(sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings.append((name.strip(), int(self_us), int(cumulative_us)))
+    return timings, result.stdout
+
+
+def test_app_imports_within_budget():
+    """
+    Ensure importing the app stays under the budget and leaves the admin panel
+    and the Celery client unloaded
+    """
+    timings, loaded = import_profile("app.main")
+
+    total = next(cumulative for name, _, cumulative in timings if name == "app.main") / 1e6
+    slowest = sorted(timings, key=lambda timing: timing[1], reverse=True)[:10]
+    report = "\n".join(f"{self_us / 1000:8.1f}ms  {name}" for name, self_us, _ in slowest)
+    assert total <= IMPORT_TIME_BUDGET_SECONDS, (
+        f"import app.main took {total:.3f}s, budget {IMPORT_TIME_BUDGET_SECONDS}s. Slowest modules:\n{report}"
+    )
+
+    loaded = set(loaded.split())
+    assert not [module for module in LAZY_MODULES if module in loaded]
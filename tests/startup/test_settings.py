@@ -0,0 +1,12 @@
+from app.config import redact_setting
+
+
+def test_secret_settings_are_redacted_by_name():
+    """
+    Ensure settings named like secrets or URLs are shortened, whatever they were added as
+    """
+    assert redact_setting("SENTRY_URL", "https://key@sentry.example.com/1") == "ht.../1"
+    assert redact_setting("STRIPE_API_TOKEN", "tok_1234567890") == "to...90"
+    assert redact_setting("CACHE_REPLICA_URLS", ["redis://user:pw@host/0"]) == ["re.../0"]
+    assert redact_setting("PASSWORD_HASH_WORKERS", 4) == 4
+    assert redact_setting("LOG_LEVEL", "WARNING") == "WARNING"
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta, UTC
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.database import Base
+from app.models.users import TimezoneEnum, User, list_users
+from app.routers.users import decode_cursor, encode_cursor
+
+pytest.importorskip("aiosqlite")
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_cover_every_user_once():
+    """
+    Ensure cursor pages walk the filtered users newest first without gaps or repeats
+    """
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    started = datetime(2026, 1, 1, tzinfo=UTC)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        session.add_all(
+            User(
+                email=f"user{index}@example.com" if index != 7 else "user_7@example.com",
+                hashed_password="x",
+                # Pairs share a timestamp, so ties are broken by id
+                created_at=started + timedelta(minutes=index // 2),
+                timezone=TimezoneEnum.ASIA_TOKYO if index % 3 == 0 else TimezoneEnum.EUROPE_LONDON,
+                is_active=True,
+                is_superuser=False,
+                is_verified=index % 2 == 0,
+            )
+            for index in range(20)
+        )
+        await session.commit()
+
+        seen, after = [], None
+        while True:
+            page = await list_users(session, limit=3, after=after, timezone=TimezoneEnum.EUROPE_LONDON)
+            seen.extend(user.id for user in page)
+            if len(page) < 3:
+                break
+            after = decode_cursor(encode_cursor(page[-1]))
+
+        london = await list_users(session, limit=100, timezone=TimezoneEnum.EUROPE_LONDON)
+        assert seen == [user.id for user in london]
+        assert len(seen) == len(set(seen)) == 13
+        assert [(u.created_at, u.id) for u in london] == sorted(((u.created_at, u.id) for u in london), reverse=True)
+
+        # "_" is matched literally, not as a wildcard
+        assert [u.email for u in await list_users(session, limit=10, email_prefix="USER_")] == ["user_7@example.com"]
+        assert all(u.is_verified for u in await list_users(session, limit=100, is_verified=True))
+
+    await engine.dispose()